@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+This benchmarks the DrayTek® Vigor™ DSL Status message handling (so upgrades can be checked
+for performance regressions).
+
+Each step of handling a broadcast (key derivation, decryption, encryption, parsing, packing and
+rendering) is timed on its own, then whole broadcasts are sent over loopback to a listener at
+several rates. The results are output as JSON, which can be saved and later compared against:
+
+    python dsl_status_benchmark.py --output baseline.json
+    python dsl_status_benchmark.py --compare baseline.json
+"""
+
+# The arguments are parsed from the command line.
+import argparse
+
+# The listeners run on an asyncio event loop.
+import asyncio
+
+# The load generator runs in its own process (so it does not compete with the listener).
+from concurrent import futures
+
+# The results are input and output as JSON.
+import json
+
+# The environment is recorded with the results.
+import platform
+
+# The program exits with a status.
+import sys
+
+# The benchmarks are timed.
+import time
+import timeit
+
+# The code being benchmarked is in this package.
+from draytek_tools.dsl_status import cryptography
+from draytek_tools.dsl_status.listener import BatchListener, Listener
+from draytek_tools.dsl_status.message import Message
+from draytek_tools.dsl_status.replay import LoadGenerator
+
+
+# The MAC address used to encrypt and decrypt.
+MAC_ADDRESS = 'aa:bb:cc:dd:ee:ff'
+
+# A sample DSL Status message (in SHOWTIME).
+SAMPLE = bytes.fromhex(
+    '0130d71004624c98000000006163ef60617667a0617667a00000000600000000000000030000000360430e8c0083'
+    'd60131322d332d322d332d302d3500ffffff6032c88831374100609400006093c5b0617867a0616453484f575449'
+    '4d450000617667a00022ea980000000761990000'
+)
+
+# The rates (broadcasts per second) the listeners are benchmarked at.
+DEFAULT_RATES = (1000, 5000, 20000)
+
+
+def time_operation(function, repeat=5):
+    """
+    Times an operation.
+
+    Args:
+        function (callable): The operation.
+        repeat (int, optional): The number of timing runs. Defaults to 5.
+
+    Returns:
+        dict: The best seconds per operation (the least disturbed by the rest of the system) and
+              the operations per second this gives.
+    """
+    timer = timeit.Timer(function)
+
+    # Run enough operations to take at least 0.2 seconds.
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat, number)) / number
+
+    return {'seconds_per_op': best, 'ops_per_second': 1 / best}
+
+
+def benchmark_operations(repeat=5):
+    """
+    Benchmarks each step of handling a broadcast.
+
+    Args:
+        repeat (int, optional): The number of timing runs. Defaults to 5.
+
+    Returns:
+        dict: The timings of each operation.
+    """
+    encrypted = cryptography.encrypt_bytes(MAC_ADDRESS, SAMPLE)
+    message = Message(SAMPLE)
+
+    operations = {
+        'get_key': lambda: cryptography.get_key(MAC_ADDRESS),
+        'decrypt_bytes': lambda: cryptography.decrypt_bytes(MAC_ADDRESS, encrypted),
+        'encrypt_bytes': lambda: cryptography.encrypt_bytes(MAC_ADDRESS, SAMPLE),
+        'convert_bytes_to_tuple': lambda: Message.convert_bytes_to_tuple(SAMPLE),
+        'message_init': lambda: Message(SAMPLE),
+        'convert_to_bytes': message.convert_to_bytes,
+        'str': message.__str__
+    }
+
+    return {name: time_operation(function, repeat) for name, function in operations.items()}
+
+
+def _send(port, rate, duration):
+    """
+    Sends synthetic broadcasts to a loopback listener (in the load generator process).
+
+    Args:
+        port (int): The UDP port of the listener.
+        rate (float): The broadcasts per second.
+        duration (float): The seconds to send for.
+
+    Returns:
+        dict: The load generator's results.
+    """
+    generator = LoadGenerator.from_synthetic(
+        MAC_ADDRESS,
+        host='127.0.0.1',
+        port=port,
+        rate=rate,
+        seed=0
+    )
+    return generator.run(duration=duration)
+
+
+async def benchmark_listener(listener_class, port, rate, duration):
+    """
+    Benchmarks a listener receiving broadcasts over loopback.
+
+    Args:
+        listener_class (type): Listener or BatchListener.
+        port (int): The UDP port to listen on.
+        rate (float): The broadcasts per second.
+        duration (float): The seconds to send for.
+
+    Returns:
+        dict: The broadcasts sent and parsed, the fraction delivered, the listener's process
+              time per message and the listener's statistics.
+    """
+    received = 0
+
+    def count(_message, _address):
+        nonlocal received
+        received += 1
+
+    loop = asyncio.get_running_loop()
+    listener = listener_class(MAC_ADDRESS, count, host='127.0.0.1', port=port, queue_size=1)
+    await listener.start()
+
+    try:
+        # Send from another process and time this process's work receiving.
+        with futures.ProcessPoolExecutor(1) as executor:
+            started = time.process_time()
+            sent = await loop.run_in_executor(executor, _send, port, rate, duration)
+
+            # Let the last broadcasts arrive.
+            await asyncio.sleep(0.2)
+            cpu = time.process_time() - started
+    finally:
+        listener.close()
+
+    # Only the callback is needed (the queue is left to overflow).
+    stats = listener.stats()
+    stats.pop('dropped', None)
+    stats.pop('queued', None)
+
+    return {
+        'sent': sent['sent'],
+        'send_rate': sent['rate'],
+        'received': received,
+        'delivered': received / sent['sent'] if sent['sent'] else 0.0,
+        'cpu_seconds_per_message': cpu / received if received else None,
+        'listener': stats
+    }
+
+
+async def benchmark_end_to_end(rates, duration, port):
+    """
+    Benchmarks each listener at each rate.
+
+    Args:
+        rates (iterable): The broadcasts per second.
+        duration (float): The seconds to send for at each rate.
+        port (int): The UDP port to listen on.
+
+    Returns:
+        dict: The results of each listener at each rate.
+    """
+    results = {}
+    for listener_class in (Listener, BatchListener):
+        for rate in rates:
+            results[f'{listener_class.__name__}@{rate}'] = await benchmark_listener(
+                listener_class,
+                port,
+                rate,
+                duration
+            )
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares results against a baseline.
+
+    Args:
+        results (dict): The current results.
+        baseline (dict): The baseline results.
+        threshold (float): The fraction an operation may slow down (or delivery may fall)
+            before it is a regression.
+
+    Returns:
+        dict: Each comparison (the change as a fraction) and the names of any regressions.
+    """
+    comparison = {'operations': {}, 'end_to_end': {}, 'regressions': []}
+
+    # Operations regress if they take longer per operation.
+    for name, timing in results.get('operations', {}).items():
+        if name not in baseline.get('operations', {}):
+            continue
+        previous = baseline['operations'][name]['seconds_per_op']
+        change = timing['seconds_per_op'] / previous - 1
+        comparison['operations'][name] = change
+        if change > threshold:
+            comparison['regressions'].append(name)
+
+    # Listeners regress if less of the sent traffic is delivered.
+    for name, run in results.get('end_to_end', {}).items():
+        if name not in baseline.get('end_to_end', {}):
+            continue
+        previous = baseline['end_to_end'][name]['delivered']
+        change = run['delivered'] - previous
+        comparison['end_to_end'][name] = change
+        if change < -threshold:
+            comparison['regressions'].append(name)
+
+    return comparison
+
+
+def main():
+    """
+    Runs the benchmarks.
+
+    Returns:
+        int: 1 if a regression was found when comparing, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(description='Benchmarks DSL Status message handling.')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--compare', help='compare the results against this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='the fractional change that is a regression (default: 0.1)')
+    parser.add_argument('--rates', type=int, nargs='*', default=DEFAULT_RATES,
+                        help='the end-to-end rates in broadcasts per second')
+    parser.add_argument('--duration', type=float, default=2.0,
+                        help='the seconds to send for at each rate (default: 2)')
+    parser.add_argument('--port', type=int, default=49440,
+                        help='the loopback UDP port to use (default: 49440)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='the timing runs of each operation (default: 5)')
+    arguments = parser.parse_args()
+
+    results = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'time': time.time(),
+        'operations': benchmark_operations(arguments.repeat),
+        'end_to_end': asyncio.run(
+            benchmark_end_to_end(arguments.rates, arguments.duration, arguments.port)
+        ) if arguments.rates else {}
+    }
+
+    # Save the results as a future baseline.
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=4)
+
+    # Compare the results against a baseline.
+    if arguments.compare:
+        with open(arguments.compare, encoding='utf-8') as baseline_file:
+            results['comparison'] = compare(results, json.load(baseline_file), arguments.threshold)
+
+    print(json.dumps(results, indent=4))
+
+    return 1 if results.get('comparison', {}).get('regressions') else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
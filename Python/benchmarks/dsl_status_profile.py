@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+"""
+This profiles where the DrayTek® Vigor™ DSL Status decoding time goes under real load.
+
+Synthetic broadcasts are sent over loopback (from another process) to a listener with the
+decoding stages instrumented, and every message is rendered as text. The cost of each stage per
+message is then printed as a table (or as JSON):
+
+    python dsl_status_profile.py --rate 5000 --duration 5
+    python dsl_status_profile.py --sample-rate 0.01 --json
+"""
+
+# The arguments are parsed from the command line.
+import argparse
+
+# The listener runs on an asyncio event loop.
+import asyncio
+
+# The load generator runs in its own process (so it does not compete with the listener).
+from concurrent import futures
+
+# The report can be output as JSON.
+import json
+
+# The program exits with a status.
+import sys
+
+# The code being profiled is in this package.
+from draytek_tools.dsl_status import instrumentation
+from draytek_tools.dsl_status.listener import BatchListener, Listener
+from draytek_tools.dsl_status.replay import LoadGenerator
+
+
+# The MAC address used to encrypt and decrypt.
+MAC_ADDRESS = 'aa:bb:cc:dd:ee:ff'
+
+
+def _send(port, rate, duration):
+    """
+    Sends synthetic broadcasts to a loopback listener (in the load generator process).
+
+    Args:
+        port (int): The UDP port of the listener.
+        rate (float): The broadcasts per second.
+        duration (float): The seconds to send for.
+
+    Returns:
+        dict: The load generator's results.
+    """
+    generator = LoadGenerator.from_synthetic(
+        MAC_ADDRESS,
+        host='127.0.0.1',
+        port=port,
+        rate=rate,
+        seed=0
+    )
+    return generator.run(duration=duration)
+
+
+async def profile(listener_class, port, rate, duration, sample_rate):
+    """
+    Profiles a listener receiving and rendering broadcasts.
+
+    Args:
+        listener_class (type): Listener or BatchListener.
+        port (int): The UDP port to listen on.
+        rate (float): The broadcasts per second.
+        duration (float): The seconds to send for.
+        sample_rate (float): The fraction of calls to time.
+
+    Returns:
+        dict: The broadcasts sent and rendered and the report of each stage.
+    """
+    rendered = 0
+
+    def render(message, _address):
+        nonlocal rendered
+        str(message)
+        rendered += 1
+
+    loop = asyncio.get_running_loop()
+    sink = instrumentation.CounterSink()
+    listener = listener_class(MAC_ADDRESS, render, host='127.0.0.1', port=port, queue_size=1)
+    await listener.start()
+
+    try:
+        with futures.ProcessPoolExecutor(1) as executor:
+            # Start the load generator process before timing anything.
+            await loop.run_in_executor(executor, int)
+
+            with instrumentation.enabled(sink, sample_rate=sample_rate):
+                sent = await loop.run_in_executor(executor, _send, port, rate, duration)
+
+                # Let the last broadcasts arrive.
+                await asyncio.sleep(0.2)
+    finally:
+        listener.close()
+
+    return {
+        'listener': listener_class.__name__,
+        'sent': sent['sent'],
+        'rendered': rendered,
+        'stages': sink.report()
+    }
+
+
+def main():
+    """
+    Runs the profile.
+
+    Returns:
+        int: 0 once the report has been printed.
+    """
+    parser = argparse.ArgumentParser(description='Profiles each DSL Status decoding stage.')
+    parser.add_argument('--listener', choices=('batch', 'datagram'), default='batch',
+                        help='the listener to profile (default: batch)')
+    parser.add_argument('--rate', type=float, default=5000,
+                        help='the broadcasts per second (default: 5000)')
+    parser.add_argument('--duration', type=float, default=3,
+                        help='the seconds to send for (default: 3)')
+    parser.add_argument('--sample-rate', type=float, default=1.0,
+                        help='the fraction of calls to time (default: 1)')
+    parser.add_argument('--port', type=int, default=49944,
+                        help='the loopback UDP port to use (default: 49944)')
+    parser.add_argument('--json', action='store_true', help='output the report as JSON')
+    arguments = parser.parse_args()
+
+    results = asyncio.run(
+        profile(
+            BatchListener if arguments.listener == 'batch' else Listener,
+            arguments.port,
+            arguments.rate,
+            arguments.duration,
+            arguments.sample_rate
+        )
+    )
+
+    if arguments.json:
+        print(json.dumps(results, indent=4))
+    else:
+        print(
+            f'{results["listener"]}: {results["sent"]} broadcasts sent, '
+            f'{results["rendered"]} rendered.\n'
+        )
+        print(instrumentation.format_report(results['stages']))
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+This benchmarks how long DrayTek® Vigor™ DSL Status imports take in a fresh interpreter (so
+short-lived programs such as health checks can be checked for startup regressions).
+
+Each import is run in new interpreters with "python -X importtime" and the time attributed to
+the imports it triggers (beyond those every interpreter makes at startup) is reported as JSON,
+which can be saved and later compared against:
+
+    python dsl_status_startup.py --output startup.json
+    python dsl_status_startup.py --compare startup.json
+"""
+
+# The arguments are parsed from the command line.
+import argparse
+
+# The results are input and output as JSON.
+import json
+
+# The environment is recorded with the results.
+import platform
+
+# The median of the runs is reported.
+import statistics
+
+# Each import is run in a fresh interpreter.
+import subprocess
+
+# The program exits with a status (and the same interpreter is used for the runs).
+import sys
+
+# The results are timestamped.
+import time
+
+
+# The imports that are benchmarked.
+DEFAULT_STATEMENTS = (
+    'import draytek_tools.dsl_status',
+    'from draytek_tools.dsl_status import MessageView',
+    'from draytek_tools.dsl_status import Message',
+    'from draytek_tools.dsl_status import cryptography',
+)
+
+
+def import_times(statement):
+    """
+    Runs a statement in a fresh interpreter and reads how long each import took.
+
+    Args:
+        statement (str): The Python statement.
+
+    Returns:
+        dict: The cumulative microseconds of each top-level import.
+
+    Raises:
+        RuntimeError: If the statement fails.
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True,
+        text=True,
+        check=False
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f'"{statement}" failed:\n{process.stderr}')
+
+    # Each line is "import time: <self> | <cumulative> | <indented module name>".
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit() and not name[1:].startswith(' '):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def benchmark_statement(statement, startup_modules, runs):
+    """
+    Benchmarks an import statement.
+
+    Args:
+        statement (str): The Python statement.
+        startup_modules (set): The modules every interpreter imports at startup.
+        runs (int): The number of fresh interpreters to run.
+
+    Returns:
+        dict: The median microseconds of the imports the statement triggers and the slowest of
+              those imports in the last run.
+    """
+    totals = []
+    for _ in range(runs):
+        times = {
+            name: cumulative for name, cumulative in import_times(statement).items()
+            if name not in startup_modules
+        }
+        totals.append(sum(times.values()))
+
+    return {
+        'microseconds': statistics.median(totals),
+        'slowest': dict(sorted(times.items(), key=lambda item: -item[1])[:5])
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares results against a baseline.
+
+    Args:
+        results (dict): The current results.
+        baseline (dict): The baseline results.
+        threshold (float): The fraction an import may slow down before it is a regression.
+
+    Returns:
+        dict: Each comparison (the change as a fraction) and the statements that regressed.
+    """
+    comparison = {'statements': {}, 'regressions': []}
+
+    for statement, timing in results['statements'].items():
+        if statement not in baseline.get('statements', {}):
+            continue
+        previous = baseline['statements'][statement]['microseconds']
+        change = timing['microseconds'] / previous - 1 if previous else 0.0
+        comparison['statements'][statement] = change
+        if change > threshold:
+            comparison['regressions'].append(statement)
+
+    return comparison
+
+
+def main():
+    """
+    Runs the benchmarks.
+
+    Returns:
+        int: 1 if a regression was found when comparing, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(description='Benchmarks DSL Status import times.')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--compare', help='compare the results against this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='the fractional change that is a regression (default: 0.2)')
+    parser.add_argument('--runs', type=int, default=11,
+                        help='the fresh interpreters run for each import (default: 11)')
+    parser.add_argument('statements', nargs='*', default=DEFAULT_STATEMENTS,
+                        help='the import statements to benchmark')
+    arguments = parser.parse_args()
+
+    # Modules imported by an empty program are not counted.
+    startup_modules = set(import_times('pass'))
+
+    results = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'time': time.time(),
+        'statements': {
+            statement: benchmark_statement(statement, startup_modules, arguments.runs)
+            for statement in arguments.statements
+        }
+    }
+
+    # Save the results as a future baseline.
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=4)
+
+    # Compare the results against a baseline.
+    if arguments.compare:
+        with open(arguments.compare, encoding='utf-8') as baseline_file:
+            results['comparison'] = compare(results, json.load(baseline_file), arguments.threshold)
+
+    print(json.dumps(results, indent=4))
+
+    return 1 if results.get('comparison', {}).get('regressions') else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+This example archives the DrayTek® Vigor™ DSL Status broadcasts in a capture to a Parquet (or
+Arrow IPC) file for loading into analytics tools.
+"""
+
+# Segmented captures are directories.
+import os
+
+# The program arguments are read.
+import sys
+
+# The capture readers and the archive writer are in this package.
+from draytek_tools.dsl_status.archive import ArchiveWriter, read_archive
+from draytek_tools.dsl_status.capture import CaptureReader
+from draytek_tools.dsl_status.pcap import decode_capture
+
+
+def archive_capture(source, mac_address, path):
+    """
+    Archives the DSL Status messages in a capture.
+
+    This method takes a segmented capture directory or a pcap/pcapng file, decrypts every
+    broadcast and archives each message with its source IP address and when it was received.
+
+    Args:
+        source (string): The capture directory or pcap/pcapng file.
+        mac_address (string): The MAC address of the sending device.
+        path (string): The archive to create (ending .arrow for an Arrow IPC file).
+
+    Returns:
+        None
+    """
+    with ArchiveWriter(path) as writer:
+        # Read either kind of capture.
+        if os.path.isdir(source):
+            with CaptureReader(source) as reader:
+                for record in reader.read():
+                    # Skip any broadcasts that are not valid DSL Status messages.
+                    try:
+                        message = record.message(mac_address)
+                    except ValueError:
+                        continue
+                    writer.write(message, record.address[0], record.timestamp)
+        else:
+            for timestamp, address, message in decode_capture(source, mac_address):
+                writer.write(message, address[0], timestamp)
+
+    # Summarise the SNR of each device by reading back just the columns needed.
+    batch, devices, _ = read_archive(path, columns=('device', 'vdsl_snr_download'))
+    print(f'Archived {writer.written} messages to "{path}".')
+    for device in sorted(set(devices)):
+        snr = batch.vdsl_snr_download[devices == device]
+        print(f' {device}: {len(snr)} messages, VDSL SNR Download {snr.min()} to {snr.max()}')
+
+if __name__ == '__main__':
+
+    # Check whether the user has supplied the arguments.
+    if len(sys.argv) != 4:
+        print('Usage:')
+        print(f' {sys.argv[0]} <Capture Directory or pcap File> <MAC Address> <Archive File>\n')
+        print(f'e.g. {sys.argv[0]} captures aa:bb:cc:dd:ee:ff history.parquet')
+        sys.exit(1)
+
+    # Start archiving.
+    archive_capture(sys.argv[1], sys.argv[2], sys.argv[3])
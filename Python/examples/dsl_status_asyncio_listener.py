@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This example listens for DrayTek® Vigor™ DSL Status message broadcasts using asyncio.
+"""
+
+# The listener runs on an asyncio event loop.
+import asyncio
+
+# A device registry file can be supplied instead of a MAC address.
+import os
+
+# The program arguments are read.
+import sys
+
+# The asyncio DSL Status message listener and device registry are in this package.
+from draytek_tools.dsl_status.listener import Listener
+from draytek_tools.dsl_status.registry import DeviceRegistry
+
+
+async def receive_data(mac_address_or_path):
+    """
+    Listens to DSL Status message broadcasts on the network.
+
+    This method takes a MAC address (or a device registry file for many devices),
+    listens for DSL Status message broadcasts, decrypts them and displays them.
+
+    Args:
+        mac_address_or_path (string): The MAC address of the sending device or the path of a
+            device registry file.
+
+    Returns:
+        None
+    """
+
+    # Is this a device registry file (with a MAC address for each device)?
+    if os.path.isfile(mac_address_or_path):
+        listener = Listener(registry=DeviceRegistry.from_file(mac_address_or_path))
+    else:
+        listener = Listener(mac_address_or_path)
+
+    # Listen on all interfaces on port 4944 until the program is exited.
+    async with listener:
+        async for message, ip_address in listener:
+            # Notify the user a message has been received.
+            print(f'Received DSL Status message from {ip_address[0]}:')
+
+            # Output to console.
+            print('\n' + str(message))
+
+if __name__ == '__main__':
+
+    # Check whether the user has supplied a source MAC address or device registry file.
+    if len(sys.argv) != 2:
+        print('Usage:')
+        print(f' {sys.argv[0]} <MAC Address of Vigor™ DSL Modem or Device Registry File>\n')
+        print(f'e.g. {sys.argv[0]} aa:bb:cc:dd:ee:ff')
+        print(f'e.g. {sys.argv[0]} devices.ini')
+        sys.exit(1)
+
+    # Start listening for data.
+    asyncio.run(receive_data(sys.argv[1]))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+This example exports DrayTek® Vigor™ DSL Status broadcasts in a capture as JSON Lines or CSV.
+"""
+
+# Segmented captures are directories.
+import os
+
+# The program arguments are read.
+import sys
+
+# The capture readers and the serializers are in this package.
+from draytek_tools.dsl_status.capture import CaptureReader
+from draytek_tools.dsl_status.pcap import decode_capture
+from draytek_tools.dsl_status.serializers import CsvWriter, NdjsonWriter
+
+
+def _read_capture(directory, mac_address):
+    """
+    Decrypts the valid broadcasts in a segmented capture.
+
+    Args:
+        directory (string): The directory of the capture.
+        mac_address (string): The MAC address of the sending device.
+
+    Yields:
+        tuple: The timestamp, source address and Message of each valid broadcast.
+    """
+    with CaptureReader(directory) as reader:
+        for record in reader.read():
+            try:
+                yield record.timestamp, record.address, record.message(mac_address)
+            except ValueError:
+                continue
+
+
+def export_capture(source, mac_address, output_format):
+    """
+    Writes the DSL Status messages in a capture to the standard output.
+
+    This method takes a segmented capture directory or a pcap/pcapng file, decrypts every
+    broadcast and writes each message (with when and where it was received from) as a line.
+
+    Args:
+        source (string): The capture directory or pcap/pcapng file.
+        mac_address (string): The MAC address of the sending device.
+        output_format (string): Either "ndjson" or "csv".
+
+    Returns:
+        None
+    """
+
+    # Read either kind of capture.
+    if os.path.isdir(source):
+        records = _read_capture(source, mac_address)
+    else:
+        records = decode_capture(source, mac_address)
+
+    # Write each message after when it was received and its source IP address.
+    writer_class = CsvWriter if output_format == 'csv' else NdjsonWriter
+    with writer_class(extra_fields=('received', 'address')) as writer:
+        writer.write_many(
+            (timestamp, address[0], message) for timestamp, address, message in records
+        )
+
+if __name__ == '__main__':
+
+    # Check whether the user has supplied the arguments.
+    if len(sys.argv) != 4 or sys.argv[3] not in ('ndjson', 'csv'):
+        print('Usage:')
+        print(f' {sys.argv[0]} <Capture Directory or pcap File> <MAC Address> <ndjson|csv>\n')
+        print(f'e.g. {sys.argv[0]} captures aa:bb:cc:dd:ee:ff ndjson > messages.ndjson')
+        sys.exit(1)
+
+    # Start exporting.
+    export_capture(sys.argv[1], sys.argv[2], sys.argv[3])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+This example simulates a fleet of DrayTek® Vigor™ modems broadcasting DSL Status messages.
+"""
+
+# The fleet runs on an asyncio event loop.
+import asyncio
+
+# The results are output as JSON.
+import json
+
+# The program arguments are read.
+import sys
+
+# The virtual modem fleet is in this package.
+from draytek_tools.dsl_status.simulator import ModemFleet
+
+
+async def simulate_fleet(count, duration):
+    """
+    Sends DSL Status message broadcasts from a fleet of virtual modems on loopback.
+
+    This method takes a fleet size, runs the fleet (each modem from its own
+    127.1.x.x address) and prints the fleet's statistics.
+
+    Args:
+        count (int): The number of modems.
+        duration (float): The seconds to run for.
+
+    Returns:
+        None
+    """
+    fleet = ModemFleet(count)
+
+    # Output the MAC address and source address of each modem (for the collector's registry).
+    for modem in fleet.modems:
+        print(f'[{modem.name}]\nmac_address = {modem.mac_address}\n'
+              f'ip_address = {modem.source_address}\n')
+
+    # Run the fleet and output the results.
+    await fleet.run(duration)
+    print(json.dumps(fleet.stats(), indent=4))
+
+if __name__ == '__main__':
+
+    # Check whether the user has supplied the arguments.
+    if len(sys.argv) != 3:
+        print('Usage:')
+        print(f' {sys.argv[0]} <Modems> <Seconds>\n')
+        print(f'e.g. {sys.argv[0]} 500 60')
+        sys.exit(1)
+
+    # Start simulating the fleet.
+    asyncio.run(simulate_fleet(int(sys.argv[1]), float(sys.argv[2])))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+This example monitors DrayTek® Vigor™ DSL lines for drops, retrains, flapping, speed downgrades
+and silence using asyncio.
+"""
+
+# The listener runs on an asyncio event loop.
+import asyncio
+
+# A device registry file can be supplied instead of a MAC address.
+import os
+
+# The program arguments are read.
+import sys
+
+# The events are timestamped.
+import time
+
+# The asyncio DSL Status message listener, device registry and line state tracker are in this
+# package.
+from draytek_tools.dsl_status.linestate import LineStateTracker
+from draytek_tools.dsl_status.listener import Listener
+from draytek_tools.dsl_status.registry import DeviceRegistry
+
+
+def print_events(events):
+    """
+    Displays line events.
+
+    Args:
+        events (list): The LineEvent of each change.
+
+    Returns:
+        None
+    """
+    for event in events:
+        when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.time))
+        print(f'{when} {event.device}: {event.kind} {event.detail}')
+
+
+async def monitor_lines(mac_address_or_path):
+    """
+    Monitors the lines of the devices sending DSL Status message broadcasts on the network.
+
+    This method takes a MAC address (or a device registry file for many devices),
+    listens for DSL Status message broadcasts and displays every change of line state.
+
+    Args:
+        mac_address_or_path (string): The MAC address of the sending device or the path of a
+            device registry file.
+
+    Returns:
+        None
+    """
+    tracker = LineStateTracker()
+
+    # Track each message as it is received.
+    def track(message, ip_address):
+        print_events(tracker.update(ip_address[0], message))
+
+    # Is this a device registry file (with a MAC address for each device)?
+    if os.path.isfile(mac_address_or_path):
+        listener = Listener(
+            callback=track,
+            registry=DeviceRegistry.from_file(mac_address_or_path),
+            queue_size=1
+        )
+    else:
+        listener = Listener(mac_address_or_path, track, queue_size=1)
+
+    # Listen on all interfaces on port 4944 (checking for silent and stable lines every
+    # second) until the program is exited.
+    async with listener:
+        while True:
+            await asyncio.sleep(1)
+            print_events(tracker.advance())
+
+if __name__ == '__main__':
+
+    # Check whether the user has supplied a source MAC address or device registry file.
+    if len(sys.argv) != 2:
+        print('Usage:')
+        print(f' {sys.argv[0]} <MAC Address of Vigor™ DSL Modem or Device Registry File>\n')
+        print(f'e.g. {sys.argv[0]} aa:bb:cc:dd:ee:ff')
+        print(f'e.g. {sys.argv[0]} devices.ini')
+        sys.exit(1)
+
+    # Start monitoring.
+    asyncio.run(monitor_lines(sys.argv[1]))
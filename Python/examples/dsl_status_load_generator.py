@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+This example load tests DrayTek® Vigor™ DSL Status collectors with high rates of broadcasts.
+"""
+
+# The results are output as JSON.
+import json
+
+# The source is checked for being a capture.
+import os
+
+# The program arguments are read.
+import sys
+
+# The DSL Status load generator is in this package.
+from draytek_tools.dsl_status.replay import LoadGenerator
+
+
+def generate_load(source, host, rate, count):
+    """
+    Sends DSL Status message broadcasts on the network at a paced rate.
+
+    This method takes either a MAC address (to send synthetic messages) or a
+    capture (to replay), sends them to the target and prints how well the rate was kept.
+
+    Args:
+        source (string): The sending device's MAC address or the capture to replay.
+        host (string): The broadcast, unicast or loopback address to send to.
+        rate (float): The frames per second to send.
+        count (int): The number of frames to send.
+
+    Returns:
+        None
+    """
+
+    # An existing capture is replayed, otherwise synthetic messages are sent from the MAC address.
+    if os.path.exists(source):
+        generator = LoadGenerator.from_capture(source, host=host, rate=rate)
+    else:
+        generator = LoadGenerator.from_synthetic(source, host=host, rate=rate)
+
+    # Send the frames and output the results.
+    print(json.dumps(generator.run(count), indent=4))
+
+if __name__ == '__main__':
+
+    # Check whether the user has supplied the arguments.
+    if len(sys.argv) != 5:
+        print('Usage:')
+        print(f' {sys.argv[0]} <MAC Address or Capture> <Target Address> <Rate> <Count>\n')
+        print(f'e.g. {sys.argv[0]} aa:bb:cc:dd:ee:ff 127.0.0.1 20000 1000000')
+        sys.exit(1)
+
+    # Start generating load.
+    generate_load(sys.argv[1], sys.argv[2], float(sys.argv[3]), int(sys.argv[4]))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+This example records DrayTek® Vigor™ DSL Status message broadcasts for later analysis.
+"""
+
+# We use the system socket APIs to listen for network traffic.
+import socket
+
+# The program arguments are read.
+import sys
+
+# The DSL Status message capture writer is in this package.
+from draytek_tools.dsl_status.capture import CaptureWriter
+
+
+def record_data(directory):
+    """
+    Records DSL Status message broadcasts on the network.
+
+    This method takes a capture directory, listens for DSL Status
+    message broadcasts and appends them (still encrypted) to the capture.
+
+    Args:
+        directory (string): The directory of the capture.
+
+    Returns:
+        None
+    """
+
+    # Create a UDP socket to listen for DSL Status messages (and open the capture).
+    with (
+        socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock,
+        CaptureWriter(directory) as writer
+    ):
+        # Permit multiple receiver threads listening.
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        # Bind to all interfaces on port 4944.
+        sock.bind(('0.0.0.0', 4944))
+
+        # Keep recording messages until the program is exited.
+        while True:
+
+            # Attempt to receive a broadcast packet.
+            receive_buffer, ip_address = sock.recvfrom(116)
+
+            # Check to see if this would be the right length for a DSL Status message.
+            if len(receive_buffer) != 116:
+                # Wait for another message as this is not a DSL Status message.
+                continue
+
+            # Record the message (it is decrypted when the capture is read).
+            writer.append(receive_buffer, ip_address)
+
+            # Make the record visible to readers straight away.
+            writer.flush()
+
+if __name__ == '__main__':
+
+    # Check whether the user has supplied a capture directory.
+    if len(sys.argv) != 2:
+        print('Usage:')
+        print(f' {sys.argv[0]} <Capture Directory>\n')
+        print(f'e.g. {sys.argv[0]} captures')
+        sys.exit(1)
+
+    # Start recording data.
+    record_data(sys.argv[1])
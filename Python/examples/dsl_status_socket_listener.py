@@ -55,9 +55,6 @@ def receive_data(mac_address):
         # Maximum number of bytes to receive.
         max_receive_bytes = 116
 
-        # Obtain a list of valid DSL type values.
-        dsl_type_values = [dsl_type.value for dsl_type in dsl_status.Message.DslType]
-
         # Keep listening for messages until the program is exited.
         while True:
 
@@ -73,6 +70,14 @@ def receive_data(mac_address):
             print(f'Received UDP Datagram from {ip_address[0]} of correct size;'
                     f' using MAC address {mac_address} to decrypt contents:')
 
+            # Check the DSL type is valid (only decrypting the block it is in).
+            if not dsl_status.cryptography.quick_validate(mac_address, receive_buffer):
+                # Notify the user the payload failed validation.
+                print(' * Message failed DSL Type validation, check decryption key.\n')
+
+                # Wait for another message as this is not a valid DSL Status message.
+                continue
+
             # Perform the decryption.
             decrypted_payload = dsl_status.cryptography.decrypt_bytes(
                 mac_address,
@@ -86,14 +91,6 @@ def receive_data(mac_address):
             # print('Unpacked (Tuple):\n\n ' + str(unpacked_payload) + '\n')
             # print(' ->\n')
 
-            # Check the DSL type is valid.
-            if decrypted_payload[27] not in dsl_type_values:
-                # Notify the user the decrypted payload failed validation.
-                print(' * Message failed DSL Type validation, check decryption key.\n')
-
-                # Wait for another message as this is not a valid DSL Status message.
-                continue
-
             # Parse the DSL Status message.
             message = dsl_status.Message(decrypted_payload)
 
@@ -32,8 +32,8 @@ import sys
 # We use the sleep function to prevent flooding the receivers.
 from time import sleep
 
-# All the shared DrayTek® DSL Status message cryptographic functions are in this package.
-from draytek_tools.dsl_status import cryptography
+# The samples are encrypted once up front.
+from draytek_tools.dsl_status.replay import precompute_frames
 
 
 def send_data(mac_address):
@@ -73,6 +73,12 @@ def send_data(mac_address):
      '4d450000617667a00022eac00000000761990000'
     ]
 
+    # Encrypt the samples once for the specified MAC address (they never change).
+    encrypted_messages = precompute_frames(
+        mac_address,
+        [bytes.fromhex(message) for message in messages]
+    )
+
     # Create a UDP socket to send DSL Status messages.
     with socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP) as sock:
 
@@ -81,8 +87,8 @@ def send_data(mac_address):
 
         # Repeat until the program is exited.
         while True:
-            # Take each of our sample messages.
-            for message in messages:
+            # Take each of our encrypted sample messages.
+            for encrypted_message in encrypted_messages:
 
                 # Notify the user a DSL Status message is being sent.
                 print(
@@ -90,19 +96,11 @@ def send_data(mac_address):
                     ' - Sending DSL Status message sample via UDP broadcast.'
                 )
 
-                # Get the actual bytes for the current message.
-                message_bytes = bytes.fromhex(message)
-
-                # Get the encrypted payload for the specified MAC address.
-                encrypted_message = cryptography.encrypt_bytes(
-                    mac_address,
-                    message_bytes
-                )
-
                 # Send the DSL Status message to the broadcast address on UDP port 4944.
                 sock.sendto(encrypted_message, ('255.255.255.255', 4944))
 
                 # Wait 10 seconds to avoid flooding the broadcast receivers.
+                # (see dsl_status_load_generator.py for sending at high rates).
                 sleep(10)
 
 if __name__ == '__main__':
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This provides a table-driven AES-128 CBC decryption that needs no other packages.
+
+It is a Python 2.7 compatible copy of the library's pure Python AES backend (decryption only) so
+the EdgeRouter® scripts can decrypt DSL Status broadcasts in-process when PyCryptodome is not
+installed, rather than starting OpenSSL for every broadcast. Copy it alongside them.
+"""
+
+# We use the struct library to interpret bytes as packed binary data.
+import struct
+
+
+# Each block is four big-endian 32-bit columns.
+BLOCK_STRUCT = struct.Struct('>4I')
+
+# The number of rounds of AES-128.
+ROUNDS = 10
+
+
+def _multiply(a, b):
+    """
+    Multiplies two elements of the AES finite field GF(2^8).
+
+    Args:
+        a (int): The first element.
+        b (int): The second element.
+
+    Returns:
+        int: The product.
+    """
+    product = 0
+    while b:
+        if b & 1:
+            product ^= a
+        a = ((a << 1) ^ 0x11B) if a & 0x80 else a << 1
+        b >>= 1
+    return product
+
+
+def _build_tables():
+    """
+    Builds the S-boxes and the decryption round tables.
+
+    Returns:
+        tuple: The S-box, the inverse S-box and the 4 decryption tables.
+    """
+
+    # Powers of the generator 3 give every non-zero element, so inverses can be looked up.
+    powers = [0] * 255
+    logarithms = [0] * 256
+    value = 1
+    for exponent in range(255):
+        powers[exponent] = value
+        logarithms[value] = exponent
+        value ^= ((value << 1) ^ 0x11B) if value & 0x80 else value << 1
+
+    # The S-box is the multiplicative inverse followed by an affine transformation.
+    sbox = [0] * 256
+    inverse_sbox = [0] * 256
+    for value in range(256):
+        inverse = powers[-logarithms[value] % 255] if value else 0
+        substituted = inverse
+        for shift in range(1, 5):
+            substituted ^= ((inverse << shift) | (inverse >> (8 - shift))) & 0xFF
+        substituted ^= 0x63
+        sbox[value] = substituted
+        inverse_sbox[substituted] = value
+
+    # Each table is the previous one rotated right by a byte.
+    tables = [[
+        (_multiply(s, 14) << 24) | (_multiply(s, 9) << 16) | (_multiply(s, 13) << 8)
+        | _multiply(s, 11)
+        for s in inverse_sbox
+    ]]
+    for _ in range(3):
+        tables.append([(word >> 8) | ((word & 0xFF) << 24) for word in tables[-1]])
+
+    return sbox, inverse_sbox, tables
+
+
+SBOX, INVERSE_SBOX, (TD0, TD1, TD2, TD3) = _build_tables()
+
+
+def expand_key(key):
+    """
+    Expands an AES-128 key into the decryption round keys.
+
+    Args:
+        key (bytes): The 16 byte key.
+
+    Returns:
+        list: The 44 decryption round key words.
+
+    Raises:
+        ValueError: If the key is not 16 bytes.
+    """
+    if len(key) != 16:
+        raise ValueError('Incorrect AES key length.')
+
+    words = list(BLOCK_STRUCT.unpack(key))
+    round_constant = 1
+
+    for index in range(4, 4 * (ROUNDS + 1)):
+        word = words[index - 1]
+
+        # Every 4th word is rotated, substituted and has the round constant added.
+        if index % 4 == 0:
+            word = (
+                (SBOX[(word >> 16) & 0xFF] << 24) | (SBOX[(word >> 8) & 0xFF] << 16)
+                | (SBOX[word & 0xFF] << 8) | SBOX[word >> 24]
+            ) ^ (round_constant << 24)
+            round_constant = _multiply(round_constant, 2)
+
+        words.append(words[index - 4] ^ word)
+
+    # The equivalent inverse cipher uses the round keys in reverse with InvMixColumns applied to
+    # all but the first and last.
+    decryption_words = list(words[-4:])
+    for round_number in range(ROUNDS - 1, 0, -1):
+        for word in words[4 * round_number:4 * round_number + 4]:
+            decryption_words.append(
+                TD0[SBOX[word >> 24]] ^ TD1[SBOX[(word >> 16) & 0xFF]]
+                ^ TD2[SBOX[(word >> 8) & 0xFF]] ^ TD3[SBOX[word & 0xFF]]
+            )
+    decryption_words.extend(words[:4])
+
+    return decryption_words
+
+
+def decrypt_block(round_keys, s0, s1, s2, s3):
+    """
+    Decrypts a single block.
+
+    Args:
+        round_keys (list): The decryption round key words.
+        s0 (int): The first column of the block.
+        s1 (int): The second column of the block.
+        s2 (int): The third column of the block.
+        s3 (int): The fourth column of the block.
+
+    Returns:
+        tuple: The four columns of the decrypted block.
+    """
+    td0, td1, td2, td3 = TD0, TD1, TD2, TD3
+
+    s0 ^= round_keys[0]
+    s1 ^= round_keys[1]
+    s2 ^= round_keys[2]
+    s3 ^= round_keys[3]
+
+    for offset in range(4, 4 * ROUNDS, 4):
+        s0, s1, s2, s3 = (
+            td0[s0 >> 24] ^ td1[(s3 >> 16) & 0xFF] ^ td2[(s2 >> 8) & 0xFF] ^ td3[s1 & 0xFF]
+            ^ round_keys[offset],
+            td0[s1 >> 24] ^ td1[(s0 >> 16) & 0xFF] ^ td2[(s3 >> 8) & 0xFF] ^ td3[s2 & 0xFF]
+            ^ round_keys[offset + 1],
+            td0[s2 >> 24] ^ td1[(s1 >> 16) & 0xFF] ^ td2[(s0 >> 8) & 0xFF] ^ td3[s3 & 0xFF]
+            ^ round_keys[offset + 2],
+            td0[s3 >> 24] ^ td1[(s2 >> 16) & 0xFF] ^ td2[(s1 >> 8) & 0xFF] ^ td3[s0 & 0xFF]
+            ^ round_keys[offset + 3]
+        )
+
+    # The final round has no InvMixColumns.
+    inverse_sbox = INVERSE_SBOX
+    return (
+        ((inverse_sbox[s0 >> 24] << 24) | (inverse_sbox[(s3 >> 16) & 0xFF] << 16)
+         | (inverse_sbox[(s2 >> 8) & 0xFF] << 8) | inverse_sbox[s1 & 0xFF]) ^ round_keys[40],
+        ((inverse_sbox[s1 >> 24] << 24) | (inverse_sbox[(s0 >> 16) & 0xFF] << 16)
+         | (inverse_sbox[(s3 >> 8) & 0xFF] << 8) | inverse_sbox[s2 & 0xFF]) ^ round_keys[41],
+        ((inverse_sbox[s2 >> 24] << 24) | (inverse_sbox[(s1 >> 16) & 0xFF] << 16)
+         | (inverse_sbox[(s0 >> 8) & 0xFF] << 8) | inverse_sbox[s3 & 0xFF]) ^ round_keys[42],
+        ((inverse_sbox[s3 >> 24] << 24) | (inverse_sbox[(s2 >> 16) & 0xFF] << 16)
+         | (inverse_sbox[(s1 >> 8) & 0xFF] << 8) | inverse_sbox[s0 & 0xFF]) ^ round_keys[43]
+    )
+
+
+def decrypt_cbc(round_keys, iv, data):
+    """
+    Decrypts chained blocks (AES CBC).
+
+    Args:
+        round_keys (list): The decryption round key words (from expand_key).
+        iv (bytes): The 16 byte IV.
+        data (bytes): The cipher-text.
+
+    Returns:
+        bytes: The plain-text.
+
+    Raises:
+        ValueError: If the data is not a multiple of 16 bytes.
+    """
+    if len(data) % 16:
+        raise ValueError('Data must be a multiple of 16 bytes.')
+
+    output = bytearray(len(data))
+    p0, p1, p2, p3 = BLOCK_STRUCT.unpack(iv)
+
+    for offset in range(0, len(data), 16):
+        c0, c1, c2, c3 = BLOCK_STRUCT.unpack_from(data, offset)
+        s0, s1, s2, s3 = decrypt_block(round_keys, c0, c1, c2, c3)
+        BLOCK_STRUCT.pack_into(output, offset, s0 ^ p0, s1 ^ p1, s2 ^ p2, s3 ^ p3)
+        p0, p1, p2, p3 = c0, c1, c2, c3
+
+    return bytes(output)
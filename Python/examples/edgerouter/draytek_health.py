@@ -22,19 +22,37 @@ If the modem is reporting success then it returns a 0, otherwise it returns non-
 may then choose to initiate WAN failover.
 """
 
+# The decryption key is converted from hexadecimal.
+import binascii
+
 # We use the system socket APIs to listen for network traffic.
 import socket
 
-# We have to rely on calling OpenSSL as we cannot install packages.
+# OpenSSL is only called if neither AES implementation is available (and to write to the log).
 import subprocess
 
 # The program arguments are read.
 import sys
 
+# Use a native AES implementation if one is installed.
+try:
+    from Crypto.Cipher import AES
+except ImportError:
+    AES = None
+
+# Otherwise use the pure Python AES copied alongside this script.
+try:
+    import draytek_aes
+except ImportError:
+    draytek_aes = None
+
 
 # Get the key for your specific modem from the keygen script.
 DECRYPT_KEY = '31424143373742324339'
 
+# The key is zero padded to 128 bits (as OpenSSL does for -K) and is also the IV.
+DECRYPT_KEY_BYTES = binascii.unhexlify(DECRYPT_KEY).ljust(16, b'\0')
+
 # Pylint: f-string cannot be used in Python 2.x.
 # pylint: disable=consider-using-f-string
 
@@ -69,31 +87,42 @@ try:
             # Wait for another message as this is not a DSL Status message.
             continue
 
-        # Run the OpenSSL command using subprocess to perform the decryption.
-        # Pylint: Context manager for subprocess not available in Python 2.x.
-        # pylint: disable=consider-using-with
-        process = subprocess.Popen([
-            "openssl", "enc", "-d", "-aes-128-cbc",
-            "-K", DECRYPT_KEY,
-            "-iv", DECRYPT_KEY,
-            "-nopad"
-        ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        # pylint: enable=consider-using-with
-
-        # Pass the encrypted data through stdin and obtain the output and any errors.
-        stdout, stderr = process.communicate(input=receive_buffer[4:])
-
-        # Did OpenSSL fail to decrypt the contents?
-        if process.returncode != 0:
-            # Failed to decrypt (DSL status unknown); Write to log.
-            subprocess.call([
-                'logger',
-                '-t draytek_health',
-                'WLB: Decryption failed "{}".'.format(stderr)
-            ])
+        # Decrypt in-process if possible.
+        if AES is not None:
+            stdout = AES.new(
+                DECRYPT_KEY_BYTES, AES.MODE_CBC, DECRYPT_KEY_BYTES
+            ).decrypt(receive_buffer[4:])
+        elif draytek_aes is not None:
+            stdout = draytek_aes.decrypt_cbc(
+                draytek_aes.expand_key(DECRYPT_KEY_BYTES), DECRYPT_KEY_BYTES, receive_buffer[4:]
+            )
+        else:
+            # Run the OpenSSL command using subprocess to perform the decryption (a last resort
+            # if draytek_aes.py is missing).
+            # Pylint: Context manager for subprocess not available in Python 2.x.
+            # pylint: disable=consider-using-with
+            process = subprocess.Popen([
+                "openssl", "enc", "-d", "-aes-128-cbc",
+                "-K", DECRYPT_KEY,
+                "-iv", DECRYPT_KEY,
+                "-nopad"
+            ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            # pylint: enable=consider-using-with
+
+            # Pass the encrypted data through stdin and obtain the output and any errors.
+            stdout, stderr = process.communicate(input=receive_buffer[4:])
+
+            # Did OpenSSL fail to decrypt the contents?
+            if process.returncode != 0:
+                # Failed to decrypt (DSL status unknown); Write to log.
+                subprocess.call([
+                    'logger',
+                    '-t draytek_health',
+                    'WLB: Decryption failed "{}".'.format(stderr)
+                ])
 
-            # Return a DSL Status success out of caution.
-            sys.exit(0)
+                # Return a DSL Status success out of caution.
+                sys.exit(0)
 
         # Check the DSL type is valid.
         if stdout[27] not in [b'\x01', b'\x06']:
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+This asks draytek_healthd.py for the latest DrayTek® Vigor™ DSL Status of an interface.
+If the modem is reporting success then it returns a 0, otherwise it returns non-zero and EdgeOS®
+may then choose to initiate WAN failover.
+"""
+
+# We use the system socket APIs to ask the daemon.
+import socket
+
+# The program arguments are read.
+import sys
+
+# State changes are logged (without forking "logger").
+import syslog
+
+
+# The path of the daemon's Unix socket.
+SOCKET_PATH = '/var/run/draytek_health.sock'
+
+# Pylint: f-string cannot be used in Python 2.x.
+# pylint: disable=consider-using-f-string
+
+# Check whether the user has invoked this directly.
+if len(sys.argv) != 4:
+    print('Usage: {} <load_balance_group> <test_interface> <current_status>'.format(sys.argv[0]))
+    sys.exit(1)
+
+syslog.openlog('draytek_health')
+
+# Ask the daemon about the interface.
+sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+sock.settimeout(2)
+
+try:
+    sock.connect(SOCKET_PATH)
+    sock.sendall(sys.argv[2].encode('ascii') + b'\n')
+    reply = sock.makefile('rb').readline().decode('ascii', 'replace').strip()
+except socket.error as error:
+    # PyLint: Not a constant; false positive.
+    # pylint: disable=invalid-name
+    reply = '1 Unable to contact draytek_healthd ({}).'.format(error)
+finally:
+    # Clean up any resources.
+    sock.close()
+
+# The reply is the exit status and a description.
+code, _, description = reply.partition(' ')
+
+# Check the DSL status.
+if code == '0':
+
+    # If the connection is not marked as currently okay, log that it now seems okay.
+    if sys.argv[3] != 'OK':
+        syslog.syslog('WLB: Load-Balance group {} interface {} ({}) DSL status now good.'.format(
+            sys.argv[1],
+            sys.argv[2],
+            sys.argv[3]
+        ))
+
+    # Return Success.
+    sys.exit(0)
+
+# Failed; Write to log.
+syslog.syslog('WLB: Load-Balance group {} interface {} ({}) DSL status bad ({}).'.format(
+    sys.argv[1],
+    sys.argv[2],
+    sys.argv[3],
+    description
+))
+
+# Return failure.
+sys.exit(1)
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+This keeps listening for DrayTek® Vigor™ DSL Status message broadcasts and answers health checks
+about them over a Unix socket (see draytek_health_client.py).
+
+Unlike draytek_health.py (which waits up to 11 seconds for a broadcast on every check), the
+listening socket stays open, the key stays loaded and the latest status of each modem is kept, so
+a check is answered straight away. Broadcasts are decrypted in-process with PyCryptodome (or
+PyCrypto) if it is installed, otherwise with draytek_aes.py (which must be copied alongside), and
+only with OpenSSL if neither is available.
+"""
+
+# The command line arguments are parsed.
+import argparse
+
+# The decryption key is converted from hexadecimal (once, when the daemon starts).
+import binascii
+
+# Any stale Unix socket is removed.
+import os
+
+# Both sockets are waited on together.
+import select
+
+# The daemon stops cleanly when terminated.
+import signal
+
+# We use the system socket APIs to listen for network traffic and health checks.
+import socket
+
+# OpenSSL is only called if neither AES implementation is available.
+import subprocess
+
+# The daemon exits when it stops.
+import sys
+
+# State changes are logged (without forking "logger").
+import syslog
+
+# The age of each status is tracked.
+import time
+
+# Use a native AES implementation if one is installed.
+try:
+    from Crypto.Cipher import AES
+except ImportError:
+    AES = None
+
+# Otherwise use the pure Python AES copied alongside this script.
+try:
+    import draytek_aes
+except ImportError:
+    draytek_aes = None
+
+
+# Get the key for your specific modem from the keygen script.
+DECRYPT_KEY = '31424143373742324339'
+
+# The key is zero padded to 128 bits (as OpenSSL does for -K) and is also the IV.
+DECRYPT_KEY_BYTES = binascii.unhexlify(DECRYPT_KEY).ljust(16, b'\0')
+
+# The pure Python AES round keys are also only expanded once.
+DECRYPT_ROUND_KEYS = None if draytek_aes is None else draytek_aes.expand_key(DECRYPT_KEY_BYTES)
+
+# The default path of the Unix socket health checks are answered on.
+DEFAULT_SOCKET_PATH = '/var/run/draytek_health.sock'
+
+# The modem should broadcast every 10 seconds, so a status older than this has timed out.
+DEFAULT_MAX_AGE = 11
+
+# Maximum number of bytes to receive.
+MAX_RECEIVE_BYTES = 116
+
+# Pylint: f-string cannot be used in Python 2.x.
+# pylint: disable=consider-using-f-string
+
+
+def decrypt_status(payload):
+    """
+    Decrypts a DSL Status broadcast and obtains its DSL type and status.
+
+    Args:
+        payload (bytes): The 116 byte broadcast.
+
+    Returns:
+        tuple: The DSL type (int) and status (str), or None if decryption failed.
+    """
+
+    if AES is not None:
+        plaintext = AES.new(
+            DECRYPT_KEY_BYTES, AES.MODE_CBC, DECRYPT_KEY_BYTES
+        ).decrypt(payload[4:])
+    elif draytek_aes is not None:
+        plaintext = draytek_aes.decrypt_cbc(DECRYPT_ROUND_KEYS, DECRYPT_KEY_BYTES, payload[4:])
+    else:
+        # Starting OpenSSL for every broadcast is a last resort (if draytek_aes.py is missing).
+        # Pylint: Context manager for subprocess not available in Python 2.x.
+        # pylint: disable=consider-using-with
+        process = subprocess.Popen([
+            'openssl', 'enc', '-d', '-aes-128-cbc',
+            '-K', DECRYPT_KEY,
+            '-iv', DECRYPT_KEY,
+            '-nopad'
+        ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # pylint: enable=consider-using-with
+
+        # Pass the encrypted data through stdin and obtain the output and any errors.
+        plaintext, stderr = process.communicate(input=payload[4:])
+
+        # Did OpenSSL fail to decrypt the contents?
+        if process.returncode != 0:
+            syslog.syslog('WLB: Decryption failed "{}".'.format(stderr))
+            return None
+
+    # Only obtain the DSL type and status (bytearray indexing is the same in Python 2.x and 3.x).
+    dsl_type = bytearray(plaintext)[27]
+    status = plaintext[86:112].split(b'\0', 1)[0].decode('ascii', 'replace')
+
+    return dsl_type, status
+
+
+class HealthDaemon(object):
+    """
+    A class to keep the latest DSL Status of each modem and answer health checks about it.
+    """
+
+    # pylint: disable=useless-object-inheritance
+    def __init__(self, socket_path, max_age, interfaces):
+        """
+        Initialize the daemon.
+
+        Args:
+            socket_path (str): The path of the Unix socket to answer health checks on.
+            max_age (float): The seconds before a status has timed out.
+            interfaces (dict): The modem IP address of each interface (any interface not
+                listed uses the latest status of any modem).
+        """
+        self.socket_path = socket_path
+        self.max_age = max_age
+        self.interfaces = interfaces
+
+        # The latest (time received, healthy, description) of each modem and of any modem.
+        self.statuses = {}
+        self.latest = None
+
+    def receive_broadcast(self, sock):
+        """
+        Receives and records a DSL Status broadcast.
+
+        Args:
+            sock (socket.socket): The UDP socket with a broadcast waiting.
+        """
+        receive_buffer, address = sock.recvfrom(MAX_RECEIVE_BYTES)
+
+        # Check to see if this would be the right length for a DSL Status message.
+        if len(receive_buffer) != 116:
+            return
+
+        decrypted = decrypt_status(receive_buffer)
+
+        # Failed to decrypt (DSL status unknown); Report success out of caution.
+        if decrypted is None:
+            status = (time.time(), True, 'Decryption failed.')
+        else:
+            dsl_type, decrypted_status = decrypted
+
+            # Check the DSL type is valid.
+            if dsl_type not in (1, 6):
+                return
+
+            status = (time.time(), decrypted_status == 'SHOWTIME', decrypted_status)
+
+        # Log any change of health.
+        previous = self.statuses.get(address[0])
+        if previous is None or previous[1] != status[1] or previous[2] != status[2]:
+            syslog.syslog('WLB: Modem {} DSL status now {} ({}).'.format(
+                address[0],
+                'good' if status[1] else 'bad',
+                status[2]
+            ))
+
+        self.statuses[address[0]] = status
+        self.latest = status
+
+    def check(self, interface):
+        """
+        Checks the health of an interface.
+
+        Args:
+            interface (str): The interface being checked.
+
+        Returns:
+            str: "0 <description>" if healthy, otherwise "1 <description>".
+        """
+        if interface in self.interfaces:
+            status = self.statuses.get(self.interfaces[interface])
+        else:
+            status = self.latest
+
+        # No recent broadcast has been received.
+        if status is None or time.time() - status[0] > self.max_age:
+            return '1 Timeout waiting for DSL status.'
+
+        return '{} {}'.format(0 if status[1] else 1, status[2])
+
+    def answer_check(self, server):
+        """
+        Answers a health check.
+
+        Args:
+            server (socket.socket): The Unix socket with a client waiting.
+        """
+        client, _ = server.accept()
+        try:
+            client.settimeout(1)
+            interface = client.recv(256).decode('ascii', 'replace').strip()
+            client.sendall((self.check(interface) + '\n').encode('ascii', 'replace'))
+        except socket.error:
+            pass
+        finally:
+            client.close()
+
+    def run(self):
+        """
+        Listens for broadcasts and answers health checks until terminated.
+        """
+
+        # Create a UDP socket to listen for DSL Status messages.
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        # Permit multiple receiver threads listening.
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        # Bind to all interfaces on port 4944.
+        sock.bind(('0.0.0.0', 4944))
+
+        # Create the Unix socket the health checks are answered on (replacing any stale one).
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(8)
+
+        try:
+            while True:
+                readable, _, _ = select.select([sock, server], [], [])
+
+                if sock in readable:
+                    self.receive_broadcast(sock)
+
+                if server in readable:
+                    self.answer_check(server)
+        finally:
+            # Clean up any resources.
+            sock.close()
+            server.close()
+            os.unlink(self.socket_path)
+
+
+def stop(_signal_number, _frame):
+    """
+    Stops the daemon when it is terminated.
+
+    Args:
+        _signal_number (int): The signal received.
+        _frame (frame): The interrupted stack frame.
+    """
+    sys.exit(0)
+
+
+def interface_mapping(argument):
+    """
+    Parses an interface's modem IP address argument.
+
+    Args:
+        argument (str): The argument (e.g. pppoe0=192.168.1.1).
+
+    Returns:
+        tuple: The interface name and modem IP address.
+
+    Raises:
+        argparse.ArgumentTypeError: If the argument is not an interface name and IP address
+                                    separated by "=".
+    """
+    interface, separator, ip_address = argument.partition('=')
+
+    # Both the interface and the IP address are required.
+    if not separator or not interface or not ip_address:
+        raise argparse.ArgumentTypeError(
+            '"{}" is not in the form INTERFACE=MODEM_IP.'.format(argument)
+        )
+
+    return interface, ip_address
+
+
+def main():
+    """
+    Runs the daemon.
+    """
+    parser = argparse.ArgumentParser(description='Answers DrayTek DSL Status health checks.')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH,
+                        help='the Unix socket path (default: {})'.format(DEFAULT_SOCKET_PATH))
+    parser.add_argument('--max-age', type=float, default=DEFAULT_MAX_AGE,
+                        help='the seconds before a status times out (default: 11)')
+    parser.add_argument('interfaces', nargs='*', type=interface_mapping,
+                        metavar='INTERFACE=MODEM_IP',
+                        help='the modem IP address of an interface (e.g. pppoe0=192.168.1.1)')
+    arguments = parser.parse_args()
+
+    # Each interface can only have one modem.
+    interfaces = dict(arguments.interfaces)
+    if len(interfaces) != len(arguments.interfaces):
+        parser.error('each interface can only be given once')
+
+    syslog.openlog('draytek_health')
+    signal.signal(signal.SIGTERM, stop)
+
+    HealthDaemon(
+        arguments.socket,
+        arguments.max_age,
+        interfaces
+    ).run()
+
+if __name__ == '__main__':
+    main()
@@ -22,9 +22,85 @@ A module for interacting with DrayTek® Vigor™'s DSL Status broadcast packets.
 This module provides functionality to interact with DrayTek® Vigor™'s DSL Status broadcast packets.
 """
 
-# Allow the user to use cryptography and Message by just importing draytek_tools.dsl_status.
-from . import cryptography
-from .message import Message
+# Allow the user to use cryptography, Message and the rest of the public API by just importing
+# draytek_tools.dsl_status. Each is only imported the first time it is used (PEP 562), so a
+# short-lived program only pays for the parts it uses (e.g. not AES for MessageView).
+from importlib import import_module
+
+# The module (relative to this package) that provides each name in the public API.
+_LAZY_ATTRIBUTES = {
+    'archive': '.archive',
+    'backends': '.backends',
+    'batch': '.batch',
+    'capture': '.capture',
+    'cryptography': '.cryptography',
+    'dedup': '.dedup',
+    'exporter': '.exporter',
+    'instrumentation': '.instrumentation',
+    'linestate': '.linestate',
+    'listener': '.listener',
+    'message': '.message',
+    'message_view': '.message_view',
+    'pcap': '.pcap',
+    'receiver': '.receiver',
+    'registry': '.registry',
+    'replay': '.replay',
+    'rolling': '.rolling',
+    'serializers': '.serializers',
+    'simulator': '.simulator',
+    'ArchiveWriter': '.archive',
+    'BatchListener': '.listener',
+    'CaptureReader': '.capture',
+    'CaptureWriter': '.capture',
+    'ChangeFilter': '.dedup',
+    'CsvWriter': '.serializers',
+    'DecodeCache': '.dedup',
+    'DeviceRegistry': '.registry',
+    'LineStateTracker': '.linestate',
+    'Listener': '.listener',
+    'LoadGenerator': '.replay',
+    'Message': '.message',
+    'MessageBatch': '.batch',
+    'MessageView': '.message_view',
+    'MetricsExporter': '.exporter',
+    'ModemFleet': '.simulator',
+    'NdjsonWriter': '.serializers',
+    'RollingStatistics': '.rolling',
+}
 
 # Declare what should be offered in the public API when a wildcard import statement is used.
-__all__ = ['cryptography', 'Message']
+__all__ = ['cryptography', 'Message', 'MessageView']
+
+
+def __getattr__(name):
+    """
+    Imports a name in the public API the first time it is used.
+
+    Args:
+        name (str): The name being looked up.
+
+    Returns:
+        object: The module or attribute.
+
+    Raises:
+        AttributeError: If the name is not in the public API.
+    """
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    module = import_module(_LAZY_ATTRIBUTES[name], __name__)
+    value = module if module.__name__.rpartition('.')[2] == name else getattr(module, name)
+
+    # Later lookups find the value directly.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """
+    Lists the names in this package (including those not imported yet).
+
+    Returns:
+        list: The names.
+    """
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
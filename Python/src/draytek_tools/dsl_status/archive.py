@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Archive Module.
+This module provides methods for archiving DSL Status messages to columnar files for analysis.
+
+Messages are written (with the device they came from and when they were received) to Parquet
+files, or to Arrow IPC files (see ARROW_SUFFIXES). They are buffered and written a chunk at a
+time. In a Parquet file each chunk is a compressed row group with its own column statistics, so
+queries on the device or receive time can skip whole row groups. The repeated strings are
+dictionary encoded in Parquet files (Arrow IPC files only allow one dictionary per column, so
+they hold plain strings and rely on compression instead).
+"""
+
+# The receive time filters are converted to dates.
+import datetime
+
+# Messages without a receive time are given the current time.
+import time
+
+# Performs the vectorized column conversions ("pip install numpy" if getting import errors).
+import numpy
+
+# Reads and writes the columnar files ("pip install pyarrow" if getting import errors).
+import pyarrow
+from pyarrow import dataset
+from pyarrow import ipc
+from pyarrow import parquet
+
+# The messages are converted to and from batches.
+from .batch import MessageBatch
+from .message import Message
+
+
+# The default number of messages in each chunk (Parquet row group or Arrow record batch).
+DEFAULT_CHUNK_SIZE = 65536
+
+# The file suffixes written in the Arrow IPC file format (anything else is Parquet).
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+
+# The receive times are stored in UTC.
+_UTC = datetime.timezone.utc
+
+# Dictionary encoded strings (most devices report the same few strings over and over).
+_DICTIONARY = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+
+# The archive columns (the device, when its message was received and then the message fields).
+SCHEMA = pyarrow.schema(
+    [
+        ('device', _DICTIONARY),
+        ('received', pyarrow.timestamp('us', tz='UTC'))
+    ] + [
+        (name, _DICTIONARY if name in Message.STRING_ATTRIBUTES else pyarrow.int32())
+        for name in Message.ATTRIBUTES
+    ]
+)
+
+# The archive columns of Arrow IPC files (with plain strings).
+ARROW_SCHEMA = pyarrow.schema(
+    [
+        (field.name, pyarrow.string() if field.type == _DICTIONARY else field.type)
+        for field in SCHEMA
+    ]
+)
+
+
+def _file_format(path, file_format):
+    """
+    Determines the format of an archive.
+
+    Args:
+        path (str): The path of the archive.
+        file_format (str): 'parquet', 'arrow' or None to use the path's suffix.
+
+    Returns:
+        str: Either 'parquet' or 'arrow'.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if file_format is None:
+        return 'arrow' if str(path).lower().endswith(ARROW_SUFFIXES) else 'parquet'
+
+    if file_format not in ('parquet', 'arrow'):
+        raise ValueError(f'The "{file_format}" archive format is not supported.')
+
+    return file_format
+
+
+def _per_message(value, count):
+    """
+    Expands a value shared by every message into one value per message.
+
+    Args:
+        value (object or sequence): A single value or a sequence of a value per message.
+        count (int): The number of messages.
+
+    Returns:
+        list: A value for each message.
+
+    Raises:
+        ValueError: If a sequence does not have a value for every message.
+    """
+    if isinstance(value, (str, bytes, int, float)) or value is None:
+        return [value] * count
+
+    values = list(value)
+    if len(values) != count:
+        raise ValueError(f'{count} values are required (one for each message).')
+    return values
+
+
+def _encode_strings(column):
+    """
+    Converts a string column to a dictionary encoded Arrow array (decoding each distinct string
+    once).
+
+    Args:
+        column (numpy.ndarray): The truncated byte strings.
+
+    Returns:
+        pyarrow.DictionaryArray: The strings.
+    """
+    distinct, indexes = numpy.unique(column, return_inverse=True)
+
+    # Latin-1 maps every byte to a character, so the strings read back exactly as they were.
+    return pyarrow.DictionaryArray.from_arrays(
+        pyarrow.array(indexes.astype(numpy.int32).reshape(-1)),
+        pyarrow.array([value.decode('latin-1') for value in distinct.tolist()], pyarrow.string())
+    )
+
+
+def _decode_strings(column, dtype):
+    """
+    Converts an Arrow string column to a NumPy array (converting each distinct string once).
+
+    Args:
+        column (pyarrow.Array or pyarrow.ChunkedArray): The (possibly dictionary encoded)
+            strings.
+        dtype (numpy.dtype): The byte string type of a MessageBatch field, or object for
+            Python strings.
+
+    Returns:
+        numpy.ndarray: The strings.
+    """
+    parts = []
+    for chunk in getattr(column, 'chunks', (column,)):
+        # Plain strings (from Arrow IPC files) are dictionary encoded first.
+        if not pyarrow.types.is_dictionary(chunk.type):
+            chunk = chunk.dictionary_encode()
+
+        # Latin-1 converts the strings back to exactly the bytes they were written from.
+        values = chunk.dictionary.to_pylist()
+        if dtype != object:
+            values = [value.encode('latin-1') for value in values]
+
+        parts.append(
+            numpy.array(values, dtype=dtype)[chunk.indices.to_numpy(zero_copy_only=False)]
+        )
+
+    return numpy.concatenate(parts) if parts else numpy.empty(0, dtype=dtype)
+
+
+def _to_arrays(payloads, devices, received):
+    """
+    Converts decrypted messages to Arrow columns.
+
+    Args:
+        payloads (bytes, bytearray or memoryview): A contiguous buffer of DSL Status messages.
+        devices (list): The device of each message.
+        received (list): When each message was received (seconds since the epoch).
+
+    Returns:
+        list: The Arrow array of each column in SCHEMA.
+    """
+    batch = MessageBatch.from_bytes(payloads)
+
+    arrays = [
+        pyarrow.array(devices, pyarrow.string()).dictionary_encode(),
+        pyarrow.array(
+            (numpy.asarray(received, dtype=numpy.float64) * 1000000).astype(numpy.int64),
+            SCHEMA.field('received').type
+        )
+    ]
+
+    # The integers are stored in network byte order so are converted to native integers.
+    for name in Message.ATTRIBUTES:
+        column = getattr(batch, name)
+        if name in Message.STRING_ATTRIBUTES:
+            arrays.append(_encode_strings(column))
+        else:
+            arrays.append(pyarrow.array(column.astype(numpy.int32)))
+
+    return arrays
+
+
+def _to_batch(table):
+    """
+    Converts the message columns of an Arrow table (or record batch) to a MessageBatch.
+
+    Args:
+        table (pyarrow.Table or pyarrow.RecordBatch): The archive columns.
+
+    Returns:
+        tuple: The MessageBatch (with every field not read left as zero), the device of each
+               message (or None if not read) and when each message was received as seconds
+               since the epoch (or None if not read).
+    """
+    records = numpy.zeros(table.num_rows, dtype=MessageBatch.DTYPE)
+    devices = None
+    received = None
+
+    for name in table.column_names:
+        column = table.column(name)
+        if name == 'device':
+            devices = _decode_strings(column, object)
+        elif name == 'received':
+            received = column.cast(pyarrow.int64()).to_numpy() / 1000000
+        elif name in Message.STRING_ATTRIBUTES:
+            records[name] = _decode_strings(column, MessageBatch.DTYPE.fields[name][0])
+        else:
+            records[name] = column.to_numpy()
+
+    return MessageBatch(records), devices, received
+
+
+class ArchiveWriter:
+    """
+    A class to write DSL Status messages to a compressed columnar archive a chunk at a time.
+
+    Only the current chunk is held in memory (112 bytes per message plus its device and receive
+    time), however many messages are archived.
+    """
+
+    def __init__(
+        self,
+        path,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        compression='zstd',
+        file_format=None
+    ):
+        """
+        Initialize an archive writer (overwriting any existing file).
+
+        Args:
+            path (str): The path of the archive.
+            chunk_size (int, optional): The number of messages in each chunk (Parquet row group or
+                Arrow record batch). Defaults to 65536.
+            compression (str, optional): The compression codec ('zstd' or 'lz4' for either
+                format, or any Parquet codec). Defaults to 'zstd'.
+            file_format (str, optional): 'parquet' or 'arrow'.
+                Defaults to None which uses the path's suffix (see ARROW_SUFFIXES).
+
+        Raises:
+            ValueError: If the chunk size is less than 1 or the format is not supported.
+        """
+
+        # A chunk must hold at least one message.
+        if chunk_size < 1:
+            raise ValueError('The chunk size must be at least 1.')
+
+        self.path = path
+        self.chunk_size = chunk_size
+        self.file_format = _file_format(path, file_format)
+        self.written = 0
+
+        # Parquet writes column statistics for every row group.
+        if self.file_format == 'parquet':
+            self.schema = SCHEMA
+            self._writer = parquet.ParquetWriter(
+                path,
+                SCHEMA,
+                compression=compression,
+                write_statistics=True
+            )
+        else:
+            self.schema = ARROW_SCHEMA
+            self._writer = ipc.new_file(
+                path,
+                ARROW_SCHEMA,
+                options=ipc.IpcWriteOptions(compression=compression)
+            )
+
+        # The messages of the current chunk.
+        self._payloads = bytearray()
+        self._devices = []
+        self._received = []
+
+    def write(self, message, device, received=None):
+        """
+        Buffers a message, writing the chunk once it is full.
+
+        Args:
+            message (Message or MessageView): The DSL Status message.
+            device (str): The device that sent the message (e.g. its name or IP address).
+            received (float, optional): When the message was received (seconds since the
+                epoch). Defaults to None which uses the current time.
+        """
+        self._payloads += message.convert_to_bytes()
+        self._devices.append(device)
+        self._received.append(time.time() if received is None else received)
+
+        if len(self._devices) >= self.chunk_size:
+            self.flush()
+
+    def write_payloads(self, payloads, device, received=None, statuses=None):
+        """
+        Buffers every message in a contiguous buffer of decrypted 112 byte DSL Status messages.
+
+        Args:
+            payloads (bytes, bytearray or memoryview): The contiguous buffer of messages.
+            device (str or sequence): The device that sent every message, or a sequence of the
+                device of each message.
+            received (float or sequence, optional): When every message was received, or a
+                sequence of when each message was received (seconds since the epoch).
+                Defaults to None which uses the current time.
+            statuses (bytearray, optional):
+                The status of each message (as returned by cryptography.decrypt_many); only
+                the messages with a status of cryptography.STATUS_OK are written.
+                Defaults to None which writes every message.
+
+        Raises:
+            ValueError: If the buffer is not a multiple of the message length or a sequence does
+                        not have a value for every message.
+        """
+        length = Message.STRUCT.size
+
+        # DSL Status messages, as fixed binary data structures, must be a specific length.
+        if len(payloads) % length != 0:
+            raise ValueError('Incorrect number of bytes received.')
+
+        count = len(payloads) // length
+        devices = _per_message(device, count)
+        received = _per_message(time.time() if received is None else received, count)
+
+        # Only keep the messages that were successfully decrypted.
+        if statuses is None:
+            indexes = range(count)
+        else:
+            indexes = [index for index in range(count) if statuses[index] == 0]
+
+        # Fill each chunk in as few copies as possible.
+        view = memoryview(payloads).cast('B')
+        position = 0
+        while position < len(indexes):
+            take = min(self.chunk_size - len(self._devices), len(indexes) - position)
+            selected = indexes[position:position + take]
+
+            if statuses is None:
+                self._payloads += view[selected[0] * length:(selected[-1] + 1) * length]
+            else:
+                for index in selected:
+                    self._payloads += view[index * length:(index + 1) * length]
+            self._devices.extend(devices[index] for index in selected)
+            self._received.extend(received[index] for index in selected)
+            position += take
+
+            if len(self._devices) >= self.chunk_size:
+                self.flush()
+
+    def write_batch(self, batch, device, received=None):
+        """
+        Buffers every message in a batch.
+
+        Args:
+            batch (MessageBatch): The batch of DSL Status messages.
+            device (str or sequence): The device that sent every message, or a sequence of the
+                device of each message.
+            received (float or sequence, optional): When every message was received, or a
+                sequence of when each message was received (seconds since the epoch).
+                Defaults to None which uses the current time.
+        """
+        self.write_payloads(batch.to_bytes(), device, received)
+
+    def flush(self):
+        """
+        Writes the buffered messages as a chunk.
+        """
+        if not self._devices:
+            return
+
+        arrays = _to_arrays(self._payloads, self._devices, self._received)
+
+        # Arrow IPC files take the strings as they are.
+        if self.schema is ARROW_SCHEMA:
+            arrays = [array.cast(field.type) for array, field in zip(arrays, ARROW_SCHEMA)]
+
+        chunk = pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema)
+        self._writer.write_batch(chunk)
+        self.written += chunk.num_rows
+
+        self._payloads = bytearray()
+        self._devices = []
+        self._received = []
+
+    def close(self):
+        """
+        Writes any buffered messages and finishes the archive.
+        """
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        """
+        Returns this writer when entering a "with" block.
+
+        Returns:
+            ArchiveWriter: This writer.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Finishes the archive when leaving a "with" block.
+        """
+        self.close()
+
+
+def _open_dataset(path, file_format):
+    """
+    Opens an archive for reading.
+
+    Args:
+        path (str): The path of the archive.
+        file_format (str): 'parquet', 'arrow' or None to use the path's suffix.
+
+    Returns:
+        pyarrow.dataset.Dataset: The archive.
+    """
+    return dataset.dataset(
+        path,
+        format='ipc' if _file_format(path, file_format) == 'arrow' else 'parquet'
+    )
+
+
+def _filter(devices, start, end):
+    """
+    Builds the filter of the messages to read.
+
+    Args:
+        devices (iterable): The devices to read (None for every device).
+        start (float): The earliest receive time to read (None for no limit).
+        end (float): The latest receive time to read, exclusive (None for no limit).
+
+    Returns:
+        pyarrow.dataset.Expression: The filter (or None to read every message).
+    """
+    conditions = []
+    if devices is not None:
+        conditions.append(dataset.field('device').isin(list(devices)))
+    if start is not None:
+        conditions.append(
+            dataset.field('received') >= datetime.datetime.fromtimestamp(start, _UTC)
+        )
+    if end is not None:
+        conditions.append(dataset.field('received') < datetime.datetime.fromtimestamp(end, _UTC))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+# The readers take the same (mostly optional) filters.
+# pylint: disable=too-many-arguments
+def read_archive(path, columns=None, devices=None, start=None, end=None, file_format=None):
+    """
+    Reads selected columns of an archive into a MessageBatch.
+
+    Only the columns asked for are read and (in Parquet archives) row groups whose statistics
+    rule out the devices or receive times asked for are skipped.
+
+    Args:
+        path (str): The path of the archive.
+        columns (iterable, optional): The columns to read ('device', 'received' and any
+            Message attributes). Defaults to None which reads every column.
+        devices (iterable, optional): The devices to read. Defaults to None (every device).
+        start (float, optional): The earliest receive time to read (seconds since the epoch).
+            Defaults to None.
+        end (float, optional): The latest receive time to read (exclusive).
+            Defaults to None.
+        file_format (str, optional): 'parquet' or 'arrow'.
+            Defaults to None which uses the path's suffix.
+
+    Returns:
+        tuple: The MessageBatch (with every field not read left as zero), the device of each
+               message (or None if not read) and when each message was received as seconds
+               since the epoch (or None if not read).
+    """
+    table = _open_dataset(path, file_format).to_table(
+        columns=None if columns is None else list(columns),
+        filter=_filter(devices, start, end)
+    )
+    return _to_batch(table)
+
+
+def read_archive_chunks(path, columns=None, devices=None, start=None, end=None, file_format=None):
+    """
+    Reads selected columns of an archive a chunk at a time (so memory stays bounded).
+
+    Args:
+        path (str): The path of the archive.
+        columns (iterable, optional): The columns to read. Defaults to None (every column).
+        devices (iterable, optional): The devices to read. Defaults to None (every device).
+        start (float, optional): The earliest receive time to read (seconds since the epoch).
+            Defaults to None.
+        end (float, optional): The latest receive time to read (exclusive).
+            Defaults to None.
+        file_format (str, optional): 'parquet' or 'arrow'.
+            Defaults to None which uses the path's suffix.
+
+    Yields:
+        tuple: The MessageBatch, devices and receive times of each chunk (as read_archive).
+    """
+    for chunk in _open_dataset(path, file_format).to_batches(
+        columns=None if columns is None else list(columns),
+        filter=_filter(devices, start, end)
+    ):
+        if chunk.num_rows:
+            yield _to_batch(chunk)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status AES Backends Package.
+This package provides interchangeable AES-128 implementations for the cryptography module.
+
+Each backend module has a NAME and two functions: new_ecb(key), returning a stateless cipher, and
+new_cbc(key, iv), returning a cipher that chains across calls. Both ciphers have encrypt(data) and
+decrypt(data) methods taking whole 16 byte blocks.
+"""
+
+# Backends are only imported when they are probed.
+import importlib
+
+# Backends are timed to select the fastest.
+import time
+
+
+# The backends in order of preference (the pure Python backend works everywhere but is slowest).
+BACKEND_NAMES = ('pycryptodome', 'pyca', 'pure')
+
+# The backend that is only used when no native backend is installed.
+FALLBACK_BACKEND_NAME = 'pure'
+
+
+def load_backend(name):
+    """
+    Loads a backend.
+
+    Args:
+        name (str): The name of the backend (one of BACKEND_NAMES).
+
+    Returns:
+        module: The backend.
+
+    Raises:
+        ValueError: If there is no backend with that name.
+        ImportError: If the library the backend needs is not installed.
+    """
+    if name not in BACKEND_NAMES:
+        raise ValueError(f'Unknown AES backend "{name}".')
+
+    return importlib.import_module(f'.{name}', __name__)
+
+
+def available_backends():
+    """
+    Gets the backends whose libraries are installed.
+
+    Returns:
+        dict: Each available backend by name (in order of preference).
+    """
+    backends = {}
+    for name in BACKEND_NAMES:
+        try:
+            backends[name] = load_backend(name)
+        except ImportError:
+            pass
+    return backends
+
+
+def time_backend(backend, messages=16):
+    """
+    Times a backend decrypting DSL Status messages.
+
+    Args:
+        backend (module): The backend.
+        messages (int, optional): The number of 112 byte messages to decrypt. Defaults to 16.
+
+    Returns:
+        float: The seconds taken to decrypt the messages (one ECB call and one CBC cipher each).
+    """
+    key = bytes(range(16))
+    data = bytes(112)
+
+    started = time.perf_counter()
+    ecb = backend.new_ecb(key)
+    for _ in range(messages):
+        ecb.decrypt(data)
+        backend.new_cbc(key, key).decrypt(data)
+
+    return time.perf_counter() - started
+
+
+def select_backend(name=None):
+    """
+    Selects a backend.
+
+    Unless a backend is named, every available native backend is probed and the fastest is
+    selected. The pure Python backend is only selected when no native backend is installed.
+
+    Args:
+        name (str, optional): The name of the backend to use. Defaults to None which selects the
+            fastest available.
+
+    Returns:
+        module: The selected backend.
+
+    Raises:
+        ValueError: If there is no backend with that name.
+        ImportError: If the named backend's library is not installed.
+    """
+    if name is not None:
+        return load_backend(name)
+
+    native_backends = []
+    for backend_name in BACKEND_NAMES:
+        if backend_name != FALLBACK_BACKEND_NAME:
+            try:
+                native_backends.append(load_backend(backend_name))
+            except ImportError:
+                pass
+
+    # Only time the backends if there is a choice (and only build the pure Python tables if
+    # there is no native backend).
+    if not native_backends:
+        return load_backend(FALLBACK_BACKEND_NAME)
+    if len(native_backends) == 1:
+        return native_backends[0]
+
+    return min(native_backends, key=time_backend)
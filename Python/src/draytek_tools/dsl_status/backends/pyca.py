@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Cryptography (pyca) AES Backend Module.
+This module provides AES ciphers from the "cryptography" package.
+"""
+
+# Performs the encryption/decryption ("pip install cryptography" if getting import errors).
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+
+# The name of this backend.
+NAME = 'pyca'
+
+
+class _Cipher:
+    """
+    A class to give a "cryptography" cipher the encrypt and decrypt methods of the other backends.
+
+    The encryption and decryption contexts are created once and only ever updated (ECB contexts
+    have no state between blocks and CBC contexts chain across updates, as required).
+    """
+
+    __slots__ = ('_cipher', '_encryptor', '_decryptor')
+
+    def __init__(self, cipher):
+        """
+        Initialize the cipher.
+
+        Args:
+            cipher (Cipher): The "cryptography" cipher.
+        """
+        self._cipher = cipher
+        self._encryptor = None
+        self._decryptor = None
+
+    def encrypt(self, data):
+        """
+        Encrypts whole blocks.
+
+        Args:
+            data (bytes): The plain-text.
+
+        Returns:
+            bytes: The cipher-text.
+        """
+        if self._encryptor is None:
+            self._encryptor = self._cipher.encryptor()
+        return self._encryptor.update(data)
+
+    def decrypt(self, data):
+        """
+        Decrypts whole blocks.
+
+        Args:
+            data (bytes): The cipher-text.
+
+        Returns:
+            bytes: The plain-text.
+        """
+        if self._decryptor is None:
+            self._decryptor = self._cipher.decryptor()
+        return self._decryptor.update(data)
+
+
+def new_ecb(key):
+    """
+    Creates an AES ECB cipher.
+
+    Args:
+        key (bytes): The 16 byte key.
+
+    Returns:
+        object: A stateless AES ECB cipher.
+    """
+    return _Cipher(Cipher(algorithms.AES(key), modes.ECB()))
+
+
+def new_cbc(key, iv):
+    """
+    Creates an AES CBC cipher.
+
+    Args:
+        key (bytes): The 16 byte key.
+        iv (bytes): The 16 byte IV.
+
+    Returns:
+        object: An AES CBC cipher (chaining across calls).
+    """
+    return _Cipher(Cipher(algorithms.AES(key), modes.CBC(iv)))
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status PyCryptodome AES Backend Module.
+This module provides AES ciphers from PyCryptodome (or PyCrypto).
+"""
+
+# Performs the encryption/decryption ("pip install pycryptodome" if getting import errors).
+from Crypto.Cipher import AES
+
+
+# The name of this backend.
+NAME = 'pycryptodome'
+
+
+def new_ecb(key):
+    """
+    Creates an AES ECB cipher.
+
+    Args:
+        key (bytes): The 16 byte key.
+
+    Returns:
+        object: A stateless AES ECB cipher.
+    """
+    return AES.new(key, AES.MODE_ECB)
+
+
+def new_cbc(key, iv):
+    """
+    Creates an AES CBC cipher.
+
+    Args:
+        key (bytes): The 16 byte key.
+        iv (bytes): The 16 byte IV.
+
+    Returns:
+        object: An AES CBC cipher (chaining across calls).
+    """
+    return AES.new(key, AES.MODE_CBC, iv)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Message Batch Module.
+This module provides methods for representing many DSL Status broadcasts as columns.
+"""
+
+# Performs the vectorized decoding ("pip install numpy" if getting import errors).
+import numpy
+
+# Individual messages are converted to and from the Message class.
+from .message import Message
+
+
+class MessageBatch:
+    """
+    A class to represent many DrayTek® Vigor™ DSL Status broadcast messages as columns.
+
+    The messages are held in a single NumPy structured array (112 bytes per message) and each
+    field can be read as a column (e.g. batch.vdsl_snr_download). The string columns are
+    truncated at their first null byte.
+    """
+
+    # The structured data type mirroring Message.FORMAT_STRING (the string fields are each
+    # followed by a null byte).
+    DTYPE = numpy.dtype({
+        'names': Message.ATTRIBUTES,
+        'formats': ['>i4'] * 12 + ['S19', 'S17', 'S25'],
+        'offsets': [index * 4 for index in range(12)] + [48, 68, 86],
+        'itemsize': 112,
+    })
+
+    def __init__(self, records=None):
+        """
+        Initialize a DSL Status message batch, optionally with existing records.
+
+        Args:
+            records (numpy.ndarray, optional):
+                A structured array of MessageBatch.DTYPE records. Defaults to None which
+                creates an empty batch.
+
+        Raises:
+            ValueError: If the records are not of the MessageBatch.DTYPE type.
+        """
+
+        # Is an empty DSL Status message batch being requested?
+        if records is None:
+            records = numpy.empty(0, dtype=MessageBatch.DTYPE)
+        # The columns only make sense if the records are laid out like a Message.
+        elif records.dtype != MessageBatch.DTYPE:
+            raise ValueError(f'Initialising from a {records.dtype} array is not supported.')
+
+        self.records = records
+
+    @classmethod
+    def from_bytes(cls, payloads, statuses=None):
+        """
+        Creates a batch from a contiguous buffer of 112 byte DSL Status messages in one call.
+
+        The returned batch shares the buffer's memory rather than copying it.
+
+        Args:
+            payloads (bytes, bytearray or memoryview): A contiguous buffer of DSL Status messages.
+            statuses (bytearray, optional):
+                The status of each message (as returned by cryptography.decrypt_many); only
+                the messages with a status of cryptography.STATUS_OK are kept.
+                Defaults to None which keeps every message.
+
+        Returns:
+            MessageBatch: The batch of DSL Status messages.
+
+        Raises:
+            ValueError: If the buffer is not a multiple of the message length.
+        """
+
+        # DSL Status messages, as fixed binary data structures, must be a specific length.
+        if len(payloads) % MessageBatch.DTYPE.itemsize != 0:
+            raise ValueError('Incorrect number of bytes received.')
+
+        # Interpret the buffer directly as records.
+        records = numpy.frombuffer(payloads, dtype=MessageBatch.DTYPE)
+
+        # Only keep the messages that were successfully decrypted (this copies them).
+        if statuses is not None:
+            records = records[numpy.frombuffer(statuses, dtype=numpy.uint8) == 0]
+
+        return cls(records)
+
+    @classmethod
+    def from_messages(cls, messages):
+        """
+        Creates a batch from Message instances.
+
+        Args:
+            messages (iterable): The Message instances to add to the batch.
+
+        Returns:
+            MessageBatch: The batch of DSL Status messages.
+        """
+        return cls.from_bytes(b''.join([message.convert_to_bytes() for message in messages]))
+
+    def to_bytes(self):
+        """
+        Converts this batch to a contiguous buffer of 112 byte DSL Status messages.
+
+        Returns:
+            bytes: The packed bytes of every message in this batch.
+        """
+        return self.records.tobytes()
+
+    def to_messages(self, truncate_strings=True):
+        """
+        Converts this batch to Message instances.
+
+        Args:
+            truncate_strings (bool, optional):
+                Whether to truncate any excess data in the null-terminated strings.
+                Defaults to True.
+
+        Returns:
+            list: A Message instance for every message in this batch.
+        """
+        payloads = self.to_bytes()
+        return [
+            Message.from_buffer(payloads, offset, truncate_strings)
+            for offset in range(0, len(payloads), MessageBatch.DTYPE.itemsize)
+        ]
+
+    def __getattr__(self, name):
+        """
+        Obtains a field of every message in this batch as a column.
+
+        Args:
+            name (str): The name of the Message attribute.
+
+        Returns:
+            numpy.ndarray: The column of values for the field.
+
+        Raises:
+            AttributeError: If the name is not a Message field.
+        """
+
+        # Only the fields are columns (this is only called for attributes not otherwise found).
+        if name in MessageBatch.DTYPE.fields:
+            column = self.records[name]
+
+            # Unlike Python, C uses null-terminated strings, truncate them (like Message does)
+            # by clearing every byte from the first null byte onwards.
+            if column.dtype.kind == 'S':
+                characters = numpy.ascontiguousarray(column).view(numpy.uint8).reshape(
+                    len(column),
+                    column.dtype.itemsize
+                )
+                terminated = numpy.logical_or.accumulate(characters == 0, axis=1)
+                column = numpy.where(terminated, 0, characters).astype(numpy.uint8).view(
+                    column.dtype
+                ).reshape(-1)
+
+            return column
+
+        raise AttributeError(f'\'{type(self).__name__}\' object has no attribute \'{name}\'')
+
+    def __getitem__(self, index):
+        """
+        Obtains a single message (or a slice of the messages) from this batch.
+
+        Args:
+            index (int or slice): The position of the message (or the slice of messages) in this
+                batch.
+
+        Returns:
+            Message or MessageBatch: The DSL Status message for an int, or a batch sharing this
+                                     batch's records for a slice.
+
+        Raises:
+            IndexError: If the position is outside this batch.
+            TypeError: If the index is not an int or a slice.
+        """
+
+        # Slicing a batch gives a batch (a view of the same records rather than a copy).
+        if isinstance(index, slice):
+            return MessageBatch(self.records[index])
+
+        # NumPy arrays would also accept lists and masks here, which are not a single message.
+        if not isinstance(index, (int, numpy.integer)):
+            raise TypeError(
+                f'MessageBatch indices must be integers or slices, not {type(index).__name__}.'
+            )
+
+        return Message(self.records[index].tobytes())
+
+    def __len__(self):
+        """
+        Obtains the number of messages in this batch.
+
+        Returns:
+            int: The number of messages.
+        """
+        return len(self.records)
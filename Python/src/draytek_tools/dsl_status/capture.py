@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Capture Module.
+This module provides methods for recording and replaying raw DSL Status broadcasts.
+
+A capture is a directory of segment files, each holding a header followed by fixed-size
+records (receive timestamp, source address, length and the raw encrypted broadcast) in timestamp
+order. Every segment has a sparse index file of the timestamp of every Nth record, so a reader
+can memory-map a segment and binary search it without reading the records outside a time range.
+"""
+
+# Segment timestamps are binary searched.
+import bisect
+
+# Segments whose time ranges overlap are merged by timestamp.
+import heapq
+import itertools
+import operator
+
+# Segments are memory-mapped for reading.
+import mmap
+
+# Segment files are stored in a directory.
+import os
+
+# Source addresses are stored in their packed form.
+import socket
+
+# We use the struct library to interpret bytes as packed binary data.
+import struct
+
+# Records are timestamped when they are appended.
+import time
+
+# Records are decoded lazily.
+from . import cryptography
+from .message import Message
+
+
+# Identifies a DSL Status capture segment (and its format version).
+SEGMENT_MAGIC = b'DSLSCAP\x01'
+
+# The segment header is the magic bytes, the record size and the index interval.
+HEADER_STRUCT = struct.Struct('!8sII')
+
+# Each record is the timestamp, the (IPv6 or IPv4-mapped) source address and port, the length
+# of the broadcast and the broadcast itself (padded to a full DSL Status broadcast).
+RECORD_STRUCT = struct.Struct(f'!d16sHH{cryptography.ENCRYPTED_LENGTH}s')
+
+# Each index entry is the timestamp and number of a record.
+INDEX_STRUCT = struct.Struct('!dQ')
+
+# Only the timestamp is unpacked when searching for a record.
+TIMESTAMP_STRUCT = struct.Struct('!d')
+
+# The prefix of an IPv4 address mapped into an IPv6 address.
+IPV4_MAPPED_PREFIX = b'\0' * 10 + b'\xff\xff'
+
+# The file name extensions of segments and their indexes.
+SEGMENT_EXTENSION = '.dslcap'
+INDEX_EXTENSION = '.dslidx'
+
+
+def _pack_address(host):
+    """
+    Packs an IP address into 16 bytes (IPv4 addresses are mapped into IPv6).
+
+    Args:
+        host (str): The IPv4 or IPv6 address.
+
+    Returns:
+        bytes: The 16 byte packed address.
+    """
+    try:
+        return IPV4_MAPPED_PREFIX + socket.inet_aton(host)
+    except OSError:
+        return socket.inet_pton(socket.AF_INET6, host)
+
+
+def _unpack_address(packed_address):
+    """
+    Unpacks a 16 byte packed IP address.
+
+    Args:
+        packed_address (bytes): The 16 byte packed address.
+
+    Returns:
+        str: The IPv4 or IPv6 address.
+    """
+    if packed_address[:12] == IPV4_MAPPED_PREFIX:
+        return socket.inet_ntoa(packed_address[12:])
+
+    return socket.inet_ntop(socket.AF_INET6, packed_address)
+
+
+def _list_segments(directory):
+    """
+    Lists the segments of a capture in order.
+
+    Args:
+        directory (str): The directory of the capture.
+
+    Returns:
+        list: The number and path (without extension) of each segment.
+    """
+    segments = []
+
+    for name in os.listdir(directory):
+        stem, extension = os.path.splitext(name)
+        if extension == SEGMENT_EXTENSION and stem.isdigit():
+            segments.append((int(stem), os.path.join(directory, stem)))
+
+    return sorted(segments)
+
+
+class CaptureRecord:
+    """
+    A class to represent a single recorded DSL Status broadcast.
+
+    The broadcast is only decrypted and parsed when message() is called.
+    """
+
+    __slots__ = ('timestamp', 'address', 'frame')
+
+    def __init__(self, timestamp, address, frame):
+        """
+        Initialize a capture record.
+
+        Args:
+            timestamp (float): When the broadcast was received (seconds since the epoch).
+            address (tuple): The source IP address and port of the broadcast.
+            frame (bytes): The raw encrypted broadcast.
+        """
+        self.timestamp = timestamp
+        self.address = address
+        self.frame = frame
+
+    def decrypt(self, mac_address):
+        """
+        Decrypts the recorded broadcast.
+
+        Args:
+            mac_address (bytes or str): The MAC address of the device that sent the broadcast.
+
+        Returns:
+            bytes: The decrypted bytes.
+
+        Raises:
+            ValueError: If the recorded broadcast is not a valid DSL Status broadcast.
+        """
+        return cryptography.decrypt_bytes(mac_address, self.frame)
+
+    def message(self, mac_address):
+        """
+        Decrypts and parses the recorded broadcast.
+
+        Args:
+            mac_address (bytes or str): The MAC address of the device that sent the broadcast.
+
+        Returns:
+            Message: The parsed DSL Status message.
+
+        Raises:
+            ValueError: If the recorded broadcast is not a valid DSL Status broadcast.
+        """
+        return Message.from_buffer(self.decrypt(mac_address))
+
+
+class CaptureWriter:
+    """
+    A class to append raw DSL Status broadcasts to a segmented capture.
+
+    Each segment's records are kept in timestamp order so that they can be binary searched; a
+    record earlier than the previous one (e.g. after the clock steps backwards, or if another
+    writer shares the directory) starts a new segment instead.
+    """
+
+    def __init__(self, directory, segment_records=1000000, index_interval=1024):
+        """
+        Initialize a capture writer, starting a new segment after any existing ones.
+
+        Args:
+            directory (str): The directory of the capture (created if it does not exist).
+            segment_records (int, optional): The number of records in each segment.
+                Defaults to 1000000 (around 140 MB).
+            index_interval (int, optional): The number of records between index entries.
+                Defaults to 1024.
+
+        Raises:
+            ValueError: If the segment size or index interval is less than 1.
+        """
+
+        # Segments and index entries must hold at least one record.
+        if segment_records < 1 or index_interval < 1:
+            raise ValueError('The segment size and index interval must be at least 1.')
+
+        self.directory = directory
+        self.segment_records = segment_records
+        self.index_interval = index_interval
+
+        os.makedirs(directory, exist_ok=True)
+
+        # Continue numbering (and the timestamps) after any existing segments.
+        existing = _list_segments(directory)
+        self._segment_number = existing[-1][0] + 1 if existing else 0
+        self._last_timestamp = _last_timestamp(existing[-1][1]) if existing else float('-inf')
+
+        self._segment = None
+        self._index = None
+        self._records = 0
+
+    def _open_segment(self):
+        """
+        Closes the current segment (if any) and opens the next one.
+
+        Returns:
+            None
+        """
+        self._close_segment()
+
+        # pylint: disable=consider-using-with
+        # Another writer sharing the directory may have created the next segment already.
+        while self._segment is None:
+            path = os.path.join(self.directory, f'{self._segment_number:08d}')
+            self._segment_number += 1
+
+            try:
+                self._segment = open(path + SEGMENT_EXTENSION, 'xb')
+            except FileExistsError:
+                continue
+
+        self._index = open(path + INDEX_EXTENSION, 'wb')
+        # pylint: enable=consider-using-with
+
+        self._segment.write(
+            HEADER_STRUCT.pack(SEGMENT_MAGIC, RECORD_STRUCT.size, self.index_interval)
+        )
+        self._records = 0
+
+    def _close_segment(self):
+        """
+        Closes the current segment (if any).
+
+        Returns:
+            None
+        """
+        if self._segment is not None:
+            self._segment.close()
+            self._index.close()
+            self._segment = None
+            self._index = None
+
+    def append(self, frame, address=None, timestamp=None):
+        """
+        Appends a raw DSL Status broadcast.
+
+        Args:
+            frame (bytes): The raw encrypted broadcast.
+            address (tuple, optional): The source IP address and port of the broadcast.
+                Defaults to None.
+            timestamp (float, optional): When the broadcast was received (seconds since the
+                epoch). Defaults to None which uses the current time.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the broadcast is too long.
+        """
+
+        # Only DSL Status broadcast sized datagrams can be recorded.
+        if len(frame) > cryptography.ENCRYPTED_LENGTH:
+            raise ValueError('Incorrect number of bytes received.')
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        # Is a new segment needed (segments must stay in order to be searchable, but the clock
+        # may step backwards)?
+        if (
+            self._segment is None
+            or self._records >= self.segment_records
+            or timestamp < self._last_timestamp
+        ):
+            self._open_segment()
+
+        # Every Nth record is added to the sparse index.
+        if self._records % self.index_interval == 0:
+            self._index.write(INDEX_STRUCT.pack(timestamp, self._records))
+
+        host, port = address[:2] if address is not None else ('::', 0)
+        self._segment.write(
+            RECORD_STRUCT.pack(timestamp, _pack_address(host), port, len(frame), bytes(frame))
+        )
+
+        self._records += 1
+        self._last_timestamp = timestamp
+
+    def flush(self):
+        """
+        Writes any buffered records to the segment files.
+
+        Returns:
+            None
+        """
+        if self._segment is not None:
+            self._segment.flush()
+            self._index.flush()
+
+    def close(self):
+        """
+        Closes the capture writer.
+
+        Returns:
+            None
+        """
+        self._close_segment()
+
+    def __enter__(self):
+        """
+        Returns this writer when entering a "with" block.
+
+        Returns:
+            CaptureWriter: This writer.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Closes this writer when leaving a "with" block.
+        """
+        self.close()
+
+
+class _Segment:
+    """
+    A memory-mapped capture segment and its sparse index.
+    """
+
+    def __init__(self, path):
+        """
+        Opens and memory-maps a segment.
+
+        Args:
+            path (str): The path of the segment (without extension).
+
+        Raises:
+            ValueError: If the file is not a capture segment.
+        """
+        with open(path + SEGMENT_EXTENSION, 'rb') as segment_file:
+            header = segment_file.read(HEADER_STRUCT.size)
+
+            # Check this is a segment this version can read.
+            if len(header) != HEADER_STRUCT.size:
+                raise ValueError(f'Capture segment "{path}" is incomplete.')
+            magic, record_size, _ = HEADER_STRUCT.unpack(header)
+            if magic != SEGMENT_MAGIC or record_size != RECORD_STRUCT.size:
+                raise ValueError(f'"{path}" is not a supported capture segment.')
+
+            # Only complete records are read (the segment may still be being written).
+            size = os.fstat(segment_file.fileno()).st_size
+            self.count = (size - HEADER_STRUCT.size) // RECORD_STRUCT.size
+            self.map = (
+                mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+                if self.count else None
+            )
+
+        # The sparse index is small so is read in full.
+        self.index_timestamps = []
+        self.index_records = []
+        try:
+            with open(path + INDEX_EXTENSION, 'rb') as index_file:
+                index = index_file.read()
+        except FileNotFoundError:
+            # Without an index the whole segment is scanned.
+            index = b''
+
+        # Ignore any partially written index entry.
+        index = index[:len(index) - len(index) % INDEX_STRUCT.size]
+
+        for timestamp, record in INDEX_STRUCT.iter_unpack(index):
+            # Ignore index entries for records that are not yet complete.
+            if record < self.count:
+                self.index_timestamps.append(timestamp)
+                self.index_records.append(record)
+
+    def timestamp(self, record):
+        """
+        Obtains the timestamp of a record without unpacking the rest of it.
+
+        Args:
+            record (int): The number of the record.
+
+        Returns:
+            float: The record's timestamp.
+        """
+        return TIMESTAMP_STRUCT.unpack_from(
+            self.map,
+            HEADER_STRUCT.size + record * RECORD_STRUCT.size
+        )[0]
+
+    def find(self, timestamp):
+        """
+        Finds the first record at or after a timestamp.
+
+        Args:
+            timestamp (float): The timestamp to find.
+
+        Returns:
+            int: The number of the first record at or after the timestamp (count if none).
+        """
+
+        # Start from the last indexed record before the timestamp.
+        position = bisect.bisect_left(self.index_timestamps, timestamp) - 1
+        record = self.index_records[position] if position >= 0 else 0
+
+        # Then scan forward through (at most an index interval of) records.
+        while record < self.count and self.timestamp(record) < timestamp:
+            record += 1
+
+        return record
+
+    def read(self, record):
+        """
+        Reads a record.
+
+        Args:
+            record (int): The number of the record.
+
+        Returns:
+            CaptureRecord: The record.
+        """
+        timestamp, packed_address, port, length, frame = RECORD_STRUCT.unpack_from(
+            self.map,
+            HEADER_STRUCT.size + record * RECORD_STRUCT.size
+        )
+        return CaptureRecord(timestamp, (_unpack_address(packed_address), port), frame[:length])
+
+    def close(self):
+        """
+        Unmaps the segment.
+
+        Returns:
+            None
+        """
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+
+def _read_segment(segment, start, end):
+    """
+    Reads the records of a segment received in a time range.
+
+    Args:
+        segment (_Segment): The segment.
+        start (float): The earliest timestamp to read (inclusive) or None.
+        end (float): The latest timestamp to read (exclusive) or None.
+
+    Yields:
+        CaptureRecord: Each record in the time range in order.
+    """
+    record = 0 if start is None else segment.find(start)
+    while record < segment.count:
+        captured = segment.read(record)
+
+        # Stop at the end of the time range.
+        if end is not None and captured.timestamp >= end:
+            return
+
+        yield captured
+        record += 1
+
+
+def _last_timestamp(path):
+    """
+    Obtains the timestamp of the last complete record in a segment.
+
+    Args:
+        path (str): The path of the segment (without extension).
+
+    Returns:
+        float: The last record's timestamp (negative infinity if the segment has no records).
+
+    Raises:
+        ValueError: If the file is not a capture segment.
+    """
+    segment = _Segment(path)
+    try:
+        return segment.timestamp(segment.count - 1) if segment.count else float('-inf')
+    finally:
+        segment.close()
+
+
+class CaptureReader:
+    """
+    A class to read the raw DSL Status broadcasts in a segmented capture.
+
+    Segments are memory-mapped and binary searched by timestamp, so reading a time range only
+    touches the pages holding that range.
+    """
+
+    def __init__(self, directory):
+        """
+        Initialize a capture reader.
+
+        Args:
+            directory (str): The directory of the capture.
+
+        Raises:
+            ValueError: If a file in the directory is not a capture segment.
+        """
+        self.directory = directory
+        self._segments = [_Segment(path) for _, path in _list_segments(directory)]
+
+    def read(self, start=None, end=None):
+        """
+        Reads the records received in a time range.
+
+        Args:
+            start (float, optional): The earliest timestamp to read (inclusive).
+                Defaults to None which reads from the first record.
+            end (float, optional): The latest timestamp to read (exclusive).
+                Defaults to None which reads to the last record.
+
+        Yields:
+            CaptureRecord: Each record in the time range in order.
+        """
+
+        # Skip empty segments and segments entirely outside the time range.
+        segments = [
+            segment for segment in self._segments
+            if segment.count
+            and (start is None or segment.timestamp(segment.count - 1) >= start)
+            and (end is None or segment.timestamp(0) < end)
+        ]
+        ranges = [_read_segment(segment, start, end) for segment in segments]
+
+        # Segments normally follow on from each other, but overlap if the clock stepped
+        # backwards or several writers shared the directory.
+        if all(
+            previous.timestamp(previous.count - 1) <= segment.timestamp(0)
+            for previous, segment in zip(segments, segments[1:])
+        ):
+            yield from itertools.chain.from_iterable(ranges)
+        else:
+            yield from heapq.merge(*ranges, key=operator.attrgetter('timestamp'))
+
+    def __len__(self):
+        """
+        Obtains the number of records in the capture.
+
+        Returns:
+            int: The number of records.
+        """
+        return sum(segment.count for segment in self._segments)
+
+    def close(self):
+        """
+        Closes the capture reader.
+
+        Returns:
+            None
+        """
+        for segment in self._segments:
+            segment.close()
+
+    def __enter__(self):
+        """
+        Returns this reader when entering a "with" block.
+
+        Returns:
+            CaptureReader: This reader.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Closes this reader when leaving a "with" block.
+        """
+        self.close()
@@ -24,16 +24,53 @@ This module provides methods for encrypting/decrypting DSL Status message broadc
 # The hex characters of the SHA-1 digest make up the encryption/decryption key.
 import binascii
 
+# The key cache keeps its entries in least-recently-used order.
+from collections import OrderedDict
+
 # Performs the SHA-1 hash of the MAC address.
 import hashlib
 
-# Performs the decryption ("pip install pycryptodome" if getting import errors).
-from Crypto.Cipher import AES
+# The key cache may be shared between threads.
+import threading
+
+# Performs the encryption/decryption (with the fastest AES library installed).
+from . import backends
+
+# The key lookup and decryption stages can be timed.
+from . import instrumentation
+
+# Decrypted messages are validated against the known DSL types.
+from .message import DSL_TYPE_VALUES
 
 
 # The DSL Status broadcast protocol identifies itself with these starting bytes.
 SIGNATURE_BYTES = b'\x20\x52\x05\x20'
 
+# The length of an encrypted DSL Status broadcast (including the protocol signature bytes).
+ENCRYPTED_LENGTH = 116
+
+# The length of a decrypted DSL Status message.
+DECRYPTED_LENGTH = 112
+
+# The per-message status codes returned by decrypt_many, encrypt_many and quick_validate_many.
+STATUS_OK = 0
+STATUS_INCORRECT_LENGTH = 1
+STATUS_INCORRECT_SIGNATURE = 2
+STATUS_INCORRECT_DSL_TYPE = 3
+
+# The DSL type (byte 27 of the decrypted payload) is byte 11 of the second ciphertext block,
+# which is bytes 20 to 36 of an encrypted message (after the protocol signature bytes). In CBC
+# mode it is XORed with byte 11 of the first ciphertext block (byte 15 of the message).
+DSL_TYPE_BLOCK_START = 20
+DSL_TYPE_BLOCK_OFFSET = 11
+DSL_TYPE_CHAINED_OFFSET = 15
+
+# The maximum number of messages decrypted by a single AES call in decrypt_many.
+BATCH_CHUNK_SIZE = 4096
+
+# The AES backend (see set_backend), probed for the fastest when this module is imported.
+BACKEND = backends.select_backend()
+
 @staticmethod
 def get_key(mac_address):
     """
@@ -65,6 +102,203 @@ def get_key(mac_address):
     # Pad to 16 bytes (AES128).
     return digest + bytearray([0x0] * 6)
 
+class KeyCacheEntry:
+    """
+    A class to represent the key and ciphers derived from a single MAC address.
+
+    The ECB cipher is stateless so can be safely reused for every message, whereas CBC ciphers
+    keep chaining state so a new one is made for each message by new_cipher().
+    """
+
+    __slots__ = ('mac_address', 'key', 'ecb')
+
+    def __init__(self, mac_address):
+        """
+        Initialize a key cache entry by deriving the key and key schedule for a MAC address.
+
+        Args:
+            mac_address (bytes): The normalized MAC address of the DrayTek® device.
+        """
+        self.mac_address = mac_address
+        self.key = bytes(get_key(mac_address))
+        self.ecb = BACKEND.new_ecb(self.key)
+
+    def new_cipher(self):
+        """
+        Creates a new AES CBC cipher for this key (the IV is also the same as the key).
+
+        Returns:
+            object: A new AES CBC cipher instance.
+        """
+        return BACKEND.new_cbc(self.key, self.key)
+
+
+class KeyCache:
+    """
+    A bounded least-recently-used cache of the keys and ciphers derived from MAC addresses.
+
+    Modems broadcast under the same MAC address forever, so deriving the key and the AES key
+    schedule only once per MAC address avoids repeating that work for every message.
+    """
+
+    def __init__(self, max_size=256):
+        """
+        Initialize an empty key cache.
+
+        Args:
+            max_size (int, optional):
+                The maximum number of MAC addresses to hold before the least recently used entry
+                is evicted. Defaults to 256.
+
+        Raises:
+            ValueError: If the maximum size is less than 1.
+        """
+
+        # A cache that cannot hold anything would silently derive the key every time.
+        if max_size < 1:
+            raise ValueError('The key cache must be able to hold at least 1 entry.')
+
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_mac_address(mac_address):
+        """
+        Converts a MAC address in any of the supported forms to its 6 raw bytes.
+
+        Args:
+            mac_address (bytes or str): The MAC address (e.g. b'\xaa\xbb...' or 'aa:bb:...').
+
+        Returns:
+            bytes: The raw bytes of the MAC address.
+        """
+
+        # If the MAC address is in string form it needs to be converted to bytes.
+        if isinstance(mac_address, str):
+            return binascii.unhexlify(mac_address.replace(':', '').replace('-', ''))
+
+        # Any other bytes-like object (e.g. a bytearray) is made hashable.
+        return bytes(mac_address)
+
+    def get(self, mac_address):
+        """
+        Obtains the cache entry for a MAC address, deriving it if it is not already cached.
+
+        Args:
+            mac_address (bytes, str or KeyCacheEntry):
+                The MAC address of the DrayTek® device (an entry that has already been obtained
+                is returned as is).
+
+        Returns:
+            KeyCacheEntry: The key and ciphers for the MAC address.
+        """
+
+        # Callers that hold on to an entry (e.g. for many devices) can use it directly.
+        if isinstance(mac_address, KeyCacheEntry):
+            return mac_address
+
+        # Entries are stored by their raw MAC address bytes.
+        mac_address = self.normalize_mac_address(mac_address)
+
+        with self._lock:
+            entry = self._entries.get(mac_address)
+
+            # Is this MAC address already cached?
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(mac_address)
+                return entry
+
+            self.misses += 1
+
+            # Derive the key and key schedule.
+            entry = KeyCacheEntry(mac_address)
+            self._entries[mac_address] = entry
+
+            # Evict the least recently used entry if the cache is now too big.
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+            return entry
+
+    def invalidate(self, mac_address=None):
+        """
+        Removes a MAC address (or every MAC address) from the cache.
+
+        Args:
+            mac_address (bytes or str, optional):
+                The MAC address to remove. Defaults to None which removes all entries.
+
+        Returns:
+            bool: Whether anything was removed.
+        """
+        with self._lock:
+            # Is the whole cache being cleared?
+            if mac_address is None:
+                removed = len(self._entries) > 0
+                self._entries.clear()
+                return removed
+
+            return self._entries.pop(self.normalize_mac_address(mac_address), None) is not None
+
+    def stats(self):
+        """
+        Obtains the cache counters.
+
+        Returns:
+            dict: The size, maximum size, hits, misses and evictions of this cache.
+        """
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def __len__(self):
+        """
+        Obtains the number of MAC addresses currently cached.
+
+        Returns:
+            int: The number of cache entries.
+        """
+        return len(self._entries)
+
+
+# The key cache used by decrypt_bytes and encrypt_bytes.
+KEY_CACHE = KeyCache()
+
+
+@staticmethod
+def set_backend(name=None):
+    """
+    Selects the AES backend used for every key derived from now on.
+
+    The key cache is emptied so cached ciphers from the previous backend are not reused.
+
+    Args:
+        name (str, optional): The name of the backend (one of backends.BACKEND_NAMES).
+            Defaults to None which selects the fastest available.
+
+    Returns:
+        str: The name of the selected backend.
+
+    Raises:
+        ValueError: If there is no backend with that name.
+        ImportError: If the named backend's library is not installed.
+    """
+    # pylint: disable=global-statement
+    global BACKEND
+    BACKEND = backends.select_backend(name)
+    KEY_CACHE.invalidate()
+    return BACKEND.NAME
+
 @staticmethod
 def decrypt_bytes(mac_address, encrypted_payload):
     """
@@ -93,12 +327,29 @@ def decrypt_bytes(mac_address, encrypted_payload):
     if encrypted_payload[:4] != SIGNATURE_BYTES:
         raise ValueError('Incorrect protocol signature bytes.')
 
-    # Get the decryption key (derived from the MAC address) to decrypt the data.
-    key = get_key(mac_address)
+    # Time the stages (if instrumentation is enabled and this call is sampled).
+    timed = instrumentation.ENABLED and instrumentation.sample(instrumentation.STAGE_KEY_LOOKUP)
+    if timed:
+        started = instrumentation.clock()
+
+    # Get the cached decryption key and cipher (derived from the MAC address) to decrypt the data.
+    entry = KEY_CACHE.get(mac_address)
+
+    if timed:
+        found = instrumentation.clock()
+        instrumentation.record(instrumentation.STAGE_KEY_LOOKUP, found - started)
 
     # Use AES CBC mode for decryption (The IV is also the same as the key).
-    aes = AES.new(key, AES.MODE_CBC, key)
-    decrypted_payload = aes.decrypt(encrypted_payload[4:])
+    # CBC decryption is each block's ECB decryption XORed with the previous ciphertext block
+    # (or the IV), so the reusable ECB cipher avoids making a new key schedule each time.
+    ciphertext = encrypted_payload[4:]
+    decrypted_payload = (
+        int.from_bytes(entry.ecb.decrypt(ciphertext), 'big') ^
+        int.from_bytes(entry.key + ciphertext[:96], 'big')
+    ).to_bytes(112, 'big')
+
+    if timed:
+        instrumentation.record(instrumentation.STAGE_DECRYPT, instrumentation.clock() - found)
 
     # Return the decrypted payload (without the protocol signature bytes).
     return decrypted_payload
@@ -127,12 +378,305 @@ def encrypt_bytes(mac_address, payload):
     if len(payload) != 112:
         raise ValueError('Incorrect number of bytes received.')
 
-    # Get the encryption key (derived from the MAC address) to encrypt the data.
-    key = get_key(mac_address)
+    # Get the cached encryption key (derived from the MAC address) to encrypt the data.
+    entry = KEY_CACHE.get(mac_address)
 
     # Use AES CBC mode for encryption (The IV is also the same as the key).
-    aes = AES.new(key, AES.MODE_CBC, key)
+    aes = entry.new_cipher()
     encrypted_payload = aes.encrypt(payload)
 
     # Return the protocol signature and encrypted payload.
     return SIGNATURE_BYTES + encrypted_payload
+
+@staticmethod
+def _split_messages(payloads, message_length):
+    """
+    Splits a contiguous buffer or an iterable of messages into a list of message views.
+
+    Args:
+        payloads (bytes or iterable): A contiguous buffer of messages or an iterable of messages.
+        message_length (int): The length of each message in a contiguous buffer.
+
+    Returns:
+        tuple: The list of memoryview messages and whether they came from a contiguous buffer.
+    """
+
+    # A contiguous buffer is sliced (without copying) into fixed length messages.
+    if isinstance(payloads, (bytes, bytearray, memoryview)):
+        view = memoryview(payloads).cast('B')
+        return [
+            view[offset:offset + message_length]
+            for offset in range(0, len(view), message_length)
+        ], True
+
+    # Otherwise each message is supplied separately.
+    return [memoryview(payload).cast('B') for payload in payloads], False
+
+@staticmethod
+def _group_by_key(mac_addresses, indexes):
+    """
+    Groups message indexes by the key cache entry of the MAC address that sent them.
+
+    Args:
+        mac_addresses (bytes, str or sequence):
+            A single MAC address for every message or a sequence of one MAC address per message.
+        indexes (list): The indexes of the messages to group.
+
+    Returns:
+        dict: The list of message indexes for each KeyCacheEntry.
+    """
+
+    # A single MAC address applies to every message.
+    if isinstance(mac_addresses, (str, bytes, bytearray, memoryview, KeyCacheEntry)):
+        return {KEY_CACHE.get(mac_addresses): indexes}
+
+    groups = {}
+    for index in indexes:
+        groups.setdefault(KEY_CACHE.get(mac_addresses[index]), []).append(index)
+    return groups
+
+@staticmethod
+def decrypt_many(mac_addresses, encrypted_payloads):
+    """
+    Decrypts many DSL Status broadcasts at once.
+
+    This method validates the length and protocol signature of every message, then decrypts all
+    the valid messages from each MAC address in as few AES calls as possible. Unlike
+    decrypt_bytes, invalid messages are reported in the returned status codes instead of raising.
+
+    Args:
+        mac_addresses (bytes, str or sequence):
+            The MAC address of the DrayTek® device that sent every message, or a sequence with
+            the MAC address of each message.
+        encrypted_payloads (bytes or iterable):
+            A contiguous buffer of 116 byte encrypted messages or an iterable of encrypted
+            messages.
+
+    Returns:
+        tuple: A bytearray of the 112 byte decrypted payloads (all null bytes for any invalid
+               message) and a bytearray of each message's status (e.g. STATUS_OK).
+    """
+
+    # Get a view of each message.
+    messages, contiguous = _split_messages(encrypted_payloads, ENCRYPTED_LENGTH)
+    message_count = len(messages)
+
+    # Assume every message is valid until proven otherwise.
+    statuses = bytearray(message_count)
+    output = bytearray(message_count * DECRYPTED_LENGTH)
+
+    # A contiguous buffer of complete messages can have every signature checked at once by
+    # comparing each signature byte position across all of the messages.
+    if contiguous and message_count and len(messages[-1]) == ENCRYPTED_LENGTH:
+        view = memoryview(encrypted_payloads).cast('B')
+        signatures_valid = all(
+            view[position::ENCRYPTED_LENGTH] == bytes([signature_byte]) * message_count
+            for position, signature_byte in enumerate(SIGNATURE_BYTES)
+        )
+    else:
+        signatures_valid = False
+
+    # Are all the messages known to be valid?
+    if signatures_valid:
+        valid_indexes = list(range(message_count))
+    else:
+        # Check each message separately.
+        valid_indexes = []
+        for index, message in enumerate(messages):
+            # DSL Status messages, as fixed binary data structures, must be a specific length.
+            if len(message) != ENCRYPTED_LENGTH:
+                statuses[index] = STATUS_INCORRECT_LENGTH
+            # Check the encrypted payload is a DSL Status message.
+            elif message[:4] != SIGNATURE_BYTES:
+                statuses[index] = STATUS_INCORRECT_SIGNATURE
+            else:
+                valid_indexes.append(index)
+
+    # Time the stages for the whole batch (if instrumentation is enabled and it is sampled).
+    timed = (
+        instrumentation.ENABLED and valid_indexes and
+        instrumentation.sample(instrumentation.STAGE_KEY_LOOKUP)
+    )
+    if timed:
+        started = instrumentation.clock()
+
+    # Get the cached decryption key and cipher of each MAC address.
+    groups = _group_by_key(mac_addresses, valid_indexes)
+
+    if timed:
+        found = instrumentation.clock()
+        instrumentation.record(
+            instrumentation.STAGE_KEY_LOOKUP, found - started, len(valid_indexes)
+        )
+
+    # Decrypt the messages sent by each MAC address together.
+    for entry, indexes in groups.items():
+        for start in range(0, len(indexes), BATCH_CHUNK_SIZE):
+            chunk = indexes[start:start + BATCH_CHUNK_SIZE]
+
+            # The ciphertext (without the protocol signature bytes) and the block each
+            # ciphertext block was chained with (the IV, which is also the key, or the
+            # previous ciphertext block).
+            ciphertext = b''.join([messages[index][4:] for index in chunk])
+            chaining = b''.join([entry.key + messages[index][4:100] for index in chunk])
+
+            # CBC decryption is each block's ECB decryption XORed with the chained block.
+            plaintext = (
+                int.from_bytes(entry.ecb.decrypt(ciphertext), 'big') ^
+                int.from_bytes(chaining, 'big')
+            ).to_bytes(len(ciphertext), 'big')
+
+            # Consecutive messages can be copied in one go.
+            if chunk[-1] - chunk[0] == len(chunk) - 1:
+                output[chunk[0] * DECRYPTED_LENGTH:(chunk[-1] + 1) * DECRYPTED_LENGTH] = plaintext
+            else:
+                for position, index in enumerate(chunk):
+                    output[index * DECRYPTED_LENGTH:(index + 1) * DECRYPTED_LENGTH] = plaintext[
+                        position * DECRYPTED_LENGTH:(position + 1) * DECRYPTED_LENGTH
+                    ]
+
+    if timed:
+        instrumentation.record(
+            instrumentation.STAGE_DECRYPT, instrumentation.clock() - found, len(valid_indexes)
+        )
+
+    # Return the decrypted payloads and the status of each message.
+    return output, statuses
+
+@staticmethod
+def encrypt_many(mac_addresses, payloads):
+    """
+    Encrypts many DSL Status messages at once.
+
+    This method validates the length of every message, then encrypts each valid message and
+    adds the protocol signature. Unlike encrypt_bytes, invalid messages are reported in the
+    returned status codes instead of raising.
+
+    Args:
+        mac_addresses (bytes, str or sequence):
+            The MAC address of the DrayTek® device sending every message, or a sequence with
+            the MAC address of each message.
+        payloads (bytes or iterable):
+            A contiguous buffer of 112 byte plain-text messages or an iterable of plain-text
+            messages.
+
+    Returns:
+        tuple: A bytearray of the 116 byte encrypted messages (all null bytes for any invalid
+               message) and a bytearray of each message's status (e.g. STATUS_OK).
+    """
+
+    # Get a view of each message.
+    messages, _ = _split_messages(payloads, DECRYPTED_LENGTH)
+    message_count = len(messages)
+
+    statuses = bytearray(message_count)
+    output = bytearray(message_count * ENCRYPTED_LENGTH)
+
+    # DSL Status messages, as fixed binary data structures, must be a specific length.
+    valid_indexes = []
+    for index, message in enumerate(messages):
+        if len(message) != DECRYPTED_LENGTH:
+            statuses[index] = STATUS_INCORRECT_LENGTH
+        else:
+            valid_indexes.append(index)
+
+    # CBC encryption chains every block so each message needs its own cipher.
+    for entry, indexes in _group_by_key(mac_addresses, valid_indexes).items():
+        for index in indexes:
+            offset = index * ENCRYPTED_LENGTH
+            output[offset:offset + 4] = SIGNATURE_BYTES
+            output[offset + 4:offset + ENCRYPTED_LENGTH] = entry.new_cipher().encrypt(
+                messages[index]
+            )
+
+    # Return the encrypted messages and the status of each message.
+    return output, statuses
+
+@staticmethod
+def quick_validate(mac_address, encrypted_payload):
+    """
+    Checks whether DSL Status broadcast bytes are valid without decrypting them all.
+
+    This method validates the number of bytes and the protocol signature and then decrypts
+    only the single block containing the DSL type (CBC mode allows any block to be decrypted
+    on its own from it and the previous ciphertext block). Messages from unknown senders or
+    encrypted with a different key can therefore be rejected at a fraction of the cost of
+    decrypt_bytes.
+
+    Args:
+        mac_address (bytes): The MAC address of the DrayTek® device sending the DSL Status message.
+        encrypted_payload (bytes): The encrypted bytes containing the DSL Status to validate.
+
+    Returns:
+        bool: Whether the message is a valid DSL Status message for this MAC address.
+    """
+
+    # DSL Status messages, as fixed binary data structures, must be a specific length to be valid.
+    if len(encrypted_payload) != ENCRYPTED_LENGTH:
+        return False
+
+    # Check the encrypted payload is a DSL Status message.
+    if encrypted_payload[:4] != SIGNATURE_BYTES:
+        return False
+
+    # Decrypt only the block containing the DSL type.
+    block = KEY_CACHE.get(mac_address).ecb.decrypt(
+        encrypted_payload[DSL_TYPE_BLOCK_START:DSL_TYPE_BLOCK_START + 16]
+    )
+
+    # Check the DSL type is valid (otherwise the wrong key was probably used).
+    return (
+        block[DSL_TYPE_BLOCK_OFFSET] ^ encrypted_payload[DSL_TYPE_CHAINED_OFFSET]
+    ) in DSL_TYPE_VALUES
+
+@staticmethod
+def quick_validate_many(mac_addresses, encrypted_payloads):
+    """
+    Checks whether many DSL Status broadcasts are valid without decrypting them all.
+
+    This is the batch form of quick_validate; the DSL type blocks of all the messages from each
+    MAC address are decrypted with a single AES call.
+
+    Args:
+        mac_addresses (bytes, str or sequence):
+            The MAC address of the DrayTek® device that sent every message, or a sequence with
+            the MAC address of each message.
+        encrypted_payloads (bytes or iterable):
+            A contiguous buffer of 116 byte encrypted messages or an iterable of encrypted
+            messages.
+
+    Returns:
+        bytearray: Each message's status (e.g. STATUS_OK or STATUS_INCORRECT_DSL_TYPE).
+    """
+
+    # Get a view of each message.
+    messages, _ = _split_messages(encrypted_payloads, ENCRYPTED_LENGTH)
+    statuses = bytearray(len(messages))
+
+    # Check the length and signature of each message.
+    valid_indexes = []
+    for index, message in enumerate(messages):
+        if len(message) != ENCRYPTED_LENGTH:
+            statuses[index] = STATUS_INCORRECT_LENGTH
+        elif message[:4] != SIGNATURE_BYTES:
+            statuses[index] = STATUS_INCORRECT_SIGNATURE
+        else:
+            valid_indexes.append(index)
+
+    # Decrypt the DSL type blocks of the messages sent by each MAC address together.
+    for entry, indexes in _group_by_key(mac_addresses, valid_indexes).items():
+        blocks = entry.ecb.decrypt(b''.join([
+            messages[index][DSL_TYPE_BLOCK_START:DSL_TYPE_BLOCK_START + 16] for index in indexes
+        ]))
+
+        # Check each DSL type is valid.
+        for position, index in enumerate(indexes):
+            dsl_type = (
+                blocks[position * 16 + DSL_TYPE_BLOCK_OFFSET] ^
+                messages[index][DSL_TYPE_CHAINED_OFFSET]
+            )
+            if dsl_type not in DSL_TYPE_VALUES:
+                statuses[index] = STATUS_INCORRECT_DSL_TYPE
+
+    # Return the status of each message.
+    return statuses
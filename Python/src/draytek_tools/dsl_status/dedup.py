@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Deduplication Module.
+This module provides methods for skipping repeated DSL Status broadcasts.
+"""
+
+# The cache keeps its entries in least-recently-used order.
+from collections import OrderedDict
+
+# Cache entries expire after a configurable time.
+import time
+
+# Cache misses are decrypted and parsed as usual.
+from . import cryptography
+from .message import DSL_TYPE_VALUES, Message
+
+
+def _normalize_mac_address(mac_address):
+    """
+    Converts a MAC address (or key cache entry) to its 6 raw bytes.
+
+    Args:
+        mac_address (bytes, str or KeyCacheEntry): The MAC address of the sending device.
+
+    Returns:
+        bytes: The raw bytes of the MAC address.
+    """
+
+    # Entries already hold their normalized MAC address.
+    if isinstance(mac_address, cryptography.KeyCacheEntry):
+        return mac_address.mac_address
+
+    return cryptography.KeyCache.normalize_mac_address(mac_address)
+
+
+class DecodeCache:
+    """
+    A class to cache parsed DSL Status messages by the MAC address and encrypted bytes they
+    were decoded from.
+
+    Modems re-broadcast the same status every ~10 seconds, so while a line is stable many
+    broadcasts are byte-identical and can be returned without decrypting or parsing them again.
+    The cached Message instances are shared so should not be modified.
+    """
+
+    def __init__(self, max_size=1024, ttl=60.0):
+        """
+        Initialize an empty decode cache.
+
+        Args:
+            max_size (int, optional):
+                The maximum number of messages to hold before the least recently used entry is
+                evicted. Defaults to 1024.
+            ttl (float, optional):
+                The number of seconds a message is cached for (None to never expire).
+                Defaults to 60 seconds.
+
+        Raises:
+            ValueError: If the maximum size is less than 1.
+        """
+
+        # A cache that cannot hold anything would silently decode every message.
+        if max_size < 1:
+            raise ValueError('The decode cache must be able to hold at least 1 entry.')
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _get_cache_key(mac_address, encrypted_payload):
+        """
+        Obtains the cache key for a message.
+
+        Args:
+            mac_address (bytes, str or KeyCacheEntry): The MAC address of the sending device.
+            encrypted_payload (bytes): The encrypted bytes of the DSL Status message.
+
+        Returns:
+            tuple: The raw MAC address bytes and the encrypted bytes.
+        """
+
+        # The encrypted bytes are hashed by the dictionary (and copied out of any reused buffer).
+        return _normalize_mac_address(mac_address), bytes(encrypted_payload)
+
+    def lookup(self, mac_address, encrypted_payload):
+        """
+        Obtains the previously parsed message for identical encrypted bytes.
+
+        Args:
+            mac_address (bytes, str or KeyCacheEntry): The MAC address of the sending device.
+            encrypted_payload (bytes): The encrypted bytes of the DSL Status message.
+
+        Returns:
+            Message: The cached message, or None if it is not cached (or has expired).
+        """
+        cache_key = self._get_cache_key(mac_address, encrypted_payload)
+        entry = self._entries.get(cache_key)
+
+        # Has this message been seen before?
+        if entry is None:
+            self.misses += 1
+            return None
+
+        message, expires = entry
+
+        # Expired messages are decoded again (e.g. so a changed key is noticed).
+        if expires is not None and expires < time.monotonic():
+            del self._entries[cache_key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(cache_key)
+        return message
+
+    def store(self, mac_address, encrypted_payload, message):
+        """
+        Caches a parsed message against the encrypted bytes it was decoded from.
+
+        Args:
+            mac_address (bytes, str or KeyCacheEntry): The MAC address of the sending device.
+            encrypted_payload (bytes): The encrypted bytes of the DSL Status message.
+            message (Message): The parsed DSL Status message.
+
+        Returns:
+            None
+        """
+        cache_key = self._get_cache_key(mac_address, encrypted_payload)
+        self._entries[cache_key] = (
+            message,
+            None if self.ttl is None else time.monotonic() + self.ttl
+        )
+        self._entries.move_to_end(cache_key)
+
+        # Evict the least recently used entry if the cache is now too big.
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def decode(self, mac_address, encrypted_payload):
+        """
+        Decrypts and parses DSL Status broadcast bytes, skipping both for repeated broadcasts.
+
+        Args:
+            mac_address (bytes, str or KeyCacheEntry): The MAC address of the sending device.
+            encrypted_payload (bytes): The encrypted bytes of the DSL Status message.
+
+        Returns:
+            Message: The parsed (and possibly shared) DSL Status message.
+
+        Raises:
+            ValueError: If the incorrect number of bytes are supplied, the protocol signature
+                        bytes are not found or the DSL type is invalid (which usually means the
+                        wrong MAC address was used).
+        """
+        message = self.lookup(mac_address, encrypted_payload)
+
+        # Only decrypt and parse messages that have not been seen before.
+        if message is None:
+            message = Message.from_buffer(
+                cryptography.decrypt_bytes(mac_address, encrypted_payload)
+            )
+
+            # Check the DSL type is valid (otherwise the wrong key was probably used) so an
+            # undecryptable broadcast is never cached.
+            if message.dsl_type not in DSL_TYPE_VALUES:
+                raise ValueError('Invalid DSL type (the MAC address may be incorrect).')
+
+            self.store(mac_address, encrypted_payload, message)
+
+        return message
+
+    def invalidate(self, mac_address=None):
+        """
+        Removes the messages from a MAC address (or all messages) from the cache.
+
+        Args:
+            mac_address (bytes or str, optional):
+                The MAC address to remove. Defaults to None which removes all entries.
+
+        Returns:
+            int: The number of entries removed.
+        """
+
+        # Is the whole cache being cleared?
+        if mac_address is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+
+        mac_address = _normalize_mac_address(mac_address)
+        cache_keys = [cache_key for cache_key in self._entries if cache_key[0] == mac_address]
+        for cache_key in cache_keys:
+            del self._entries[cache_key]
+        return len(cache_keys)
+
+    def stats(self):
+        """
+        Obtains the cache counters.
+
+        Returns:
+            dict: The size, maximum size, hits, misses, evictions and expirations of this cache.
+        """
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+    def __len__(self):
+        """
+        Obtains the number of messages currently cached.
+
+        Returns:
+            int: The number of cache entries.
+        """
+        return len(self._entries)
+
+
+class ChangeFilter:
+    """
+    A class to detect when a device's decoded DSL Status message actually changes.
+
+    Messages are compared by their packed bytes, so differences hidden by string truncation
+    (e.g. data after a null terminator) are not reported as changes.
+    """
+
+    def __init__(self):
+        """
+        Initialize a change filter that has not seen any messages.
+        """
+        self._last = {}
+
+    def changed(self, device, message):
+        """
+        Records a device's latest message and checks whether it differs from its previous one.
+
+        Args:
+            device (hashable): Anything identifying the device (e.g. its MAC or IP address).
+            message (Message): The device's latest DSL Status message.
+
+        Returns:
+            bool: Whether the message differs (always True for a device's first message).
+        """
+        last = self._last.get(device)
+
+        # A cached message being repeated is unchanged without needing to compare it.
+        if last is not None and last[0] is message:
+            return False
+
+        packed = message.convert_to_bytes()
+
+        # Is this the same as the last message from this device?
+        if last is not None and last[1] == packed:
+            self._last[device] = (message, packed)
+            return False
+
+        self._last[device] = (message, packed)
+        return True
+
+    def forget(self, device=None):
+        """
+        Forgets a device's (or every device's) last message so the next one is reported.
+
+        Args:
+            device (hashable, optional): The device to forget. Defaults to None which forgets
+                every device.
+
+        Returns:
+            None
+        """
+        if device is None:
+            self._last.clear()
+        else:
+            self._last.pop(device, None)
+
+
+def changed_only(broadcasts, cache=None):
+    """
+    Decodes a stream of DSL Status broadcasts, only yielding messages whose content changed.
+
+    Byte-identical broadcasts are skipped without being decrypted, and broadcasts that decode to
+    the same content as the device's previous message are skipped without being yielded.
+
+    Args:
+        broadcasts (iterable): The (MAC address, encrypted bytes) of each broadcast.
+        cache (DecodeCache, optional): The cache to decode through. Defaults to None which
+            creates a new cache.
+
+    Yields:
+        tuple: The MAC address and the changed Message.
+
+    Raises:
+        ValueError: If the incorrect number of bytes are supplied or the protocol signature
+                    bytes are not found.
+    """
+
+    # Use a private cache if one is not being shared.
+    if cache is None:
+        cache = DecodeCache()
+
+    change_filter = ChangeFilter()
+
+    for mac_address, encrypted_payload in broadcasts:
+        message = cache.decode(mac_address, encrypted_payload)
+
+        # Only yield messages that differ from the device's last message.
+        if change_filter.changed(_normalize_mac_address(mac_address), message):
+            yield mac_address, message
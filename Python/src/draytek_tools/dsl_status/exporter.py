@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Exporter Module.
+This module provides methods for serving DSL line metrics and listener statistics to Prometheus.
+
+Listeners only record a reference to each device's latest message (and time a couple of pipeline
+stages into fixed histograms). The metrics text is rendered from those references into a
+snapshot every refresh interval, re-rendering only the devices that have changed, and a scrape
+just writes the latest snapshot, so scrapes never hold up receiving.
+"""
+
+# The exporter runs on an asyncio event loop.
+import asyncio
+
+# The time each message was recorded is exported.
+import time
+
+# The pipeline stage timings are counted into histograms.
+from .instrumentation import Histogram
+
+# The DSL type is exported by name.
+from .message import Message
+
+
+# The default HTTP port metrics are served on.
+DEFAULT_PORT = 9944
+
+# The content type of the Prometheus text exposition format.
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# The per-device metrics taken from each message: (name, type, help, Message attribute).
+DEVICE_METRICS = (
+    ('dsl_status_upload_speed_bps', 'gauge', 'DSL upload speed in bits per second.',
+     'dsl_upload_speed'),
+    ('dsl_status_download_speed_bps', 'gauge', 'DSL download speed in bits per second.',
+     'dsl_download_speed'),
+    ('dsl_status_vdsl_snr_upload', 'gauge', 'VDSL upload signal-to-noise ratio.',
+     'vdsl_snr_upload'),
+    ('dsl_status_vdsl_snr_download', 'gauge', 'VDSL download signal-to-noise ratio.',
+     'vdsl_snr_download'),
+    ('dsl_status_adsl_loop_attenuation', 'gauge', 'ADSL loop attenuation.',
+     'adsl_loop_att'),
+    ('dsl_status_adsl_snr_margin', 'gauge', 'ADSL signal-to-noise ratio margin.',
+     'adsl_snr_margin'),
+    ('dsl_status_tx_cells_total', 'counter', 'ADSL cells transmitted.',
+     'adsl_tx_cells'),
+    ('dsl_status_rx_cells_total', 'counter', 'ADSL cells received.',
+     'adsl_rx_cells'),
+    ('dsl_status_tx_crc_errors_total', 'counter', 'ADSL transmit CRC errors.',
+     'adsl_tx_crc_errors'),
+    ('dsl_status_rx_crc_errors_total', 'counter', 'ADSL receive CRC errors.',
+     'adsl_rx_crc_errors'),
+    ('dsl_status_modem_timestamp_seconds', 'gauge', 'The modem clock when it sent the message.',
+     'timestamp'),
+)
+
+# The line states that are always exported (so a state change is a change of series value).
+KNOWN_STATES = ('SHOWTIME', 'TRAINING', 'READY')
+
+# The listener statistics that are gauges (the rest are counters).
+LISTENER_GAUGES = frozenset((
+    'queued',
+    'receiver_receive_buffer_size',
+    'cache_size',
+    'cache_max_size'
+))
+
+
+def _escape(value):
+    """
+    Escapes a label value.
+
+    Args:
+        value (str): The label value.
+
+    Returns:
+        str: The escaped label value.
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _decode(value):
+    """
+    Decodes a string attribute of a message.
+
+    Args:
+        value (bytes): The string attribute.
+
+    Returns:
+        str: The escaped text (truncated at any null byte).
+    """
+    return _escape(bytes(value).split(b'\0', 1)[0].decode('ascii', 'replace'))
+
+
+class MetricsExporter:
+    """
+    A class to serve DSL Status metrics over HTTP for Prometheus to scrape.
+
+    Pass an exporter to a Listener (metrics=exporter) to export every device it receives from
+    (and its statistics), or call record() with messages received some other way.
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, interval=1.0):
+        """
+        Initialize an exporter (call start() to begin serving).
+
+        Args:
+            host (str, optional): The address to serve on. Defaults to '127.0.0.1'.
+            port (int, optional): The TCP port to serve on. Defaults to 9944.
+            interval (float, optional): The seconds between snapshots. Defaults to 1.
+        """
+        self.host = host
+        self.port = port
+        self.interval = interval
+
+        # The pipeline stage timings.
+        self.decrypt_seconds = Histogram(
+            'dsl_status_decrypt_seconds',
+            'Time taken to decrypt each broadcast.'
+        )
+        self.receive_to_parse_seconds = Histogram(
+            'dsl_status_receive_to_parse_seconds',
+            'Time from a broadcast being received to its message being parsed.'
+        )
+
+        # Every histogram exported (e.g. add an instrumentation.HistogramSink's histograms).
+        self.histograms = [self.decrypt_seconds, self.receive_to_parse_seconds]
+
+        # The latest (message, time recorded) of each device not in a registry.
+        self.devices = {}
+
+        # The listeners whose statistics and registries are exported.
+        self.listeners = []
+
+        # The rendered lines of each device (reused while its message is unchanged).
+        self._rendered = {}
+        self._snapshot = b''
+        self._server = None
+        self._refresher = None
+
+    def record(self, name, message, timestamp=None):
+        """
+        Records the latest message of a device.
+
+        Args:
+            name (str): The name of the device.
+            message (Message or MessageView): The latest message.
+            timestamp (float, optional): When the message was received.
+                Defaults to None which is now.
+        """
+        self.devices[name] = (message, time.time() if timestamp is None else timestamp)
+
+    def watch(self, listener):
+        """
+        Exports a listener's statistics and the devices in its registry.
+
+        Args:
+            listener (Listener): The listener.
+        """
+        self.listeners.append(listener)
+
+    def _device_lines(self, name, message, last_seen):
+        """
+        Renders the lines of a single device (reusing them if its message is unchanged).
+
+        Args:
+            name (str): The name of the device.
+            message (Message or MessageView): The latest message.
+            last_seen (float): When the message was received.
+
+        Returns:
+            tuple: The device's lines for each metric family (in DEVICE_METRICS order, then the
+                   state, information and last seen families).
+        """
+        cached = self._rendered.get(name)
+        if cached is not None and cached[0] is message and cached[1] == last_seen:
+            return cached[2]
+
+        label = f'device="{_escape(name)}"'
+        lines = [f'{metric[0]}{{{label}}} {getattr(message, metric[3])}'
+                 for metric in DEVICE_METRICS]
+
+        # The state is an enum (1 for the current state and 0 for the others).
+        state = _decode(message.state)
+        lines.append('\n'.join(
+            f'dsl_status_state{{{label},state="{known_state}"}} {int(known_state == state)}'
+            for known_state in (KNOWN_STATES if state in KNOWN_STATES else KNOWN_STATES + (state,))
+        ))
+
+        # Descriptive values are labels of a constant series.
+        try:
+            dsl_type = Message.DslType(message.dsl_type).name
+        except ValueError:
+            dsl_type = str(message.dsl_type)
+        lines.append(
+            f'dsl_status_info{{{label},dsl_type="{dsl_type}",'
+            f'running_mode="{_decode(message.running_mode)}",'
+            f'firmware="{_decode(message.modem_firmware_version)}"}} 1'
+        )
+        lines.append(f'dsl_status_last_seen_seconds{{{label}}} {last_seen}')
+
+        rendered = tuple(lines)
+        self._rendered[name] = (message, last_seen, rendered)
+        return rendered
+
+    def render(self):
+        """
+        Renders every metric.
+
+        Returns:
+            bytes: The metrics in the Prometheus text format.
+        """
+        devices = dict(self.devices)
+        output = []
+
+        # The listener and registry counters (by name) and their samples.
+        counters = {}
+
+        def add_counter(name, metric_type, sample):
+            counters.setdefault(name, (metric_type, []))[1].append(name + sample)
+
+        # Gather the registry devices and statistics of each listener.
+        for listener in self.listeners:
+            listener_label = f'listener="{_escape(f"{listener.host}:{listener.port}")}"'
+            registry = listener.protocol.registry
+            if registry is not None:
+                for name, device in registry.devices.items():
+                    if device.last_message is not None:
+                        devices[name] = (device.last_message, device.last_seen)
+                    device_label = f'device="{_escape(name)}"'
+                    add_counter('dsl_status_device_received_total', 'counter',
+                                f'{{{device_label}}} {device.received}')
+                    add_counter('dsl_status_device_invalid_total', 'counter',
+                                f'{{{device_label}}} {device.invalid}')
+
+            for key, value in _flatten(listener.stats()):
+                gauge = key in LISTENER_GAUGES
+                add_counter(
+                    f'dsl_status_listener_{key}' + ('' if gauge else '_total'),
+                    'gauge' if gauge else 'counter',
+                    f'{{{listener_label}}} {value}'
+                )
+
+        # Forget devices that are no longer recorded.
+        for name in self._rendered.keys() - devices.keys():
+            del self._rendered[name]
+
+        rendered = [self._device_lines(name, *devices[name]) for name in sorted(devices)]
+
+        # Each metric family is written together.
+        families = [(metric[0], metric[1], metric[2]) for metric in DEVICE_METRICS] + [
+            ('dsl_status_state', 'gauge', 'The DSL line state (1 for the current state).'),
+            ('dsl_status_info', 'gauge', 'The DSL type, running mode and modem firmware.'),
+            ('dsl_status_last_seen_seconds', 'gauge', 'When the latest message was received.'),
+        ]
+        for index, (name, metric_type, help_text) in enumerate(families):
+            output.append(f'# HELP {name} {help_text}')
+            output.append(f'# TYPE {name} {metric_type}')
+            output.extend(lines[index] for lines in rendered)
+
+        # Listener and registry counters are grouped by name.
+        for name, (metric_type, samples) in counters.items():
+            output.append(f'# TYPE {name} {metric_type}')
+            output.extend(samples)
+
+        for histogram in self.histograms:
+            output.extend(histogram.render())
+
+        return ('\n'.join(output) + '\n').encode('utf-8')
+
+    def refresh(self):
+        """
+        Renders a new snapshot for scrapes to be served.
+
+        Returns:
+            bytes: The new snapshot.
+        """
+        self._snapshot = self.render()
+        return self._snapshot
+
+    async def _refresh_periodically(self):
+        """
+        Renders a new snapshot every interval.
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            self.refresh()
+
+    async def _handle(self, reader, writer):
+        """
+        Answers a single HTTP request with the latest snapshot.
+
+        Args:
+            reader (asyncio.StreamReader): The request stream.
+            writer (asyncio.StreamWriter): The response stream.
+        """
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5)
+            path = request.split(b' ', 2)[1] if request.count(b' ') >= 2 else b''
+
+            if path.split(b'?', 1)[0] in (b'/', b'/metrics'):
+                body = self._snapshot
+                status = b'200 OK'
+                content_type = CONTENT_TYPE.encode('ascii')
+            else:
+                body = b'Not Found\n'
+                status = b'404 Not Found'
+                content_type = b'text/plain'
+
+            writer.write(
+                b'HTTP/1.1 ' + status + b'\r\nContent-Type: ' + content_type
+                + b'\r\nContent-Length: ' + str(len(body)).encode('ascii')
+                + b'\r\nConnection: close\r\n\r\n' + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """
+        Starts serving metrics.
+
+        Returns:
+            MetricsExporter: This exporter.
+        """
+        self.refresh()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self._refresher = asyncio.get_running_loop().create_task(self._refresh_periodically())
+        return self
+
+    def close(self):
+        """
+        Stops serving metrics.
+        """
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    async def __aenter__(self):
+        """
+        Starts serving metrics when entering an "async with" block.
+
+        Returns:
+            MetricsExporter: This exporter.
+        """
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """
+        Stops serving metrics when leaving an "async with" block.
+        """
+        self.close()
+
+
+def _flatten(stats, prefix=''):
+    """
+    Flattens nested statistics into numeric values (skipping per-device statistics).
+
+    Args:
+        stats (dict): The statistics.
+        prefix (str, optional): The prefix of the flattened names. Defaults to ''.
+
+    Yields:
+        tuple: The flattened name and value of each numeric statistic.
+    """
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            if key != 'devices':
+                yield from _flatten(value, f'{prefix}{key}_')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield prefix + key, value
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Instrumentation Module.
+This module provides methods for timing each stage of decoding DSL Status broadcasts.
+
+The decoding code checks ENABLED before timing anything, so instrumentation costs a single
+attribute lookup per call while it is disabled. Once enabled, every Nth call (the sample rate) has
+its stages timed and each timing is passed to every sink, for example:
+
+    sink = instrumentation.CounterSink()
+    with instrumentation.enabled(sink, sample_rate=0.1):
+        ...
+    print(instrumentation.format_report(sink.report()))
+"""
+
+# Histogram buckets are found by binary search.
+import bisect
+
+# Instrumentation can be enabled for a block of code.
+import contextlib
+
+# Stages are timed with the highest resolution clock.
+import time
+
+
+# The decoding stages (in the order they happen).
+STAGE_RECEIVE = 'receive'
+STAGE_KEY_LOOKUP = 'key_lookup'
+STAGE_DECRYPT = 'decrypt'
+STAGE_UNPACK = 'unpack'
+STAGE_TRUNCATE = 'truncate'
+STAGE_RENDER = 'render'
+STAGES = (
+    STAGE_RECEIVE,
+    STAGE_KEY_LOOKUP,
+    STAGE_DECRYPT,
+    STAGE_UNPACK,
+    STAGE_TRUNCATE,
+    STAGE_RENDER
+)
+
+# The default histogram buckets (in seconds).
+DEFAULT_BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1
+)
+
+# The clock stages are timed with.
+clock = time.perf_counter
+
+# Whether stages are being timed (checked by the decoding code before anything else).
+ENABLED = False
+
+# The sinks timings are passed to and the sampling state.
+_sinks = ()
+_sample_interval = 1
+_countdowns = {}
+
+
+def enable(*sinks, sample_rate=1.0):
+    """
+    Starts timing stages.
+
+    Args:
+        *sinks: The sinks (objects with a record(stage, seconds, count) method) to pass each
+            timing to.
+        sample_rate (float, optional): The fraction of calls to time (rounded to every Nth call).
+            Defaults to 1 which times every call.
+
+    Raises:
+        ValueError: If the sample rate is not greater than 0 and at most 1.
+    """
+    # pylint: disable=global-statement
+    global ENABLED, _sinks, _sample_interval
+
+    if not 0 < sample_rate <= 1:
+        raise ValueError('The sample rate must be greater than 0 and at most 1.')
+
+    _sinks = sinks
+    _sample_interval = max(1, round(1 / sample_rate))
+    _countdowns.clear()
+    ENABLED = bool(sinks)
+
+
+def disable():
+    """
+    Stops timing stages.
+    """
+    # pylint: disable=global-statement
+    global ENABLED, _sinks
+    ENABLED = False
+    _sinks = ()
+
+
+@contextlib.contextmanager
+def enabled(*sinks, sample_rate=1.0):
+    """
+    Times stages for the duration of a "with" block.
+
+    Args:
+        *sinks: The sinks to pass each timing to.
+        sample_rate (float, optional): The fraction of calls to time. Defaults to 1.
+
+    Yields:
+        None
+    """
+    enable(*sinks, sample_rate=sample_rate)
+    try:
+        yield
+    finally:
+        disable()
+
+
+def sample(stage):
+    """
+    Decides whether to time the stages of this call.
+
+    Each stage is counted separately so every stage is sampled evenly (whichever order they
+    happen in).
+
+    Args:
+        stage (str): The first stage the call times.
+
+    Returns:
+        bool: True for every Nth call (where N is the sample interval).
+    """
+    countdown = _countdowns.get(stage, 1) - 1
+    if countdown > 0:
+        _countdowns[stage] = countdown
+        return False
+
+    _countdowns[stage] = _sample_interval
+    return True
+
+
+def record(stage, seconds, count=1):
+    """
+    Passes a timing to every sink.
+
+    Args:
+        stage (str): The stage (e.g. STAGE_DECRYPT).
+        seconds (float): The time the stage took (for all the messages).
+        count (int, optional): The number of messages the stage handled together.
+            Defaults to 1.
+    """
+    for sink in _sinks:
+        sink.record(stage, seconds, count)
+
+
+class Histogram:
+    """
+    A class to count observations into fixed buckets (a Prometheus histogram).
+    """
+
+    __slots__ = ('name', 'help', 'bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, name, help_text, bounds=DEFAULT_BUCKETS):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            name (str): The metric name.
+            help_text (str): The metric description.
+            bounds (tuple, optional): The ascending upper bounds of the buckets.
+                Defaults to DEFAULT_BUCKETS.
+        """
+        self.name = name
+        self.help = help_text
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value, count=1):
+        """
+        Counts observations of a value.
+
+        Args:
+            value (float): The observed value.
+            count (int, optional): The number of observations (e.g. a batch's average).
+                Defaults to 1.
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += count
+        self.sum += value * count
+        self.count += count
+
+    def render(self):
+        """
+        Renders the histogram.
+
+        Returns:
+            list: The lines of the histogram in the Prometheus text format.
+        """
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+
+        # Buckets are cumulative.
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f'{self.name}_sum {self.sum}')
+        lines.append(f'{self.name}_count {self.count}')
+
+        return lines
+
+
+class CounterSink:
+    """
+    A sink totalling the time and messages of each stage (for a profile report).
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty sink.
+        """
+        self.totals = {}
+
+    def record(self, stage, seconds, count=1):
+        """
+        Adds a timing.
+
+        Args:
+            stage (str): The stage.
+            seconds (float): The time the stage took (for all the messages).
+            count (int, optional): The number of messages. Defaults to 1.
+        """
+        totals = self.totals.get(stage)
+        if totals is None:
+            self.totals[stage] = [seconds, count]
+        else:
+            totals[0] += seconds
+            totals[1] += count
+
+    def reset(self):
+        """
+        Forgets every timing.
+        """
+        self.totals = {}
+
+    def report(self):
+        """
+        Reports the cost of each stage per message.
+
+        Returns:
+            dict: The messages sampled, the mean seconds per message and the share of the total
+                  per message cost of each stage (in STAGES order, then any other stages).
+        """
+        stages = [stage for stage in STAGES if stage in self.totals]
+        stages += sorted(stage for stage in self.totals if stage not in STAGES)
+
+        means = {stage: self.totals[stage][0] / self.totals[stage][1] for stage in stages}
+        total = sum(means.values())
+
+        return {
+            stage: {
+                'messages': self.totals[stage][1],
+                'mean_seconds': means[stage],
+                'share': means[stage] / total if total else 0.0
+            }
+            for stage in stages
+        }
+
+
+class HistogramSink:
+    """
+    A sink counting the per message time of each stage into histograms (e.g. to add to a
+    MetricsExporter's histograms).
+    """
+
+    def __init__(self, prefix='dsl_status_stage', bounds=DEFAULT_BUCKETS):
+        """
+        Initialize a sink with a histogram for every stage.
+
+        Args:
+            prefix (str, optional): The start of each histogram's name.
+                Defaults to 'dsl_status_stage'.
+            bounds (tuple, optional): The bucket upper bounds. Defaults to DEFAULT_BUCKETS.
+        """
+        self.histograms = {
+            stage: Histogram(
+                f'{prefix}_{stage}_seconds',
+                f'Time taken by the {stage} stage per message.',
+                bounds
+            )
+            for stage in STAGES
+        }
+
+    def record(self, stage, seconds, count=1):
+        """
+        Adds a timing.
+
+        Args:
+            stage (str): The stage.
+            seconds (float): The time the stage took (for all the messages).
+            count (int, optional): The number of messages. Defaults to 1.
+        """
+        histogram = self.histograms.get(stage)
+        if histogram is not None:
+            histogram.observe(seconds / count, count)
+
+
+class CallbackSink:
+    """
+    A sink passing every timing to a function.
+    """
+
+    __slots__ = ('callback',)
+
+    def __init__(self, callback):
+        """
+        Initialize the sink.
+
+        Args:
+            callback (callable): A function called with each (stage, seconds, count).
+        """
+        self.callback = callback
+
+    def record(self, stage, seconds, count=1):
+        """
+        Passes on a timing.
+
+        Args:
+            stage (str): The stage.
+            seconds (float): The time the stage took (for all the messages).
+            count (int, optional): The number of messages. Defaults to 1.
+        """
+        self.callback(stage, seconds, count)
+
+
+def format_report(report):
+    """
+    Formats a profile report as a table.
+
+    Args:
+        report (dict): A report from CounterSink.report().
+
+    Returns:
+        str: The cost of each stage per message.
+    """
+    lines = [f'{"Stage":<12} {"Messages":>10} {"Mean (µs)":>10} {"Share":>7}']
+    for stage, stats in report.items():
+        lines.append(
+            f'{stage:<12} {stats["messages"]:>10} {stats["mean_seconds"] * 1000000:>10.2f}'
+            f' {stats["share"]:>7.1%}'
+        )
+    return '\n'.join(lines)
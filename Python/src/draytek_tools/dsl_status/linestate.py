@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Line State Module.
+This module provides methods for tracking the state of many DSL lines and reporting changes.
+
+A line is only considered to have dropped (or come back) after a number of consecutive
+broadcasts agree, so a single odd broadcast is not reported as a retrain. Retrains are counted to
+detect flapping lines (which are only considered stable again after a quiet period), sync speeds
+are compared against the best seen to detect downgrades, and lines that stop broadcasting are
+reported as silent. Every device's next deadline is kept in a single timer wheel, so checking
+for silent and stable lines costs the same however many devices are tracked.
+"""
+
+# Recent retrains are kept in a bounded queue.
+from collections import deque
+
+# Messages without a receive time are given the current time.
+import time
+
+
+# The state of a line that is in sync.
+SHOWTIME = b'SHOWTIME'
+
+# The kinds of event.
+EVENT_UP = 'up'
+EVENT_DOWN = 'down'
+EVENT_RETRAIN = 'retrain'
+EVENT_DOWNGRADE = 'downgrade'
+EVENT_RESTORED = 'restored'
+EVENT_FLAPPING = 'flapping'
+EVENT_STABLE = 'stable'
+EVENT_SILENT = 'silent'
+EVENT_RESUMED = 'resumed'
+
+
+class LineEvent:
+    """
+    A class to represent a change in the state of a line.
+
+    The detail depends on the kind of event:
+        EVENT_UP: The (upload, download) sync speeds.
+        EVENT_DOWN: The state the line left SHOWTIME for.
+        EVENT_RETRAIN: The seconds the line was down (None if the retrain happened between
+            broadcasts so was only seen by the running mode or sync speeds changing).
+        EVENT_DOWNGRADE: The (upload, download) sync speeds and the best (upload, download)
+            sync speeds seen.
+        EVENT_RESTORED: The (upload, download) sync speeds.
+        EVENT_FLAPPING: The number of retrains in the flap window.
+        EVENT_STABLE: The seconds since the last retrain.
+        EVENT_SILENT: When the last broadcast was received.
+        EVENT_RESUMED: The seconds the line was silent for.
+    """
+
+    __slots__ = ('time', 'device', 'kind', 'detail')
+
+    def __init__(self, time_, device, kind, detail=None):
+        """
+        Initialize an event.
+
+        Args:
+            time_ (float): When the event happened (seconds).
+            device (object): The device whose line changed.
+            kind (str): The kind of event (e.g. EVENT_RETRAIN).
+            detail (object, optional): The detail of the event. Defaults to None.
+        """
+        self.time = time_
+        self.device = device
+        self.kind = kind
+        self.detail = detail
+
+    def __repr__(self):
+        """
+        Converts this event to a string representation of its contents.
+
+        Returns:
+            str: A string representing this event.
+        """
+        return f'LineEvent({self.time!r}, {self.device!r}, {self.kind!r}, {self.detail!r})'
+
+
+class TimerWheel:
+    """
+    A class to keep the deadlines of many keys in a hashed timer wheel.
+
+    Deadlines are rounded up to the wheel's resolution and kept in the slot of that tick, so
+    scheduling, cancelling and expiring each take constant time. Deadlines beyond one turn of
+    the wheel wait in their slot until their turn comes round.
+    """
+
+    def __init__(self, resolution=1.0, slots=1024, now=None):
+        """
+        Initialize an empty timer wheel.
+
+        Args:
+            resolution (float, optional): The seconds between ticks. Defaults to 1.
+            slots (int, optional): The number of slots in the wheel. Defaults to 1024.
+            now (float, optional): The current time. Defaults to None which uses the current
+                time.
+
+        Raises:
+            ValueError: If the resolution is not positive or there are no slots.
+        """
+
+        # The wheel must turn and have somewhere to keep the deadlines.
+        if resolution <= 0 or slots < 1:
+            raise ValueError('The resolution must be positive and there must be slots.')
+
+        self.resolution = resolution
+        self._slots = [{} for _ in range(slots)]
+        self._tick = int((time.time() if now is None else now) // resolution)
+        self._count = 0
+
+    def tick(self, deadline):
+        """
+        Obtains the tick a deadline expires on.
+
+        Args:
+            deadline (float): The deadline (seconds).
+
+        Returns:
+            int: The tick.
+        """
+        return -int(-deadline // self.resolution)
+
+    def schedule(self, key, deadline):
+        """
+        Schedules a key (which must not already be scheduled).
+
+        Args:
+            key (object): The key.
+            deadline (float): When the key expires (seconds).
+
+        Returns:
+            int: The tick the key was scheduled on (needed to cancel it).
+        """
+        tick = max(self.tick(deadline), self._tick + 1)
+        self._slots[tick % len(self._slots)][key] = tick
+        self._count += 1
+        return tick
+
+    def cancel(self, key, tick):
+        """
+        Cancels a scheduled key.
+
+        Args:
+            key (object): The key.
+            tick (int): The tick the key was scheduled on.
+        """
+        if self._slots[tick % len(self._slots)].pop(key, None) is not None:
+            self._count -= 1
+
+    def advance(self, now=None):
+        """
+        Turns the wheel on to a time.
+
+        Args:
+            now (float, optional): The current time. Defaults to None which uses the current
+                time.
+
+        Returns:
+            list: The keys that expired (they are no longer scheduled).
+        """
+        now_tick = int((time.time() if now is None else now) // self.resolution)
+        slots = self._slots
+        expired = []
+
+        # A whole turn of the wheel visits every slot.
+        first_tick = max(self._tick + 1, now_tick - len(slots) + 1)
+        for tick in range(first_tick, now_tick + 1):
+            slot = slots[tick % len(slots)]
+            if not slot:
+                continue
+
+            due = [key for key, key_tick in slot.items() if key_tick <= now_tick]
+            for key in due:
+                del slot[key]
+            expired.extend(due)
+
+        self._tick = max(self._tick, now_tick)
+        self._count -= len(expired)
+        return expired
+
+    def __len__(self):
+        """
+        Obtains the number of scheduled keys.
+
+        Returns:
+            int: The number of keys.
+        """
+        return self._count
+
+
+class _Line:
+    """
+    A class to hold the state of a single line.
+    """
+
+    __slots__ = (
+        'up', 'pending', 'pending_since', 'state', 'running_mode', 'speeds', 'best_speeds',
+        'downgraded', 'down_since', 'retrains', 'flapping', 'last_seen', 'silent', 'scheduled'
+    )
+
+    def __init__(self, flap_count):
+        """
+        Initialize a line in an unknown state.
+
+        Args:
+            flap_count (int): The number of recent retrains to keep.
+        """
+        self.up = None
+        self.pending = 0
+        self.pending_since = None
+        self.state = None
+        self.running_mode = None
+        self.speeds = (0, 0)
+        self.best_speeds = (0, 0)
+        self.downgraded = False
+        self.down_since = None
+        self.retrains = deque(maxlen=flap_count)
+        self.flapping = False
+        self.last_seen = None
+        self.silent = False
+        self.scheduled = None
+
+
+class LineStateTracker:
+    """
+    A class to track the state of many DSL lines from their broadcasts and report changes as
+    events.
+
+    Feed it every decoded message (e.g. from a listener callback) and advance it regularly
+    (e.g. every second) to find silent and stable lines:
+
+        tracker = LineStateTracker()
+        events = tracker.update(address[0], message)
+        events = tracker.advance()
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        down_count=2,
+        up_count=2,
+        silence_timeout=35.0,
+        flap_count=3,
+        flap_window=900.0,
+        stable_time=1800.0,
+        downgrade_ratio=0.9,
+        restore_ratio=0.95,
+        now=None
+    ):
+        """
+        Initialize a tracker with no devices.
+
+        Args:
+            down_count (int, optional): The consecutive broadcasts out of SHOWTIME before a line
+                is down. Defaults to 2.
+            up_count (int, optional): The consecutive broadcasts in SHOWTIME before a line is up.
+                Defaults to 2.
+            silence_timeout (float, optional): The seconds without a broadcast before a line is
+                silent. Defaults to 35 (three missed 10 second broadcasts).
+            flap_count (int, optional): The retrains within the flap window that make a line
+                flapping. Defaults to 3.
+            flap_window (float, optional): The seconds the retrains must happen within.
+                Defaults to 900.
+            stable_time (float, optional): The seconds without a retrain before a flapping line
+                is stable again. Defaults to 1800.
+            downgrade_ratio (float, optional): The fraction of the best sync speed seen that a
+                line is downgraded below. Defaults to 0.9.
+            restore_ratio (float, optional): The fraction of the best sync speed seen that a
+                downgraded line must reach again to be restored. Defaults to 0.95.
+            now (float, optional): The current time. Defaults to None which uses the current
+                time.
+
+        Raises:
+            ValueError: If a count is less than 1 or the restore ratio is below the downgrade
+                        ratio.
+        """
+
+        # Every change needs at least one broadcast (or retrain) to be seen.
+        if min(down_count, up_count, flap_count) < 1:
+            raise ValueError('The broadcast and retrain counts must be at least 1.')
+
+        # Without a gap between the ratios a line could be downgraded and restored repeatedly.
+        if restore_ratio < downgrade_ratio:
+            raise ValueError('The restore ratio cannot be below the downgrade ratio.')
+
+        self.down_count = down_count
+        self.up_count = up_count
+        self.silence_timeout = silence_timeout
+        self.flap_count = flap_count
+        self.flap_window = flap_window
+        self.stable_time = stable_time
+        self.downgrade_ratio = downgrade_ratio
+        self.restore_ratio = restore_ratio
+
+        self.devices = {}
+        self.wheel = TimerWheel(now=now)
+
+    def _retrained(self, device, line, now, events):
+        """
+        Counts a retrain, reporting the line as flapping if it retrains too often.
+
+        Args:
+            device (object): The device.
+            line (_Line): The line.
+            now (float): The current time.
+            events (list): The events to add to.
+        """
+        retrains = line.retrains
+        retrains.append(now)
+
+        if (
+            not line.flapping and len(retrains) == self.flap_count and
+            now - retrains[0] <= self.flap_window
+        ):
+            line.flapping = True
+            events.append(LineEvent(now, device, EVENT_FLAPPING, len(retrains)))
+
+    def _check_speeds(self, device, line, now, events):
+        """
+        Compares a line's sync speeds against the best seen, reporting downgrades.
+
+        Args:
+            device (object): The device.
+            line (_Line): The line.
+            now (float): The current time.
+            events (list): The events to add to.
+        """
+        upload, download = line.speeds
+        best_upload = max(line.best_speeds[0], upload)
+        best_download = max(line.best_speeds[1], download)
+        line.best_speeds = (best_upload, best_download)
+
+        if not line.downgraded:
+            if (
+                upload < best_upload * self.downgrade_ratio or
+                download < best_download * self.downgrade_ratio
+            ):
+                line.downgraded = True
+                events.append(
+                    LineEvent(now, device, EVENT_DOWNGRADE, (line.speeds, line.best_speeds))
+                )
+        elif (
+            upload >= best_upload * self.restore_ratio and
+            download >= best_download * self.restore_ratio
+        ):
+            line.downgraded = False
+            events.append(LineEvent(now, device, EVENT_RESTORED, line.speeds))
+
+    def _deadline(self, line):
+        """
+        Obtains when a line next needs checking.
+
+        Args:
+            line (_Line): The line.
+
+        Returns:
+            float: The earliest of when the line becomes silent or stable (None if neither).
+        """
+        deadline = None
+        if not line.silent:
+            deadline = line.last_seen + self.silence_timeout
+        if line.flapping:
+            stable = line.retrains[-1] + self.stable_time
+            deadline = stable if deadline is None else min(deadline, stable)
+        return deadline
+
+    def _schedule(self, device, line):
+        """
+        Makes sure a line is in the timer wheel no later than its next deadline.
+
+        Deadlines that move later (as they do with every broadcast) are left where they are and
+        rescheduled when they expire, so most broadcasts do not touch the wheel.
+
+        Args:
+            device (object): The device.
+            line (_Line): The line.
+        """
+        deadline = self._deadline(line)
+        if deadline is None:
+            return
+
+        if line.scheduled is not None:
+            if line.scheduled <= self.wheel.tick(deadline):
+                return
+            self.wheel.cancel(device, line.scheduled)
+
+        line.scheduled = self.wheel.schedule(device, deadline)
+
+    def update(self, device, message, received=None):
+        """
+        Updates the state of a device's line from its latest message.
+
+        Args:
+            device (object): The device that sent the message (e.g. its name or IP address).
+            message (Message or MessageView): The DSL Status message.
+            received (float, optional): When the message was received (seconds).
+                Defaults to None which uses the current time.
+
+        Returns:
+            list: The LineEvent of each change (usually none).
+        """
+        now = time.time() if received is None else received
+        events = []
+
+        line = self.devices.get(device)
+        if line is None:
+            line = self.devices[device] = _Line(self.flap_count)
+
+        # A silent line has come back.
+        if line.silent:
+            line.silent = False
+            events.append(LineEvent(now, device, EVENT_RESUMED, now - line.last_seen))
+        line.last_seen = now
+
+        # Unlike Python, C uses null-terminated strings, truncate them.
+        state = bytes(message.state).split(b'\0', 1)[0]
+        running_mode = bytes(message.running_mode).split(b'\0', 1)[0]
+        speeds = (message.dsl_upload_speed, message.dsl_download_speed)
+        showtime = state == SHOWTIME
+
+        # The line is as it was.
+        if showtime == line.up:
+            line.pending = 0
+
+            # A line that stays up but changes mode or speed retrained between broadcasts.
+            if showtime and (running_mode != line.running_mode or speeds != line.speeds):
+                line.running_mode = running_mode
+                line.speeds = speeds
+                events.append(LineEvent(now, device, EVENT_RETRAIN, None))
+                self._retrained(device, line, now, events)
+                self._check_speeds(device, line, now, events)
+
+        # The line may be changing (but only once enough broadcasts agree).
+        else:
+            if not line.pending:
+                line.pending_since = now
+            line.pending += 1
+
+            if line.pending >= (self.up_count if showtime else self.down_count):
+                line.pending = 0
+                was_up = line.up
+                line.up = showtime
+
+                # The line came up (for the first time seen or after being down).
+                if showtime:
+                    line.running_mode = running_mode
+                    line.speeds = speeds
+                    if was_up is None:
+                        events.append(LineEvent(now, device, EVENT_UP, speeds))
+                    else:
+                        events.append(
+                            LineEvent(now, device, EVENT_RETRAIN, now - line.down_since)
+                        )
+                    self._check_speeds(device, line, now, events)
+
+                # The line went down (and dropping from SHOWTIME counts towards flapping).
+                else:
+                    line.down_since = line.pending_since
+                    events.append(
+                        LineEvent(now, device, EVENT_DOWN, state.decode('ascii', 'replace'))
+                    )
+                    if was_up:
+                        self._retrained(device, line, now, events)
+
+        line.state = state
+        self._schedule(device, line)
+        return events
+
+    def advance(self, now=None):
+        """
+        Finds the lines that have become silent or stable.
+
+        Args:
+            now (float, optional): The current time. Defaults to None which uses the current
+                time.
+
+        Returns:
+            list: The LineEvent of each change.
+        """
+        now = time.time() if now is None else now
+        events = []
+
+        for device in self.wheel.advance(now):
+            line = self.devices.get(device)
+            if line is None:
+                continue
+            line.scheduled = None
+
+            # The line has stopped broadcasting.
+            silent_at = line.last_seen + self.silence_timeout
+            if not line.silent and silent_at <= now:
+                line.silent = True
+                events.append(LineEvent(silent_at, device, EVENT_SILENT, line.last_seen))
+
+            # The flapping line has stopped retraining.
+            if line.flapping:
+                stable_at = line.retrains[-1] + self.stable_time
+                if stable_at <= now:
+                    line.flapping = False
+                    events.append(LineEvent(stable_at, device, EVENT_STABLE, self.stable_time))
+
+            # Deadlines that moved later are rescheduled.
+            self._schedule(device, line)
+
+        return events
+
+    def remove(self, device):
+        """
+        Forgets a device.
+
+        Args:
+            device (object): The device.
+        """
+        line = self.devices.pop(device, None)
+        if line is not None and line.scheduled is not None:
+            self.wheel.cancel(device, line.scheduled)
+
+    def stats(self):
+        """
+        Obtains the number of lines in each state.
+
+        Returns:
+            dict: The number of devices and how many are up, down, downgraded, flapping and
+                  silent.
+        """
+        stats = {'devices': len(self.devices), 'up': 0, 'down': 0, 'downgraded': 0,
+                 'flapping': 0, 'silent': 0}
+        for line in self.devices.values():
+            stats['up'] += line.up is True
+            stats['down'] += line.up is False
+            stats['downgraded'] += line.downgraded
+            stats['flapping'] += line.flapping
+            stats['silent'] += line.silent
+        return stats
+
+    def __len__(self):
+        """
+        Obtains the number of devices.
+
+        Returns:
+            int: The number of devices.
+        """
+        return len(self.devices)
@@ -0,0 +1,711 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Listener Module.
+This module provides methods for receiving DSL Status broadcasts with asyncio.
+"""
+
+# The listener runs on an asyncio event loop.
+import asyncio
+
+# We use the system socket APIs to listen for network traffic.
+import socket
+
+# The time each device was last heard from is recorded.
+import time
+
+# The DSL Status broadcasts are decrypted and parsed.
+from . import cryptography
+from .message import DSL_TYPE_VALUES, Message
+from .receiver import BatchReceiver
+
+# The receive stage of each datagram can be timed.
+from . import instrumentation
+
+
+# The UDP port DSL Status broadcasts are sent to.
+DEFAULT_PORT = 4944
+
+
+class DslStatusProtocol(asyncio.DatagramProtocol):
+    """
+    An asyncio protocol that decrypts and parses DSL Status broadcasts as they are received.
+
+    Each valid message is passed to the callback and/or put on the bounded queue. Messages that
+    arrive while the queue is full are dropped (and counted) rather than blocking the event loop.
+    Broadcasts from many devices can be received by supplying a DeviceRegistry instead of a
+    single MAC address, and repeated broadcasts can skip decryption and parsing by supplying a
+    DecodeCache (the cached Message instances are then shared so should not be modified).
+    Supplying a MetricsExporter times the decryption and parsing of each broadcast.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        mac_address=None,
+        callback=None,
+        queue=None,
+        registry=None,
+        cache=None,
+        metrics=None
+    ):
+        """
+        Initialize the protocol.
+
+        Args:
+            mac_address (bytes or str, optional): The MAC address of the sending device.
+                Defaults to None (a registry must then be supplied).
+            callback (callable, optional):
+                A function called with each valid (Message, address) as it is received.
+                Defaults to None.
+            queue (asyncio.Queue, optional):
+                A bounded queue each valid (Message, address) is put on. Defaults to None.
+            registry (DeviceRegistry, optional):
+                The devices to route each datagram to by its source IP address.
+                Defaults to None.
+            cache (DecodeCache, optional):
+                The cache of previously parsed messages to check before decrypting.
+                Defaults to None.
+            metrics (MetricsExporter, optional):
+                The exporter to record timings and devices without a registry in.
+                Defaults to None.
+
+        Raises:
+            ValueError: If neither a MAC address nor a registry is supplied.
+        """
+
+        # Every datagram needs a key to decrypt it.
+        if mac_address is None and registry is None:
+            raise ValueError('Either a MAC address or a device registry is required.')
+
+        self.mac_address = mac_address
+        self.callback = callback
+        self.queue = queue
+        self.registry = registry
+        self.cache = cache
+        self.metrics = metrics
+        self.transport = None
+
+        # Obtain the key and cipher once rather than for every message.
+        self.key = None if mac_address is None else cryptography.KEY_CACHE.get(mac_address)
+
+        # The number of datagrams received, rejected and dropped.
+        self.received = 0
+        self.invalid = 0
+        self.dropped = 0
+
+    def connection_made(self, transport):
+        """
+        Records the transport when the socket is ready.
+
+        Args:
+            transport (asyncio.DatagramTransport): The transport of the listening socket.
+        """
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        """
+        Decrypts, validates and parses a received datagram.
+
+        Args:
+            data (bytes): The received datagram.
+            addr (tuple): The address of the sender.
+        """
+        self.received += 1
+        metrics = self.metrics
+        if metrics is not None:
+            received_at = time.perf_counter()
+
+        # Time receiving the datagram (the event loop has already read it from the socket, so
+        # this is the routing and cache lookup before decryption) if instrumentation is enabled
+        # and this call is sampled.
+        timed = instrumentation.ENABLED and instrumentation.sample(instrumentation.STAGE_RECEIVE)
+        if timed:
+            started = instrumentation.clock()
+
+        # Identify the sending device (and so the key) when receiving from many devices.
+        if self.registry is None:
+            device = None
+            key = self.key
+        else:
+            device = self.registry.lookup(addr[0], data)
+
+            # Unknown senders are dropped (the registry counts them).
+            if device is None:
+                if timed:
+                    instrumentation.record(
+                        instrumentation.STAGE_RECEIVE, instrumentation.clock() - started
+                    )
+                return
+
+            device.received += 1
+            key = device.key
+
+        # Repeated broadcasts do not need decrypting or parsing again.
+        if self.cache is not None:
+            message = self.cache.lookup(key, data)
+            if message is not None:
+                if timed:
+                    instrumentation.record(
+                        instrumentation.STAGE_RECEIVE, instrumentation.clock() - started
+                    )
+                self._accept(device, message, addr)
+                return
+
+        if timed:
+            instrumentation.record(instrumentation.STAGE_RECEIVE, instrumentation.clock() - started)
+
+        # Perform the decryption (this also checks the length and protocol signature).
+        try:
+            if metrics is None:
+                decrypted_payload = cryptography.decrypt_bytes(key, data)
+            else:
+                decrypt_started = time.perf_counter()
+                decrypted_payload = cryptography.decrypt_bytes(key, data)
+                metrics.decrypt_seconds.observe(time.perf_counter() - decrypt_started)
+        except ValueError:
+            self._reject(device)
+            return
+
+        # Check the DSL type is valid (otherwise the wrong key was probably used).
+        if decrypted_payload[27] not in DSL_TYPE_VALUES:
+            self._reject(device)
+            return
+
+        message = Message.from_buffer(decrypted_payload)
+
+        if metrics is not None:
+            metrics.receive_to_parse_seconds.observe(time.perf_counter() - received_at)
+
+        if self.cache is not None:
+            self.cache.store(key, data, message)
+
+        self._accept(device, message, addr)
+
+    def batch_received(self, frames, addresses):
+        """
+        Decrypts, validates and parses a batch of received datagrams together.
+
+        Args:
+            frames (list): The received datagrams.
+            addresses (list): The address of the sender of each datagram.
+        """
+        self.received += len(frames)
+        metrics = self.metrics
+        if metrics is not None:
+            received_at = time.perf_counter()
+
+        # Identify the sending device (and so the key) of each datagram when receiving from
+        # many devices.
+        if self.registry is None:
+            devices = None
+            keys = self.key
+        else:
+            lookup = self.registry.lookup
+            routed = [
+                (frame, address, device)
+                for frame, address in zip(frames, addresses)
+                if (device := lookup(address[0], frame)) is not None
+            ]
+
+            # Unknown senders are dropped (the registry counts them).
+            frames = [frame for frame, _, _ in routed]
+            addresses = [address for _, address, _ in routed]
+            devices = [device for _, _, device in routed]
+            keys = [device.key for device in devices]
+
+            for device in devices:
+                device.received += 1
+
+        # Repeated broadcasts do not need decrypting or parsing again.
+        if self.cache is not None:
+            frames, addresses, devices, keys = self._accept_cached(
+                frames,
+                addresses,
+                devices,
+                keys
+            )
+
+        # Perform the decryption (this also checks the lengths and protocol signatures).
+        if metrics is None:
+            decrypted_payloads, statuses = cryptography.decrypt_many(keys, frames)
+        else:
+            decrypt_started = time.perf_counter()
+            decrypted_payloads, statuses = cryptography.decrypt_many(keys, frames)
+
+            # The batch is decrypted together so each broadcast took the average time.
+            if frames:
+                metrics.decrypt_seconds.observe(
+                    (time.perf_counter() - decrypt_started) / len(frames),
+                    len(frames)
+                )
+
+        for index, status in enumerate(statuses):
+            offset = index * cryptography.DECRYPTED_LENGTH
+            device = None if devices is None else devices[index]
+
+            # Check the message decrypted and the DSL type is valid.
+            if (
+                status != cryptography.STATUS_OK
+                or decrypted_payloads[offset + 27] not in DSL_TYPE_VALUES
+            ):
+                self._reject(device)
+                continue
+
+            message = Message.from_buffer(decrypted_payloads, offset)
+
+            if metrics is not None:
+                metrics.receive_to_parse_seconds.observe(time.perf_counter() - received_at)
+
+            if self.cache is not None:
+                self.cache.store(
+                    keys if devices is None else keys[index],
+                    frames[index],
+                    message
+                )
+
+            self._accept(device, message, addresses[index])
+
+    def _accept_cached(self, frames, addresses, devices, keys):
+        """
+        Passes on the cached messages of a batch and returns the datagrams still to decrypt.
+
+        Args:
+            frames (list): The received datagrams.
+            addresses (list): The address of the sender of each datagram.
+            devices (list): The device of each datagram (or None without a registry).
+            keys (KeyCacheEntry or list): The key for every datagram or the key of each datagram.
+
+        Returns:
+            tuple: The frames, addresses, devices and keys of the datagrams not in the cache.
+        """
+        single_key = devices is None
+        uncached = []
+
+        for index, frame in enumerate(frames):
+            key = keys if single_key else keys[index]
+            message = self.cache.lookup(key, frame)
+
+            # Cache misses are decrypted together afterwards.
+            if message is None:
+                uncached.append(index)
+            else:
+                self._accept(None if single_key else devices[index], message, addresses[index])
+
+        return (
+            [frames[index] for index in uncached],
+            [addresses[index] for index in uncached],
+            None if single_key else [devices[index] for index in uncached],
+            keys if single_key else [keys[index] for index in uncached],
+        )
+
+    def _reject(self, device):
+        """
+        Counts a datagram that failed validation.
+
+        Args:
+            device (Device): The device that sent the datagram (or None without a registry).
+        """
+        self.invalid += 1
+
+        # The registry unbinds learnt IP addresses whose datagrams keep failing.
+        if device is not None:
+            self.registry.record_invalid(device)
+
+    def _accept(self, device, message, addr):
+        """
+        Records a valid DSL Status message against its device and passes it on.
+
+        Args:
+            device (Device): The device that sent the message (or None without a registry).
+            message (Message): The parsed DSL Status message.
+            addr (tuple): The address of the sender.
+        """
+        if device is not None:
+            device.failures = 0
+            device.last_seen = time.time()
+            device.last_message = message
+        elif self.metrics is not None:
+            # Devices in a registry are read from it, others are exported by address.
+            self.metrics.record(addr[0], message)
+
+        self.message_received(message, addr)
+
+    def message_received(self, message, addr):
+        """
+        Passes a valid DSL Status message to the callback and queue.
+
+        Args:
+            message (Message): The parsed DSL Status message.
+            addr (tuple): The address of the sender.
+        """
+
+        # Notify the callback.
+        if self.callback is not None:
+            self.callback(message, addr)
+
+        # Queue the message for any consumers (never waiting for room).
+        if self.queue is not None:
+            try:
+                self.queue.put_nowait((message, addr))
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+
+class Listener:
+    """
+    A class to receive DrayTek® Vigor™ DSL Status broadcasts on an asyncio event loop.
+
+    Messages can be consumed with a callback or as an asynchronous iterator, for example:
+
+        async with Listener('aa:bb:cc:dd:ee:ff') as listener:
+            async for message, address in listener:
+                print(message)
+
+    To receive from many devices, supply a DeviceRegistry instead of a MAC address.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        mac_address=None,
+        callback=None,
+        host='0.0.0.0',
+        port=DEFAULT_PORT,
+        queue_size=1024,
+        registry=None,
+        cache=None,
+        metrics=None
+    ):
+        """
+        Initialize a listener (call start() or use "async with" to begin receiving).
+
+        Args:
+            mac_address (bytes or str, optional): The MAC address of the sending device.
+                Defaults to None (a registry must then be supplied).
+            callback (callable, optional):
+                A function called with each valid (Message, address) as it is received.
+                Defaults to None.
+            host (str, optional): The address to listen on. Defaults to all interfaces.
+            port (int, optional): The UDP port to listen on. Defaults to 4944.
+            queue_size (int, optional):
+                The maximum number of messages waiting to be iterated before newer messages are
+                dropped. Defaults to 1024.
+            registry (DeviceRegistry, optional):
+                The devices to route each datagram to by its source IP address.
+                Defaults to None.
+            cache (DecodeCache, optional):
+                The cache of previously parsed messages to check before decrypting.
+                Defaults to None.
+            metrics (MetricsExporter, optional):
+                The exporter to export this listener's devices, statistics and timings with.
+                Defaults to None.
+
+        Raises:
+            ValueError: If neither a MAC address nor a registry is supplied.
+        """
+        self.host = host
+        self.port = port
+        self.queue = asyncio.Queue(queue_size)
+        self.protocol = DslStatusProtocol(
+            mac_address,
+            callback,
+            self.queue,
+            registry,
+            cache,
+            metrics
+        )
+        self.transport = None
+        self._closed = False
+
+        if metrics is not None:
+            metrics.watch(self)
+
+    def _create_socket(self):
+        """
+        Creates and binds the non-blocking UDP socket to listen for DSL Status messages.
+
+        Returns:
+            socket.socket: The bound socket.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        try:
+            # Permit multiple receiver threads listening.
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+            # Bind to the requested interfaces and port.
+            sock.bind((self.host, self.port))
+            sock.setblocking(False)
+        except OSError:
+            sock.close()
+            raise
+
+        return sock
+
+    async def start(self):
+        """
+        Starts listening for DSL Status messages.
+
+        Returns:
+            Listener: This listener.
+        """
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: self.protocol,
+            sock=self._create_socket()
+        )
+        return self
+
+    def close(self):
+        """
+        Stops listening and ends any iteration once the queued messages have been consumed.
+
+        Returns:
+            None
+        """
+
+        # Closing more than once has no further effect.
+        if self._closed:
+            return
+
+        self._closed = True
+
+        if self.transport is not None:
+            self.transport.close()
+
+        # Wake any iterator waiting for a message (iterators only wait when the queue is empty).
+        if not self.queue.full():
+            self.queue.put_nowait(None)
+
+    def stats(self):
+        """
+        Obtains the listener counters.
+
+        Returns:
+            dict: The number of datagrams received, rejected as invalid and dropped because
+                  the queue was full, the number of messages currently queued and (if used)
+                  the registry's and cache's counters.
+        """
+        stats = {
+            'received': self.protocol.received,
+            'invalid': self.protocol.invalid,
+            'dropped': self.protocol.dropped,
+            'queued': self.queue.qsize(),
+        }
+
+        # Include the per-device counters when receiving from many devices.
+        if self.protocol.registry is not None:
+            stats['registry'] = self.protocol.registry.stats()
+
+        # Include the cache counters when repeated broadcasts are being skipped.
+        if self.protocol.cache is not None:
+            stats['cache'] = self.protocol.cache.stats()
+
+        return stats
+
+    async def __aenter__(self):
+        """
+        Starts listening when entering an "async with" block.
+
+        Returns:
+            Listener: This listener.
+        """
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """
+        Stops listening when leaving an "async with" block.
+        """
+        self.close()
+
+    def __aiter__(self):
+        """
+        Iterates the received messages.
+
+        Returns:
+            Listener: This listener.
+        """
+        return self
+
+    async def __anext__(self):
+        """
+        Waits for the next received message.
+
+        Returns:
+            tuple: The parsed Message and the address of the sender.
+
+        Raises:
+            StopAsyncIteration: If the listener has been closed.
+        """
+
+        # Have all the messages been consumed after the listener was closed?
+        if self._closed and self.queue.empty():
+            raise StopAsyncIteration
+
+        item = await self.queue.get()
+
+        # The listener was closed.
+        if item is None:
+            # Let any other iterators also finish.
+            self.queue.put_nowait(None)
+            raise StopAsyncIteration
+
+        return item
+
+
+class BatchListener(Listener):
+    """
+    A listener that drains the socket in batches for high receive rates.
+
+    Rather than one receive call and one decryption per datagram, every wake-up receives up to
+    a batch of datagrams into a preallocated buffer and decrypts them together. A larger socket
+    receive buffer can also be requested to absorb bursts (e.g. many sites sending to one
+    collector), and datagrams dropped by the kernel are counted where the operating system
+    reports them.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        mac_address=None,
+        callback=None,
+        host='0.0.0.0',
+        port=DEFAULT_PORT,
+        queue_size=1024,
+        registry=None,
+        cache=None,
+        batch_size=64,
+        receive_buffer_size=None,
+        max_batches=16,
+        metrics=None
+    ):
+        """
+        Initialize a batch listener (call start() or use "async with" to begin receiving).
+
+        Args:
+            mac_address (bytes or str, optional): The MAC address of the sending device.
+                Defaults to None (a registry must then be supplied).
+            callback (callable, optional):
+                A function called with each valid (Message, address) as it is received.
+                Defaults to None.
+            host (str, optional): The address to listen on. Defaults to all interfaces.
+            port (int, optional): The UDP port to listen on. Defaults to 4944.
+            queue_size (int, optional):
+                The maximum number of messages waiting to be iterated before newer messages are
+                dropped. Defaults to 1024.
+            registry (DeviceRegistry, optional):
+                The devices to route each datagram to by its source IP address.
+                Defaults to None.
+            cache (DecodeCache, optional):
+                The cache of previously parsed messages to check before decrypting.
+                Defaults to None.
+            batch_size (int, optional): The maximum number of datagrams in a batch.
+                Defaults to 64.
+            receive_buffer_size (int, optional):
+                The socket receive buffer size (SO_RCVBUF) to request.
+                Defaults to None which keeps the operating system's default.
+            max_batches (int, optional):
+                The maximum number of batches received per wake-up before yielding to other
+                tasks on the event loop. Defaults to 16.
+            metrics (MetricsExporter, optional):
+                The exporter to export this listener's devices, statistics and timings with.
+                Defaults to None.
+
+        Raises:
+            ValueError: If neither a MAC address nor a registry is supplied.
+        """
+        super().__init__(
+            mac_address,
+            callback,
+            host,
+            port,
+            queue_size,
+            registry,
+            cache,
+            metrics
+        )
+        self.batch_size = batch_size
+        self.receive_buffer_size = receive_buffer_size
+        self.max_batches = max_batches
+        self.receiver = None
+        self._loop = None
+
+    async def start(self):
+        """
+        Starts listening for DSL Status messages.
+
+        Returns:
+            BatchListener: This listener.
+        """
+        self._loop = asyncio.get_running_loop()
+        self.receiver = BatchReceiver(
+            self._create_socket(),
+            self.batch_size,
+            self.receive_buffer_size
+        )
+        self._loop.add_reader(self.receiver.sock.fileno(), self._read_ready)
+        return self
+
+    def _read_ready(self):
+        """
+        Receives and processes batches of datagrams while the socket has any waiting.
+
+        Returns:
+            None
+        """
+        receiver = self.receiver
+
+        for _ in range(self.max_batches):
+            count = receiver.receive_batch()
+
+            # Stop when the socket has been drained.
+            if not count:
+                break
+
+            self.protocol.batch_received(receiver.frames(count), receiver.addresses[:count])
+
+    def close(self):
+        """
+        Stops listening and ends any iteration once the queued messages have been consumed.
+
+        Returns:
+            None
+        """
+        if not self._closed and self.receiver is not None:
+            self._loop.remove_reader(self.receiver.sock.fileno())
+            self.receiver.close()
+
+        super().close()
+
+    def stats(self):
+        """
+        Obtains the listener and receiver counters.
+
+        Returns:
+            dict: The listener counters plus the receiver counters (prefixed with "receiver_").
+        """
+        stats = super().stats()
+
+        if self.receiver is not None:
+            for name, value in self.receiver.stats().items():
+                stats['receiver_' + name] = value
+
+        return stats
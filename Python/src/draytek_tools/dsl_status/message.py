@@ -27,14 +27,46 @@ from enum import Enum
 # We use the struct library to interpret bytes as packed binary data.
 import struct
 
+# The unpacking, string truncation and rendering stages can be timed.
+from . import instrumentation
+
 
 # pylint: disable=too-many-instance-attributes
 # This is a data class so is expected to have many instance attributes.
 class Message:
     """
     A class to represent a single DrayTek® Vigor™ DSL Status broadcast message.
+
+    Instances have no per-instance dictionary and can be overwritten in place with update_from,
+    so a long-running listener can reuse a small pool of instances rather than allocating one
+    for every message.
     """
 
+    # The attributes in the order they appear in the packed bytes.
+    ATTRIBUTES = (
+        'dsl_upload_speed',
+        'dsl_download_speed',
+        'adsl_tx_cells',
+        'adsl_rx_cells',
+        'adsl_tx_crc_errors',
+        'adsl_rx_crc_errors',
+        'dsl_type',
+        'timestamp',
+        'vdsl_snr_upload',
+        'vdsl_snr_download',
+        'adsl_loop_att',
+        'adsl_snr_margin',
+        'modem_firmware_version',
+        'running_mode',
+        'state',
+    )
+
+    # Some attributes are null-terminated strings and may need to be handled separately.
+    STRING_ATTRIBUTES = ('modem_firmware_version', 'running_mode', 'state')
+
+    # Only these attributes can be set (saving the memory of a per-instance dictionary).
+    __slots__ = ATTRIBUTES
+
     # The format string for the struct pack and unpack methods.
     FORMAT_STRING = '!iiiiiiiiiiii19sx17sx25sx'
 
@@ -43,6 +75,10 @@ class Message:
     # This is useful when trying to create a buffer overflow.
     FORMAT_STRING_UNSAFE = '!iiiiiiiiiiii20s18s26s'
 
+    # The format strings precompiled so they are not parsed on every pack and unpack.
+    STRUCT = struct.Struct(FORMAT_STRING)
+    STRUCT_UNSAFE = struct.Struct(FORMAT_STRING_UNSAFE)
+
     class DslType(Enum):
         """
         Enumeration for different types of Digital Subscriber Line (DSL) connections.
@@ -70,7 +106,7 @@ class Message:
         """
 
         # Unlike Python, C uses null-terminated strings, truncate them.
-        return string_bytes.split(sep=b'\0', maxsplit=1)[0]
+        return string_bytes.split(b'\0', 1)[0]
 
     @staticmethod
     def convert_bytes_to_tuple(payload, unsafe=False):
@@ -92,17 +128,90 @@ class Message:
         """
 
         # We use struct to unpack the payload data.
-        return struct.unpack(
-            Message.FORMAT_STRING_UNSAFE if unsafe else Message.FORMAT_STRING,
-            payload
+        return (Message.STRUCT_UNSAFE if unsafe else Message.STRUCT).unpack(payload)
+
+    @classmethod
+    def from_buffer(cls, buffer, offset=0, truncate_strings=True, unsafe=False):
+        """
+        Creates a Message instance directly from a buffer without copying the payload out of it.
+
+        This allows a DSL Status message to be decoded straight out of a reused receive buffer.
+
+        Args:
+            buffer (bytes, bytearray or memoryview): A buffer containing a DSL Status message.
+            offset (int, optional): The offset of the DSL Status message in the buffer.
+                Defaults to 0.
+            truncate_strings (bool, optional):
+                Whether to truncate any excess data in the null-terminated strings.
+                Defaults to True.
+            unsafe (bool, optional):
+                Whether to allow the null byte to be replaced in strings to allow a buffer
+                overflow. Defaults to False.
+
+        Returns:
+            Message: The DSL Status message at the offset in the buffer.
+
+        Raises:
+            struct.error: If the buffer is too small to contain a message at the offset.
+        """
+
+        # Skip setting blank initial values as every attribute is about to be set.
+        return cls.__new__(cls).update_from(buffer, offset, truncate_strings, unsafe)
+
+    def update_from(self, buffer, offset=0, truncate_strings=True, unsafe=False):
+        """
+        Overwrites this instance in place from a buffer without copying the payload out of it.
+
+        This allows an existing instance to be reused for another DSL Status message.
+
+        Args:
+            buffer (bytes, bytearray or memoryview): A buffer containing a DSL Status message.
+            offset (int, optional): The offset of the DSL Status message in the buffer.
+                Defaults to 0.
+            truncate_strings (bool, optional):
+                Whether to truncate any excess data in the null-terminated strings.
+                Defaults to True.
+            unsafe (bool, optional):
+                Whether to allow the null byte to be replaced in strings to allow a buffer
+                overflow. Defaults to False.
+
+        Returns:
+            Message: This instance.
+
+        Raises:
+            struct.error: If the buffer is too small to contain a message at the offset.
+        """
+
+        # Time the stages (if instrumentation is enabled and this call is sampled).
+        timed = instrumentation.ENABLED and instrumentation.sample(instrumentation.STAGE_UNPACK)
+        if timed:
+            started = instrumentation.clock()
+
+        # We use struct to unpack the payload data straight from the buffer.
+        tuple_data = (Message.STRUCT_UNSAFE if unsafe else Message.STRUCT).unpack_from(
+            buffer, offset
         )
 
+        if timed:
+            unpacked = instrumentation.clock()
+            instrumentation.record(instrumentation.STAGE_UNPACK, unpacked - started)
+
+        # Set the attributes from the unpacked tuple (truncating the strings).
+        self.set_from_tuple(tuple_data, truncate_strings)
+
+        if timed:
+            instrumentation.record(
+                instrumentation.STAGE_TRUNCATE, instrumentation.clock() - unpacked
+            )
+
+        return self
+
     def __init__(self, payload=None, truncate_strings=True, unsafe=False):
         """
         Initialize a DrayTek® Vigor DSL Status message instance, optionally with existing data.
 
         Args:
-            payload (bytes, optional):
+            payload (bytes, bytearray or memoryview, optional):
                 The bytes of a DSL Status message to optionally initalise this instance with.
                 Defaults to None.
             truncate_strings (bool, optional):
@@ -135,12 +244,26 @@ class Message:
             self.running_mode = bytearray(17)
             self.state = bytearray(25)
         # Has the user asked to initialise this object from a byte array?
-        elif isinstance(payload, bytes):
+        elif isinstance(payload, (bytes, bytearray, memoryview)):
+            # Time the stages (if instrumentation is enabled and this call is sampled).
+            timed = instrumentation.ENABLED and instrumentation.sample(instrumentation.STAGE_UNPACK)
+            if timed:
+                started = instrumentation.clock()
+
             # We use struct to unpack the payload data bytes.
             converted_tuple = self.convert_bytes_to_tuple(payload, unsafe)
 
+            if timed:
+                unpacked = instrumentation.clock()
+                instrumentation.record(instrumentation.STAGE_UNPACK, unpacked - started)
+
             # Set the attributes from the unpacked tuple.
             self.set_from_tuple(converted_tuple, truncate_strings)
+
+            if timed:
+                instrumentation.record(
+                    instrumentation.STAGE_TRUNCATE, instrumentation.clock() - unpacked
+                )
         # Unsupported type supplied.
         else:
             raise ValueError(f'Initialising from a {type(payload)} is not supported.')
@@ -157,8 +280,40 @@ class Message:
         Returns:
             bytes: The packed bytes representing this DSL Status Message instance.
         """
-        return struct.pack(
-            Message.FORMAT_STRING_UNSAFE if unsafe else Message.FORMAT_STRING,
+        return (Message.STRUCT_UNSAFE if unsafe else Message.STRUCT).pack(*self._get_fields())
+
+    def pack_into(self, buffer, offset=0, unsafe=False):
+        """
+        Packs this instance directly into a writable buffer without an intermediate copy.
+
+        Args:
+            buffer (bytearray or memoryview): A writable buffer to pack this instance into.
+            offset (int, optional): The offset in the buffer to pack this instance at.
+                Defaults to 0.
+            unsafe (bool, optional):
+                Whether to allow the null byte to be replaced in strings to allow a buffer
+                overflow. Defaults to False.
+
+        Returns:
+            None
+
+        Raises:
+            struct.error: If the buffer is too small to contain a message at the offset.
+        """
+        (Message.STRUCT_UNSAFE if unsafe else Message.STRUCT).pack_into(
+            buffer,
+            offset,
+            *self._get_fields()
+        )
+
+    def _get_fields(self):
+        """
+        Obtains this instance's attributes in the order they are packed.
+
+        Returns:
+            tuple: The attributes of this instance.
+        """
+        return (
             self.dsl_upload_speed,
             self.dsl_download_speed,
             self.adsl_tx_cells,
@@ -191,38 +346,35 @@ class Message:
             None
         """
 
-        # Define the attributes in the order they appear in the tuple.
-        attributes = [
-            'dsl_upload_speed',
-            'dsl_download_speed',
-            'adsl_tx_cells',
-            'adsl_rx_cells',
-            'adsl_tx_crc_errors',
-            'adsl_rx_crc_errors',
-            'dsl_type',
-            'timestamp',
-            'vdsl_snr_upload',
-            'vdsl_snr_download',
-            'adsl_loop_att',
-            'adsl_snr_margin',
-            'modem_firmware_version',
-            'running_mode',
-            'state',
-        ]
-
-        # Some tuple fields are null-terminated strings and may need to be handled separately.
-        string_fields = {'modem_firmware_version', 'running_mode', 'state'}
-
-        # Set the Message attributes from the tuple fields.
-        for index, attribute in enumerate(attributes):
-            # Some attributes need to be handled differently if string truncation is requested.
-            if truncate_arrays and attribute in string_fields:
-                value = self._truncate_string(tuple_data[index])
-            else:
-                value = tuple_data[index]
-
-            # Set the attribute.
-            setattr(self, attribute, value)
+        # Set the Message attributes from the tuple fields (in the order they appear).
+        (
+            self.dsl_upload_speed,
+            self.dsl_download_speed,
+            self.adsl_tx_cells,
+            self.adsl_rx_cells,
+            self.adsl_tx_crc_errors,
+            self.adsl_rx_crc_errors,
+            self.dsl_type,
+            self.timestamp,
+            self.vdsl_snr_upload,
+            self.vdsl_snr_download,
+            self.adsl_loop_att,
+            self.adsl_snr_margin,
+            modem_firmware_version,
+            running_mode,
+            state,
+        ) = tuple_data
+
+        # The null-terminated strings need to be handled differently if truncation is requested.
+        if truncate_arrays:
+            truncate_string = Message._truncate_string
+            modem_firmware_version = truncate_string(modem_firmware_version)
+            running_mode = truncate_string(running_mode)
+            state = truncate_string(state)
+
+        self.modem_firmware_version = modem_firmware_version
+        self.running_mode = running_mode
+        self.state = state
 
     def __str__(self):
         """
@@ -231,7 +383,13 @@ class Message:
         Returns:
             string: A string representing this DSL Status Message instance.
         """
-        return (
+
+        # Time the rendering (if instrumentation is enabled and this call is sampled).
+        timed = instrumentation.ENABLED and instrumentation.sample(instrumentation.STAGE_RENDER)
+        if timed:
+            started = instrumentation.clock()
+
+        text = (
             f' DSL Upload Speed: {self.dsl_upload_speed} bps'
             f' ({self.dsl_upload_speed // 1000000} Mbps)\n'
             f' DSL Download Speed: {self.dsl_download_speed} bps'
@@ -250,3 +408,13 @@ class Message:
             f' Running Mode: {bytes(self.running_mode)}\n'
             f' State: {bytes(self.state)}\n'
         )
+
+        if timed:
+            instrumentation.record(instrumentation.STAGE_RENDER, instrumentation.clock() - started)
+
+        return text
+
+
+# The DSL type values a correctly decrypted DSL Status message can have (the DSL type is the
+# byte at offset 27 of a decrypted message).
+DSL_TYPE_VALUES = frozenset(dsl_type.value for dsl_type in Message.DslType)
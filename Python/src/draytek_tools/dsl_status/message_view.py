@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Message View Module.
+This module provides methods for lazily reading DSL Status broadcasts.
+"""
+
+# We use the struct library to interpret bytes as packed binary data.
+import struct
+
+# The view offers the same attributes (and string representation) as a Message.
+from .message import Message
+
+
+class _LazyField:
+    """
+    A descriptor that decodes a single DSL Status message field on first access.
+
+    The decoded value is stored in the instance's dictionary under the same name so any later
+    accesses find it there without calling this descriptor again.
+    """
+
+    # Integer fields are signed big-endian 32-bit values.
+    INTEGER_STRUCT = struct.Struct('!i')
+
+    __slots__ = ('offset', 'end', 'name')
+
+    def __init__(self, offset, length=None):
+        """
+        Initialize a lazily decoded field.
+
+        Args:
+            offset (int): The offset of the field within the DSL Status message.
+            length (int, optional):
+                The length of the field if it is a null-terminated string.
+                Defaults to None which means the field is an integer.
+        """
+        self.offset = offset
+        self.end = None if length is None else offset + length
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        """
+        Records the attribute name this field is stored under.
+
+        Args:
+            owner (type): The class this field belongs to.
+            name (str): The attribute name of this field.
+        """
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        """
+        Decodes this field from the instance's buffer and caches it.
+
+        Args:
+            instance (MessageView): The view being read (or None if read from the class).
+            owner (type, optional): The class this field belongs to.
+
+        Returns:
+            int or bytes: The decoded field value.
+        """
+
+        # Accessing the attribute on the class returns the descriptor itself.
+        if instance is None:
+            return self
+
+        # The view's internal state is shared with its fields.
+        # pylint: disable=protected-access
+        buffer, offset, truncate_strings, unsafe = instance._source
+
+        # Integer fields are unpacked directly.
+        if self.end is None:
+            value = self.INTEGER_STRUCT.unpack_from(buffer, offset + self.offset)[0]
+        else:
+            # The string's null byte is part of the string if unsafe (see FORMAT_STRING_UNSAFE).
+            value = bytes(buffer[offset + self.offset:offset + self.end + unsafe])
+
+            # Unlike Python, C uses null-terminated strings, truncate them.
+            if truncate_strings:
+                value = value.split(b'\0', 1)[0]
+
+        # Cache the decoded value (bypassing the read-only __setattr__).
+        instance.__dict__[self.name] = value
+
+        return value
+
+
+class MessageView:
+    """
+    A class to represent a read-only view of a DrayTek® Vigor™ DSL Status broadcast message.
+
+    Unlike Message, fields are only decoded when they are first read (and then cached), which is
+    cheaper when only a few fields (e.g. state) are needed. The view keeps a reference to the
+    buffer, so the buffer should not be modified while the view is in use.
+    """
+
+    # The fields, in the order they appear in the packed bytes.
+    dsl_upload_speed = _LazyField(0)
+    dsl_download_speed = _LazyField(4)
+    adsl_tx_cells = _LazyField(8)
+    adsl_rx_cells = _LazyField(12)
+    adsl_tx_crc_errors = _LazyField(16)
+    adsl_rx_crc_errors = _LazyField(20)
+    dsl_type = _LazyField(24)
+    timestamp = _LazyField(28)
+    vdsl_snr_upload = _LazyField(32)
+    vdsl_snr_download = _LazyField(36)
+    adsl_loop_att = _LazyField(40)
+    adsl_snr_margin = _LazyField(44)
+    modem_firmware_version = _LazyField(48, 19)
+    running_mode = _LazyField(68, 17)
+    state = _LazyField(86, 25)
+
+    # A view is presented exactly like a Message.
+    DslType = Message.DslType
+    __str__ = Message.__str__
+
+    def __init__(self, buffer, offset=0, truncate_strings=True, unsafe=False):
+        """
+        Initialize a view of a DSL Status message without decoding any of its fields.
+
+        Args:
+            buffer (bytes, bytearray or memoryview): A buffer containing a DSL Status message.
+            offset (int, optional): The offset of the DSL Status message in the buffer.
+                Defaults to 0.
+            truncate_strings (bool, optional):
+                Whether to truncate any excess data in the null-terminated strings.
+                Defaults to True.
+            unsafe (bool, optional):
+                Whether to allow the null byte to be replaced in strings to allow a buffer
+                overflow. Defaults to False.
+
+        Raises:
+            ValueError: If the buffer is too small to contain a message at the offset.
+        """
+
+        # DSL Status messages, as fixed binary data structures, must be a specific length.
+        if len(buffer) - offset < Message.STRUCT.size:
+            raise ValueError('Incorrect number of bytes received.')
+
+        # Set the internal state directly (bypassing the read-only __setattr__).
+        self.__dict__['_source'] = (buffer, offset, truncate_strings, unsafe)
+
+    def __setattr__(self, name, value):
+        """
+        Prevents the view being modified.
+
+        Raises:
+            AttributeError: Always, as a MessageView is read-only.
+        """
+        raise AttributeError(f'\'{type(self).__name__}\' object is read-only')
+
+    def __delattr__(self, name):
+        """
+        Prevents the view being modified.
+
+        Raises:
+            AttributeError: Always, as a MessageView is read-only.
+        """
+        raise AttributeError(f'\'{type(self).__name__}\' object is read-only')
+
+    def convert_to_bytes(self):
+        """
+        Obtains the bytes of the DSL Status message this view is over.
+
+        Returns:
+            bytes: The 112 bytes of the DSL Status message.
+        """
+        buffer, offset, _, _ = self._source
+        return bytes(buffer[offset:offset + Message.STRUCT.size])
+
+    def to_message(self):
+        """
+        Decodes every field into a (writable) Message instance.
+
+        Returns:
+            Message: The fully decoded DSL Status message.
+        """
+        return Message.from_buffer(*self._source)
@@ -0,0 +1,639 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Packet Capture Module.
+This module provides methods for reading DSL Status broadcasts from pcap and pcapng files.
+
+Captures are read as a stream (through a large read buffer), so files of any size are read
+with constant memory. Large captures can also be split into chunks that are decrypted across
+several processes.
+"""
+
+# Chunks are decrypted in a pool of processes.
+from concurrent import futures
+
+# Chunks are decrypted a bounded number at a time.
+from collections import deque
+
+# Each chunk starts with a copy of the capture's state.
+import copy
+
+# Source addresses are converted to text.
+import socket
+
+# We use the struct library to interpret bytes as packed binary data.
+import struct
+
+# The payloads are decrypted and parsed.
+from . import cryptography
+from .message import DSL_TYPE_VALUES, Message
+
+
+# The pcap magic numbers (as read in big-endian byte order) and their timestamp resolutions.
+PCAP_MAGIC_MICROSECONDS = 0xA1B2C3D4
+PCAP_MAGIC_NANOSECONDS = 0xA1B23C4D
+
+# The pcapng block types that are read (all other blocks are skipped).
+PCAPNG_SECTION_HEADER_BLOCK = 0x0A0D0D0A
+PCAPNG_INTERFACE_DESCRIPTION_BLOCK = 1
+PCAPNG_PACKET_BLOCK = 2
+PCAPNG_SIMPLE_PACKET_BLOCK = 3
+PCAPNG_ENHANCED_PACKET_BLOCK = 6
+
+# The pcapng section header byte-order magic number.
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+# The pcapng interface option holding the timestamp resolution.
+PCAPNG_OPTION_TIMESTAMP_RESOLUTION = 9
+
+# The link-layer types that are understood.
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+# The EtherTypes that are understood (VLAN tags are skipped).
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLANS = (0x8100, 0x88A8, 0x9100)
+
+# The IP protocol number of UDP.
+IP_PROTOCOL_UDP = 17
+
+# The size of the read buffer.
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+class _CaptureState:
+    """
+    The state needed to read the records of a capture from any position in it.
+    """
+
+    def __init__(self, pcapng, byte_order='<', timestamp_divisor=1000000, linktype=None):
+        """
+        Initialize the state of a capture.
+
+        Args:
+            pcapng (bool): Whether the capture is pcapng (rather than pcap).
+            byte_order (str, optional): The struct byte order of the capture. Defaults to '<'.
+            timestamp_divisor (int, optional): The pcap timestamp fractions per second.
+                Defaults to 1000000.
+            linktype (int, optional): The pcap link-layer type. Defaults to None.
+        """
+        self.pcapng = pcapng
+        self.byte_order = byte_order
+        self.timestamp_divisor = timestamp_divisor
+        self.linktype = linktype
+
+        # The link-layer type and timestamp resolution of each pcapng interface.
+        self.interfaces = []
+
+
+def _open_capture(path):
+    """
+    Opens a capture and reads its format.
+
+    Args:
+        path (str): The path of the pcap or pcapng file.
+
+    Returns:
+        tuple: The open file (positioned at the first record or block) and its _CaptureState.
+
+    Raises:
+        ValueError: If the file is not a pcap or pcapng file.
+    """
+    # pylint: disable=consider-using-with
+    stream = open(path, 'rb', buffering=READ_BUFFER_SIZE)
+
+    try:
+        header = stream.read(24)
+        magic = header[:4]
+
+        # pcapng files start with a section header block (which is read with the blocks).
+        if len(magic) == 4 and struct.unpack('>I', magic)[0] == PCAPNG_SECTION_HEADER_BLOCK:
+            stream.seek(0)
+            return stream, _CaptureState(True)
+
+        # pcap files start with a global header in the byte order of the capturing host.
+        if len(header) == 24:
+            for byte_order in ('<', '>'):
+                magic_number, = struct.unpack(byte_order + 'I', magic)
+                if magic_number in (PCAP_MAGIC_MICROSECONDS, PCAP_MAGIC_NANOSECONDS):
+                    return stream, _CaptureState(
+                        False,
+                        byte_order,
+                        1000000 if magic_number == PCAP_MAGIC_MICROSECONDS else 1000000000,
+                        struct.unpack(byte_order + 'I', header[20:24])[0] & 0x0FFFFFFF
+                    )
+    except BaseException:
+        stream.close()
+        raise
+
+    stream.close()
+    raise ValueError(f'"{path}" is not a pcap or pcapng file.')
+
+
+def _read_pcap_records(stream, state, limit=None, skip=False):
+    """
+    Reads the packet records of a pcap file.
+
+    Args:
+        stream (file): The capture positioned at a record.
+        state (_CaptureState): The capture's state.
+        limit (int, optional): The maximum number of records to read. Defaults to None.
+        skip (bool, optional): Whether to skip over the packet data (for scanning).
+            Defaults to False.
+
+    Yields:
+        tuple: The offset, timestamp, link-layer type and data (None if skipped) of each packet.
+    """
+    record_struct = struct.Struct(state.byte_order + 'IIII')
+    count = 0
+
+    while limit is None or count < limit:
+        offset = stream.tell() if skip else None
+        header = stream.read(record_struct.size)
+
+        # Stop at the end of the file (or a truncated record).
+        if len(header) < record_struct.size:
+            return
+
+        seconds, fraction, captured_length, _ = record_struct.unpack(header)
+
+        if skip:
+            stream.seek(captured_length, 1)
+            data = None
+        else:
+            data = stream.read(captured_length)
+            if len(data) < captured_length:
+                return
+
+        count += 1
+        yield offset, seconds + fraction / state.timestamp_divisor, state.linktype, data
+
+
+def _read_pcapng_section_header(stream, state, block_type_bytes):
+    """
+    Reads a pcapng section header block and resets the state for the new section.
+
+    Args:
+        stream (file): The capture positioned after the block type.
+        state (_CaptureState): The capture's state.
+        block_type_bytes (bytes): The block type bytes already read.
+
+    Returns:
+        bool: Whether the section header was read completely.
+    """
+    length_bytes = stream.read(4)
+    magic_bytes = stream.read(4)
+    if len(magic_bytes) < 4:
+        return False
+
+    # The byte-order magic number gives the byte order of the whole section.
+    little_endian = struct.unpack('<I', magic_bytes)[0] == PCAPNG_BYTE_ORDER_MAGIC
+    state.byte_order = '<' if little_endian else '>'
+    state.interfaces = []
+
+    block_length, = struct.unpack(state.byte_order + 'I', length_bytes)
+    stream.seek(block_length - len(block_type_bytes) - 8, 1)
+    return True
+
+
+def _parse_pcapng_interface(body, byte_order):
+    """
+    Parses a pcapng interface description block.
+
+    Args:
+        body (bytes): The block body (after the block type and length).
+        byte_order (str): The struct byte order of the section.
+
+    Returns:
+        tuple: The interface's link-layer type and timestamp units per second.
+    """
+    linktype, = struct.unpack_from(byte_order + 'H', body, 0)
+    units_per_second = 1000000
+
+    # Look for a timestamp resolution option.
+    offset = 8
+    while offset + 4 <= len(body) - 4:
+        code, length = struct.unpack_from(byte_order + 'HH', body, offset)
+
+        # The end of options.
+        if code == 0:
+            break
+
+        if code == PCAPNG_OPTION_TIMESTAMP_RESOLUTION and length >= 1:
+            resolution = body[offset + 4]
+            # The most significant bit selects a power of 2 rather than a power of 10.
+            if resolution & 0x80:
+                units_per_second = 2 ** (resolution & 0x7F)
+            else:
+                units_per_second = 10 ** resolution
+
+        # Options are padded to 32 bits.
+        offset += 4 + ((length + 3) & ~3)
+
+    return linktype, units_per_second
+
+
+def _read_pcapng_records(stream, state, limit=None, skip=False):
+    """
+    Reads the packet blocks of a pcapng file.
+
+    Args:
+        stream (file): The capture positioned at a block.
+        state (_CaptureState): The capture's state (updated by section and interface blocks).
+        limit (int, optional): The maximum number of packets to read. Defaults to None.
+        skip (bool, optional): Whether to skip over the packet data (for scanning).
+            Defaults to False.
+
+    Yields:
+        tuple: The offset, timestamp, link-layer type and data (None if skipped) of each packet.
+    """
+    count = 0
+
+    while limit is None or count < limit:
+        offset = stream.tell() if skip else None
+        block_type_bytes = stream.read(4)
+
+        # Stop at the end of the file.
+        if len(block_type_bytes) < 4:
+            return
+
+        # Section headers change the byte order so are read separately.
+        if block_type_bytes == b'\x0A\x0D\x0D\x0A':
+            if not _read_pcapng_section_header(stream, state, block_type_bytes):
+                return
+            continue
+
+        length_bytes = stream.read(4)
+        if len(length_bytes) < 4:
+            return
+
+        block_type, = struct.unpack(state.byte_order + 'I', block_type_bytes)
+        block_length, = struct.unpack(state.byte_order + 'I', length_bytes)
+        body_length = block_length - 12
+
+        # Skip any blocks that do not hold packets or interfaces.
+        if block_type not in (
+            PCAPNG_INTERFACE_DESCRIPTION_BLOCK,
+            PCAPNG_PACKET_BLOCK,
+            PCAPNG_SIMPLE_PACKET_BLOCK,
+            PCAPNG_ENHANCED_PACKET_BLOCK
+        ) or body_length < 0:
+            stream.seek(block_length - 8, 1)
+            continue
+
+        # Packets being scanned only need their fixed fields reading.
+        if skip and block_type != PCAPNG_INTERFACE_DESCRIPTION_BLOCK:
+            stream.seek(block_length - 8, 1)
+            count += 1
+            yield offset, None, None, None
+            continue
+
+        body = stream.read(body_length)
+        stream.seek(4, 1)
+        if len(body) < body_length:
+            return
+
+        if block_type == PCAPNG_INTERFACE_DESCRIPTION_BLOCK:
+            state.interfaces.append(_parse_pcapng_interface(body, state.byte_order))
+            continue
+
+        # Obtain the interface, timestamp and data of the packet.
+        if block_type == PCAPNG_ENHANCED_PACKET_BLOCK:
+            interface, high, low, captured_length, _ = struct.unpack_from(
+                state.byte_order + 'IIIII', body
+            )
+            data = body[20:20 + captured_length]
+        elif block_type == PCAPNG_PACKET_BLOCK:
+            interface, _, high, low, captured_length, _ = struct.unpack_from(
+                state.byte_order + 'HHIIII', body
+            )
+            data = body[20:20 + captured_length]
+        else:
+            # Simple packet blocks are always from the first interface and have no timestamp.
+            interface, high, low = 0, None, None
+            original_length, = struct.unpack_from(state.byte_order + 'I', body)
+            data = body[4:4 + original_length]
+
+        # Packets from undescribed interfaces cannot be decoded (but still count towards the
+        # limit as they were counted when scanning).
+        count += 1
+        if interface >= len(state.interfaces):
+            continue
+
+        linktype, units_per_second = state.interfaces[interface]
+        timestamp = None if high is None else ((high << 32) | low) / units_per_second
+
+        yield offset, timestamp, linktype, data
+
+
+def _read_records(stream, state, limit=None, skip=False):
+    """
+    Reads the packets of a pcap or pcapng file.
+
+    Args:
+        stream (file): The capture positioned at a record or block.
+        state (_CaptureState): The capture's state.
+        limit (int, optional): The maximum number of packets to read. Defaults to None.
+        skip (bool, optional): Whether to skip over the packet data (for scanning).
+            Defaults to False.
+
+    Returns:
+        generator: The offset, timestamp, link-layer type and data of each packet.
+    """
+    if state.pcapng:
+        return _read_pcapng_records(stream, state, limit, skip)
+
+    return _read_pcap_records(stream, state, limit, skip)
+
+
+def _get_network_layer(linktype, data):
+    """
+    Finds the IP packet in a link-layer frame.
+
+    Args:
+        linktype (int): The link-layer type.
+        data (bytes): The link-layer frame.
+
+    Returns:
+        tuple: The IP version and the offset of the IP packet, or None if it is not IP.
+    """
+    if linktype == LINKTYPE_ETHERNET:
+        offset = 12
+        ethertype = int.from_bytes(data[12:14], 'big')
+
+        # Skip any VLAN tags.
+        while ethertype in ETHERTYPE_VLANS:
+            offset += 4
+            ethertype = int.from_bytes(data[offset:offset + 2], 'big')
+        offset += 2
+    elif linktype == LINKTYPE_LINUX_SLL:
+        offset = 16
+        ethertype = int.from_bytes(data[14:16], 'big')
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        offset = 20
+        ethertype = int.from_bytes(data[0:2], 'big')
+    elif linktype == LINKTYPE_NULL:
+        # The address family is in the capturing host's byte order.
+        offset = 4
+        family = data[0] or data[3]
+        ethertype = ETHERTYPE_IPV4 if family == 2 else ETHERTYPE_IPV6
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        offset = 0
+        ethertype = ETHERTYPE_IPV4 if data[:1] and data[0] >> 4 == 4 else ETHERTYPE_IPV6
+    else:
+        return None
+
+    if ethertype == ETHERTYPE_IPV4:
+        return 4, offset
+    if ethertype == ETHERTYPE_IPV6:
+        return 6, offset
+    return None
+
+
+def get_udp_payload(linktype, data, port=4944):
+    """
+    Extracts the payload of a UDP datagram sent to a port from a link-layer frame.
+
+    Args:
+        linktype (int): The link-layer type (e.g. LINKTYPE_ETHERNET).
+        data (bytes): The link-layer frame.
+        port (int, optional): The destination UDP port. Defaults to 4944.
+
+    Returns:
+        tuple: The source address (IP address and port) and the UDP payload, or None if the
+               frame is not a UDP datagram sent to the port.
+    """
+    network_layer = _get_network_layer(linktype, data)
+    if network_layer is None:
+        return None
+
+    version, offset = network_layer
+
+    if version == 4:
+        if len(data) < offset + 20:
+            return None
+
+        header_length = (data[offset] & 0x0F) * 4
+        fragment = int.from_bytes(data[offset + 6:offset + 8], 'big')
+
+        # Only unfragmented UDP datagrams can be DSL Status broadcasts.
+        if data[offset + 9] != IP_PROTOCOL_UDP or fragment & 0x3FFF:
+            return None
+
+        source = socket.inet_ntoa(data[offset + 12:offset + 16])
+        offset += header_length
+    else:
+        # IPv6 extension headers are not followed.
+        if len(data) < offset + 40 or data[offset + 6] != IP_PROTOCOL_UDP:
+            return None
+
+        source = socket.inet_ntop(socket.AF_INET6, data[offset + 8:offset + 24])
+        offset += 40
+
+    if len(data) < offset + 8:
+        return None
+
+    source_port, destination_port, length = struct.unpack_from('!HHH', data, offset)
+    if destination_port != port:
+        return None
+
+    return (source, source_port), data[offset + 8:offset + length]
+
+
+def read_payloads(path, port=4944):
+    """
+    Reads the UDP payloads sent to a port from a pcap or pcapng file.
+
+    Args:
+        path (str): The path of the pcap or pcapng file.
+        port (int, optional): The destination UDP port. Defaults to 4944.
+
+    Yields:
+        tuple: The timestamp (None if not recorded), source address and payload of each
+               datagram.
+
+    Raises:
+        ValueError: If the file is not a pcap or pcapng file.
+    """
+    stream, state = _open_capture(path)
+
+    with stream:
+        for _, timestamp, linktype, data in _read_records(stream, state):
+            datagram = get_udp_payload(linktype, data, port)
+            if datagram is not None:
+                yield timestamp, datagram[0], datagram[1]
+
+
+def _decrypt_datagrams(datagrams, mac_address):
+    """
+    Decrypts and validates datagrams together.
+
+    Args:
+        datagrams (list): The timestamp, source address and payload of each datagram.
+        mac_address (bytes or str): The MAC address of the sending device.
+
+    Returns:
+        list: The timestamp, source address and decrypted payload of each valid datagram.
+    """
+    decrypted_payloads, statuses = cryptography.decrypt_many(
+        mac_address,
+        [payload for _, _, payload in datagrams]
+    )
+
+    decrypted = []
+    for index, status in enumerate(statuses):
+        offset = index * cryptography.DECRYPTED_LENGTH
+
+        # Check the message decrypted and the DSL type is valid.
+        if status == cryptography.STATUS_OK and decrypted_payloads[offset + 27] in DSL_TYPE_VALUES:
+            timestamp, address, _ = datagrams[index]
+            decrypted.append((
+                timestamp,
+                address,
+                bytes(decrypted_payloads[offset:offset + cryptography.DECRYPTED_LENGTH])
+            ))
+
+    return decrypted
+
+
+def _scan_chunks(path, chunk_packets):
+    """
+    Splits a capture into chunks by skipping over its packet data.
+
+    Args:
+        path (str): The path of the pcap or pcapng file.
+        chunk_packets (int): The number of packets in each chunk.
+
+    Returns:
+        list: The offset and a copy of the capture's state at the start of each chunk.
+    """
+    stream, state = _open_capture(path)
+    chunks = []
+
+    with stream:
+        # A chunk starts after any blocks that change the state, so its state is copied at the
+        # offset of its first packet.
+        for index, (offset, _, _, _) in enumerate(_read_records(stream, state, skip=True)):
+            if index % chunk_packets == 0:
+                chunks.append((offset, copy.deepcopy(state)))
+
+    return chunks
+
+
+def _decrypt_chunk(path, chunk, chunk_packets, port, mac_address):
+    """
+    Reads and decrypts a single chunk of a capture (in a worker process).
+
+    Args:
+        path (str): The path of the pcap or pcapng file.
+        chunk (tuple): The offset and state at the start of the chunk.
+        chunk_packets (int): The number of packets in the chunk.
+        port (int): The destination UDP port.
+        mac_address (bytes or str): The MAC address of the sending device.
+
+    Returns:
+        list: The timestamp, source address and decrypted payload of each valid datagram.
+    """
+    offset, state = chunk
+    datagrams = []
+
+    with open(path, 'rb', buffering=READ_BUFFER_SIZE) as stream:
+        stream.seek(offset)
+
+        for _, timestamp, linktype, data in _read_records(stream, state, chunk_packets):
+            datagram = get_udp_payload(linktype, data, port)
+            if datagram is not None:
+                datagrams.append((timestamp, datagram[0], datagram[1]))
+
+    return _decrypt_datagrams(datagrams, mac_address)
+
+
+# pylint: disable=too-many-arguments
+def decode_capture(
+    path,
+    mac_address,
+    port=4944,
+    batch_size=4096,
+    processes=None,
+    chunk_packets=65536
+):
+    """
+    Decrypts and parses the DSL Status broadcasts in a pcap or pcapng file.
+
+    Broadcasts are decrypted in batches with cryptography.decrypt_many. If processes is given,
+    the capture is first scanned (skipping the packet data) to split it into chunks, which are
+    then read and decrypted across a pool of processes a few at a time.
+
+    Args:
+        path (str): The path of the pcap or pcapng file.
+        mac_address (bytes or str): The MAC address of the sending device.
+        port (int, optional): The destination UDP port. Defaults to 4944.
+        batch_size (int, optional): The number of datagrams decrypted together.
+            Defaults to 4096.
+        processes (int, optional): The number of worker processes.
+            Defaults to None which decrypts in this process.
+        chunk_packets (int, optional): The number of packets in each worker's chunk.
+            Defaults to 65536.
+
+    Yields:
+        tuple: The timestamp (None if not recorded), source address and Message of each valid
+               DSL Status broadcast in capture order.
+
+    Raises:
+        ValueError: If the file is not a pcap or pcapng file.
+    """
+
+    # Decrypt in this process.
+    if not processes:
+        datagrams = []
+        for datagram in read_payloads(path, port):
+            datagrams.append(datagram)
+            if len(datagrams) == batch_size:
+                for timestamp, address, payload in _decrypt_datagrams(datagrams, mac_address):
+                    yield timestamp, address, Message.from_buffer(payload)
+                datagrams = []
+
+        for timestamp, address, payload in _decrypt_datagrams(datagrams, mac_address):
+            yield timestamp, address, Message.from_buffer(payload)
+        return
+
+    # Decrypt across a pool of processes, keeping only a few chunks in flight so memory stays
+    # bounded and results are yielded in capture order.
+    with futures.ProcessPoolExecutor(processes) as executor:
+        pending = deque()
+
+        for chunk in _scan_chunks(path, chunk_packets):
+            pending.append(
+                executor.submit(_decrypt_chunk, path, chunk, chunk_packets, port, mac_address)
+            )
+
+            if len(pending) >= processes * 2:
+                for timestamp, address, payload in pending.popleft().result():
+                    yield timestamp, address, Message.from_buffer(payload)
+
+        while pending:
+            for timestamp, address, payload in pending.popleft().result():
+                yield timestamp, address, Message.from_buffer(payload)
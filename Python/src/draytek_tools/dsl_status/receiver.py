@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Batch Receiver Module.
+This module provides methods for receiving many DSL Status broadcasts per wake-up.
+"""
+
+# We use the system socket APIs to listen for network traffic.
+import socket
+
+# The kernel reports its dropped datagram count as a native unsigned 32-bit integer.
+import struct
+
+# The socket option for dropped datagram counts is only available on Linux.
+import sys
+
+# The receive slots are sized for DSL Status broadcasts.
+from .cryptography import ENCRYPTED_LENGTH
+
+# The receive stage can be timed.
+from . import instrumentation
+
+
+# The socket option that adds the kernel's dropped datagram count to each received datagram
+# (Python does not define it, but it is 40 on every Linux architecture).
+SO_RXQ_OVFL = getattr(socket, 'SO_RXQ_OVFL', 40 if sys.platform.startswith('linux') else None)
+
+# The dropped datagram count ancillary data.
+DROPPED_STRUCT = struct.Struct('=I')
+
+
+class BatchReceiver:
+    """
+    A class to drain a non-blocking UDP socket in batches into a preallocated buffer.
+
+    Each batch is received with a loop of recvmsg_into calls into fixed slots of a single
+    buffer, so no memory is allocated per datagram and a whole batch can be passed to
+    cryptography.decrypt_many at once.
+    """
+
+    def __init__(self, sock, batch_size=64, receive_buffer_size=None):
+        """
+        Initialize a batch receiver for a bound socket.
+
+        Args:
+            sock (socket.socket): A bound UDP socket (it will be made non-blocking).
+            batch_size (int, optional): The maximum number of datagrams in a batch.
+                Defaults to 64.
+            receive_buffer_size (int, optional):
+                The socket receive buffer size (SO_RCVBUF) to request.
+                Defaults to None which keeps the operating system's default.
+
+        Raises:
+            ValueError: If the batch size is less than 1.
+        """
+
+        # A batch must be able to hold at least one datagram.
+        if batch_size < 1:
+            raise ValueError('The batch size must be at least 1.')
+
+        self.sock = sock
+        self.sock.setblocking(False)
+
+        # A larger receive buffer absorbs bursts between batches.
+        if receive_buffer_size is not None:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_size)
+
+        # The size the operating system actually granted (Linux doubles the requested size).
+        self.receive_buffer_size = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+        # Ask the kernel to report how many datagrams it has dropped (where supported).
+        self.ancillary_size = 0
+        if SO_RXQ_OVFL is not None:
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+                self.ancillary_size = socket.CMSG_SPACE(DROPPED_STRUCT.size)
+            except OSError:
+                pass
+
+        # Every datagram in a batch is received into its own fixed slot of a single buffer.
+        self.batch_size = batch_size
+        self.buffer = bytearray(batch_size * ENCRYPTED_LENGTH)
+        view = memoryview(self.buffer)
+        self._slots = [
+            view[offset:offset + ENCRYPTED_LENGTH]
+            for offset in range(0, len(self.buffer), ENCRYPTED_LENGTH)
+        ]
+
+        # The length and sender of each datagram in the current batch.
+        self.lengths = [0] * batch_size
+        self.addresses = [None] * batch_size
+
+        # The number of batches and datagrams received, the number of datagrams too long for a
+        # slot and the number the kernel dropped because the receive buffer was full.
+        self.batches = 0
+        self.received = 0
+        self.truncated = 0
+        self.kernel_dropped = 0
+
+    @classmethod
+    def bind(cls, host='0.0.0.0', port=4944, batch_size=64, receive_buffer_size=None):
+        """
+        Creates a batch receiver with a new UDP socket bound to the host and port.
+
+        Args:
+            host (str, optional): The address to listen on. Defaults to all interfaces.
+            port (int, optional): The UDP port to listen on. Defaults to 4944.
+            batch_size (int, optional): The maximum number of datagrams in a batch.
+                Defaults to 64.
+            receive_buffer_size (int, optional):
+                The socket receive buffer size (SO_RCVBUF) to request.
+                Defaults to None which keeps the operating system's default.
+
+        Returns:
+            BatchReceiver: The batch receiver.
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        try:
+            # Permit multiple receiver threads listening.
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+            # The receive buffer size must be set before binding to apply to early datagrams.
+            receiver = cls(sock, batch_size, receive_buffer_size)
+            sock.bind((host, port))
+        except OSError:
+            sock.close()
+            raise
+
+        return receiver
+
+    def receive_batch(self):
+        """
+        Receives as many waiting datagrams as fit in a batch without blocking.
+
+        Returns:
+            int: The number of datagrams received into the batch (0 if none were waiting).
+        """
+        recvmsg_into = self.sock.recvmsg_into
+        ancillary_size = self.ancillary_size
+        lengths = self.lengths
+        addresses = self.addresses
+        count = 0
+
+        # Time the batch (if instrumentation is enabled and this call is sampled).
+        timed = instrumentation.ENABLED and instrumentation.sample(instrumentation.STAGE_RECEIVE)
+        if timed:
+            started = instrumentation.clock()
+
+        for slot in self._slots:
+            try:
+                length, ancillary_data, flags, address = recvmsg_into([slot], ancillary_size)
+            except (BlockingIOError, InterruptedError):
+                break
+
+            # Datagrams too long for a slot cannot be DSL Status messages.
+            if flags & socket.MSG_TRUNC:
+                self.truncated += 1
+                length = -1
+
+            # The kernel's dropped datagram count is cumulative.
+            for level, kind, data in ancillary_data:
+                if level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL:
+                    self.kernel_dropped = DROPPED_STRUCT.unpack_from(data)[0]
+
+            lengths[count] = length
+            addresses[count] = address
+            count += 1
+
+        # Only non-empty batches are counted.
+        if count:
+            self.batches += 1
+            self.received += count
+
+            if timed:
+                instrumentation.record(
+                    instrumentation.STAGE_RECEIVE, instrumentation.clock() - started, count
+                )
+
+        return count
+
+    def frames(self, count):
+        """
+        Obtains views of the datagrams received in the current batch.
+
+        Truncated datagrams are returned as empty views so they fail length validation.
+
+        Args:
+            count (int): The number of datagrams in the current batch.
+
+        Returns:
+            list: A memoryview of each datagram (valid until the next batch is received).
+        """
+        return [
+            slot[:length] if length >= 0 else slot[:0]
+            for slot, length in zip(self._slots[:count], self.lengths)
+        ]
+
+    def stats(self):
+        """
+        Obtains the receiver counters.
+
+        Returns:
+            dict: The number of batches and datagrams received, truncated and dropped by the
+                  kernel, and the receive buffer size.
+        """
+        return {
+            'batches': self.batches,
+            'received': self.received,
+            'truncated': self.truncated,
+            'kernel_dropped': self.kernel_dropped,
+            'receive_buffer_size': self.receive_buffer_size,
+        }
+
+    def close(self):
+        """
+        Closes the socket.
+
+        Returns:
+            None
+        """
+        self.sock.close()
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Device Registry Module.
+This module provides methods for identifying which device sent a DSL Status broadcast.
+"""
+
+# Device registries can be loaded from INI style configuration files.
+import configparser
+
+# Rejected IP addresses are kept in least recently used order so the oldest can be evicted.
+from collections import OrderedDict
+
+# The time each device was last heard from is recorded.
+import time
+
+# Each device's key and cipher is obtained once and kept.
+from . import cryptography
+
+# A learnt IP address is only bound once a whole message from it decrypts and parses.
+from .message import DSL_TYPE_VALUES, Message
+
+
+class Device:
+    """
+    A class to represent a single DrayTek® Vigor™ device and its statistics.
+    """
+
+    __slots__ = (
+        'name',
+        'mac_address',
+        'ip_address',
+        'key',
+        'learnt',
+        'received',
+        'invalid',
+        'failures',
+        'last_seen',
+        'last_message',
+    )
+
+    def __init__(self, name, mac_address, ip_address=None):
+        """
+        Initialize a device.
+
+        Args:
+            name (str): The name of the device.
+            mac_address (bytes or str): The MAC address of the device.
+            ip_address (str, optional): The IP address the device broadcasts from.
+                Defaults to None which means it is learnt from the first valid message.
+        """
+        self.name = name
+        self.mac_address = cryptography.KeyCache.normalize_mac_address(mac_address)
+        self.ip_address = ip_address
+
+        # The key and cipher are kept with the device so they can never be evicted.
+        self.key = cryptography.KEY_CACHE.get(self.mac_address)
+
+        # Whether the IP address was learnt (rather than configured) and so can be unbound.
+        self.learnt = False
+
+        # The number of datagrams received and rejected (in total and since the last valid
+        # message), when the device last sent a valid message and what that message was.
+        self.received = 0
+        self.invalid = 0
+        self.failures = 0
+        self.last_seen = None
+        self.last_message = None
+
+    def stats(self):
+        """
+        Obtains the device counters.
+
+        Returns:
+            dict: The device's addresses, the number of datagrams received and rejected and
+                  when it last sent a valid message.
+        """
+        return {
+            'mac_address': self.mac_address.hex(':'),
+            'ip_address': self.ip_address,
+            'received': self.received,
+            'invalid': self.invalid,
+            'last_seen': self.last_seen,
+        }
+
+
+class DeviceRegistry:
+    """
+    A class to route DSL Status broadcasts to the device (and so key) that sent them.
+
+    Datagrams are routed by their source IP address with a single dictionary lookup. Devices
+    configured without an IP address have it learnt from the first datagram their key fully
+    decrypts and parses, and lose it again if its datagrams then repeatedly fail to decrypt.
+    An unknown IP address whose DSL Status broadcasts no key decrypts is not tried again until
+    its rejection expires, its datagrams are simply counted and dropped in the meantime.
+    """
+
+    def __init__(self, max_rejected=1024, rejection_ttl=60.0, max_failures=3):
+        """
+        Initialize an empty device registry.
+
+        Args:
+            max_rejected (int, optional): The maximum number of rejected IP addresses to remember.
+                Defaults to 1024.
+            rejection_ttl (float, optional):
+                The number of seconds before a rejected IP address is tried again.
+                Defaults to 60.0.
+            max_failures (int, optional):
+                The number of consecutive invalid datagrams after which a learnt IP address is
+                unbound from its device. Defaults to 3.
+
+        Raises:
+            ValueError: If max_rejected or max_failures is less than 1 or rejection_ttl is
+                        negative.
+        """
+
+        # The limits must be sensible.
+        if max_rejected < 1:
+            raise ValueError('The maximum number of rejected IP addresses must be at least 1.')
+        if rejection_ttl < 0:
+            raise ValueError('The rejection TTL cannot be negative.')
+        if max_failures < 1:
+            raise ValueError('The maximum number of failures must be at least 1.')
+
+        self.devices = {}
+        self.unknown = 0
+        self.max_rejected = max_rejected
+        self.rejection_ttl = rejection_ttl
+        self.max_failures = max_failures
+        self._by_ip_address = {}
+        self._unbound = []
+        self._rejected = OrderedDict()
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Creates a device registry from an INI style configuration file.
+
+        Each section is a device name with a "mac_address" and an optional "ip_address":
+
+            [office]
+            mac_address = aa:bb:cc:dd:ee:ff
+            ip_address = 192.168.1.1
+
+        Args:
+            path (str): The path of the configuration file.
+
+        Returns:
+            DeviceRegistry: The device registry.
+
+        Raises:
+            ValueError: If the file cannot be read or a device has no MAC address.
+        """
+        config = configparser.ConfigParser()
+
+        # ConfigParser silently ignores missing files.
+        if not config.read(path, encoding='utf-8'):
+            raise ValueError(f'Unable to read the device registry file "{path}".')
+
+        registry = cls()
+        for name in config.sections():
+            section = config[name]
+
+            # The key can only be derived from the MAC address.
+            if 'mac_address' not in section:
+                raise ValueError(f'Device "{name}" does not have a mac_address.')
+
+            registry.add(name, section['mac_address'], section.get('ip_address'))
+
+        return registry
+
+    def add(self, name, mac_address, ip_address=None):
+        """
+        Adds a device to the registry.
+
+        Args:
+            name (str): The name of the device.
+            mac_address (bytes or str): The MAC address of the device.
+            ip_address (str, optional): The IP address the device broadcasts from.
+                Defaults to None which means it is learnt from the first valid message.
+
+        Returns:
+            Device: The added device.
+
+        Raises:
+            ValueError: If the name or IP address is already registered.
+        """
+
+        # Names and IP addresses must identify a single device.
+        if name in self.devices:
+            raise ValueError(f'Device "{name}" is already registered.')
+        if ip_address is not None and ip_address in self._by_ip_address:
+            raise ValueError(f'IP address {ip_address} is already registered.')
+
+        device = Device(name, mac_address, ip_address)
+        self.devices[name] = device
+
+        if ip_address is None:
+            self._unbound.append(device)
+            # Addresses rejected before this device was added may belong to it.
+            self._rejected.clear()
+        else:
+            self._by_ip_address[ip_address] = device
+
+        return device
+
+    def lookup(self, ip_address, datagram=None):
+        """
+        Obtains the device that sent a datagram.
+
+        Args:
+            ip_address (str): The source IP address of the datagram.
+            datagram (bytes, optional):
+                The datagram, used to learn the IP address of devices configured without one.
+                Defaults to None.
+
+        Returns:
+            Device: The device, or None if the sender is unknown (the datagram should be dropped).
+        """
+        device = self._by_ip_address.get(ip_address)
+
+        # Known senders are routed directly.
+        if device is not None:
+            return device
+
+        # Try the devices without an IP address (unless this IP address was recently rejected).
+        if datagram is not None and self._unbound and not self._is_rejected(ip_address):
+            device = self._learn(ip_address, datagram)
+            if device is not None:
+                return device
+
+            # Only a DSL Status broadcast no key decrypts rejects the IP address, other traffic
+            # (which is cheap to dismiss) may come from a device that has not broadcast yet.
+            if (
+                len(datagram) == cryptography.ENCRYPTED_LENGTH
+                and datagram[:4] == cryptography.SIGNATURE_BYTES
+            ):
+                self._reject(ip_address)
+
+        self.unknown += 1
+        return None
+
+    def record_invalid(self, device):
+        """
+        Counts a datagram from a device that failed validation.
+
+        A learnt IP address is unbound after max_failures consecutive invalid datagrams so it can
+        be learnt again (by this or another device).
+
+        Args:
+            device (Device): The device that sent the datagram.
+        """
+        device.invalid += 1
+        device.failures += 1
+
+        # The IP address was probably learnt wrongly or has since been reassigned.
+        if device.learnt and device.failures >= self.max_failures:
+            del self._by_ip_address[device.ip_address]
+            device.ip_address = None
+            device.learnt = False
+            device.failures = 0
+            self._unbound.append(device)
+
+    def _is_rejected(self, ip_address):
+        """
+        Checks whether an IP address was recently rejected.
+
+        Args:
+            ip_address (str): The IP address.
+
+        Returns:
+            bool: Whether the IP address was rejected and its rejection has not yet expired.
+        """
+        expires = self._rejected.get(ip_address)
+
+        # IP addresses that were never rejected (or were evicted) can be tried.
+        if expires is None:
+            return False
+
+        # Expired rejections are forgotten so the IP address is tried again.
+        if time.monotonic() >= expires:
+            del self._rejected[ip_address]
+            return False
+
+        return True
+
+    def _reject(self, ip_address):
+        """
+        Remembers that no device's key decrypts an IP address's DSL Status broadcasts.
+
+        Args:
+            ip_address (str): The IP address.
+        """
+        self._rejected[ip_address] = time.monotonic() + self.rejection_ttl
+        self._rejected.move_to_end(ip_address)
+
+        # Evict the least recently rejected IP address when full.
+        if len(self._rejected) > self.max_rejected:
+            self._rejected.popitem(last=False)
+
+    def _learn(self, ip_address, datagram):
+        """
+        Finds the device without an IP address whose key decrypts and parses a datagram.
+
+        Args:
+            ip_address (str): The source IP address of the datagram.
+            datagram (bytes): The datagram.
+
+        Returns:
+            Device: The device the IP address now belongs to, or None if no key decrypted it.
+        """
+        for device in self._unbound:
+            # Only the block containing the DSL type needs decrypting to rule out most keys,
+            # but a random block has a valid DSL type often enough that the rest must be checked.
+            if (
+                cryptography.quick_validate(device.key, datagram)
+                and self._is_plausible(cryptography.decrypt_bytes(device.key, datagram))
+            ):
+                self._unbound.remove(device)
+                device.ip_address = ip_address
+                device.learnt = True
+                device.failures = 0
+                self._by_ip_address[ip_address] = device
+                return device
+
+        return None
+
+    @staticmethod
+    def _is_plausible(decrypted_payload):
+        """
+        Checks whether a decrypted payload is a genuine DSL Status message.
+
+        Decrypting with the wrong key produces random bytes, which are very unlikely to have both
+        a valid DSL type and printable null-terminated strings.
+
+        Args:
+            decrypted_payload (bytes): The decrypted DSL Status message.
+
+        Returns:
+            bool: Whether the payload parses as a DSL Status message with a valid DSL type and
+                  printable strings.
+        """
+        message = Message.from_buffer(decrypted_payload)
+
+        # Check the DSL type is valid.
+        if message.dsl_type not in DSL_TYPE_VALUES:
+            return False
+
+        # Check each string is printable ASCII.
+        for name in Message.STRING_ATTRIBUTES:
+            string = getattr(message, name)
+            if not string.isascii() or not string.decode('ascii').isprintable():
+                return False
+
+        return True
+
+    def stats(self):
+        """
+        Obtains the counters of every device.
+
+        Returns:
+            dict: The counters of each device by name and the number of datagrams dropped
+                  from unknown senders.
+        """
+        return {
+            'devices': {name: device.stats() for name, device in self.devices.items()},
+            'unknown': self.unknown,
+        }
+
+    def __len__(self):
+        """
+        Obtains the number of registered devices.
+
+        Returns:
+            int: The number of devices.
+        """
+        return len(self.devices)
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Replay Module.
+This module provides methods for replaying DSL Status broadcasts at high rates (e.g. to load
+test a collector).
+
+Frames are encrypted once up front and then sent on a connected socket, paced by a token
+bucket, so the send loop does nothing but pace, send and measure.
+"""
+
+# Capture directories and pcap files are both replayed.
+import os
+
+# Synthetic messages vary randomly (but reproducibly).
+import random
+
+# We use the system socket APIs to send network traffic.
+import socket
+
+# Sends are paced and timed.
+import time
+
+# The frames are encrypted and replayed from captures.
+from . import cryptography
+from .capture import CaptureReader
+from .message import Message
+from .pcap import read_payloads
+
+
+class TokenBucket:
+    """
+    A class to pace events to a rate while permitting short bursts.
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst=None):
+        """
+        Initialize a full token bucket.
+
+        Args:
+            rate (float): The number of tokens added per second.
+            burst (int, optional): The maximum number of tokens held.
+                Defaults to None which holds 10 milliseconds' worth (and at least 1), enough to
+                make up for sleeps that overrun.
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate / 100))
+        self.tokens = float(self.burst)
+        self.updated = time.perf_counter()
+
+    def consume(self, tokens=1):
+        """
+        Takes tokens from the bucket if it holds enough.
+
+        Args:
+            tokens (int, optional): The number of tokens to take. Defaults to 1.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until there will be enough.
+        """
+        now = time.perf_counter()
+
+        # Refill the bucket for the time that has passed.
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+
+        return (tokens - self.tokens) / self.rate
+
+    def wait(self, tokens=1):
+        """
+        Sleeps until tokens can be taken from the bucket and then takes them.
+
+        Args:
+            tokens (int, optional): The number of tokens to take. Defaults to 1.
+        """
+        delay = self.consume(tokens)
+        while delay:
+            time.sleep(delay)
+            delay = self.consume(tokens)
+
+
+class RunningStatistics:
+    """
+    A class to keep the count, mean, standard deviation, minimum and maximum of a series of
+    values in constant memory (using Welford's algorithm).
+    """
+
+    __slots__ = ('count', 'mean', '_squares', 'minimum', 'maximum')
+
+    def __init__(self):
+        """
+        Initialize empty statistics.
+        """
+        self.count = 0
+        self.mean = 0.0
+        self._squares = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value):
+        """
+        Adds a value to the statistics.
+
+        Args:
+            value (float): The value.
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._squares += delta * (value - self.mean)
+
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    @property
+    def stdev(self):
+        """
+        The population standard deviation of the values.
+
+        Returns:
+            float: The standard deviation (0 if there are fewer than 2 values).
+        """
+        return (self._squares / self.count) ** 0.5 if self.count > 1 else 0.0
+
+    def stats(self):
+        """
+        Get the statistics.
+
+        Returns:
+            dict: The count, mean, standard deviation, minimum and maximum.
+        """
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'stdev': self.stdev,
+            'min': self.minimum,
+            'max': self.maximum
+        }
+
+
+def synthetic_messages(template=None, seed=None):
+    """
+    Generates an endless stream of plausible, slowly changing DSL Status messages.
+
+    Each message is one second on from the previous one, the cell counters increase with the
+    line speed, the CRC error counters occasionally increase and the SNR values wander.
+
+    Args:
+        template (Message, optional): The first message.
+            Defaults to None which uses an in sync VDSL line.
+        seed (int, optional): The random seed (so streams can be reproduced). Defaults to None.
+
+    Yields:
+        Message: Each message (the same instance updated in place).
+    """
+    generator = random.Random(seed)
+
+    if template is None:
+        message = Message()
+        message.dsl_upload_speed = 20000000
+        message.dsl_download_speed = 80000000
+        message.dsl_type = Message.DslType.VDSL.value
+        message.timestamp = int(time.time())
+        message.vdsl_snr_upload = 60
+        message.vdsl_snr_download = 80
+        message.modem_firmware_version = b'12-3-2-3-0-5'
+        message.running_mode = b'17A'
+        message.state = b'SHOWTIME'
+    else:
+        message = Message(template.convert_to_bytes())
+
+    while True:
+        yield message
+
+        # Move the line on by a second.
+        message.timestamp += 1
+        message.adsl_tx_cells = (message.adsl_tx_cells + message.dsl_upload_speed // 424) \
+            & 0x7FFFFFFF
+        message.adsl_rx_cells = (message.adsl_rx_cells + message.dsl_download_speed // 424) \
+            & 0x7FFFFFFF
+
+        if generator.random() < 0.05:
+            message.adsl_tx_crc_errors += 1
+        if generator.random() < 0.05:
+            message.adsl_rx_crc_errors += 1
+
+        message.vdsl_snr_upload = max(0, message.vdsl_snr_upload + generator.randint(-1, 1))
+        message.vdsl_snr_download = max(0, message.vdsl_snr_download + generator.randint(-1, 1))
+
+
+def precompute_frames(mac_address, messages):
+    """
+    Encrypts DSL Status messages ready to be sent.
+
+    Args:
+        mac_address (bytes or str): The MAC address of the sending device.
+        messages (iterable): Message instances or 112 byte plain-text messages.
+
+    Returns:
+        list: The 116 byte encrypted broadcasts.
+
+    Raises:
+        ValueError: If a message is not the correct length.
+    """
+
+    # Pack any Message instances.
+    payloads = [
+        message.convert_to_bytes() if isinstance(message, Message) else message
+        for message in messages
+    ]
+
+    output, statuses = cryptography.encrypt_many(mac_address, payloads)
+    if any(statuses):
+        raise ValueError('Incorrect number of bytes supplied.')
+
+    # Split the encrypted broadcasts ready for sending.
+    return [
+        bytes(output[offset:offset + cryptography.ENCRYPTED_LENGTH])
+        for offset in range(0, len(output), cryptography.ENCRYPTED_LENGTH)
+    ]
+
+
+def read_frames(path, port=4944):
+    """
+    Reads the recorded broadcasts from a capture directory or a pcap or pcapng file.
+
+    Args:
+        path (str): The capture directory or the path of the pcap or pcapng file.
+        port (int, optional): The destination UDP port in pcap files. Defaults to 4944.
+
+    Returns:
+        list: The recorded broadcasts (still encrypted).
+    """
+
+    # Capture directories are written by capture.CaptureWriter.
+    if os.path.isdir(path):
+        with CaptureReader(path) as reader:
+            return [record.frame for record in reader.read()]
+
+    return [payload for _, _, payload in read_payloads(path, port)]
+
+
+class LoadGenerator:
+    """
+    A class to send precomputed DSL Status broadcasts at a paced rate and measure how well the
+    rate was kept.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, frames, host='255.255.255.255', port=4944, rate=1000.0, burst=None):
+        """
+        Initialize the load generator.
+
+        Args:
+            frames (sequence): The encrypted broadcasts to send (in order, repeating).
+            host (str, optional): The broadcast, unicast or loopback address to send to.
+                Defaults to '255.255.255.255'.
+            port (int, optional): The UDP port to send to. Defaults to 4944.
+            rate (float, optional): The frames per second to send.
+                Defaults to 1000 (None sends as fast as possible).
+            burst (int, optional): The most frames sent back-to-back to catch up.
+                Defaults to None which allows 10 milliseconds' worth.
+
+        Raises:
+            ValueError: If there are no frames.
+        """
+        if not frames:
+            raise ValueError('No frames supplied.')
+
+        self.frames = list(frames)
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.burst = burst
+
+    @classmethod
+    def from_messages(cls, mac_address, messages, **kwargs):
+        """
+        Creates a load generator for DSL Status messages.
+
+        Args:
+            mac_address (bytes or str): The MAC address of the sending device.
+            messages (iterable): Message instances or 112 byte plain-text messages.
+            **kwargs: The LoadGenerator arguments.
+
+        Returns:
+            LoadGenerator: A load generator sending the messages.
+        """
+        return cls(precompute_frames(mac_address, messages), **kwargs)
+
+    @classmethod
+    def from_synthetic(cls, mac_address, count=1000, template=None, seed=None, **kwargs):
+        """
+        Creates a load generator for a synthetic stream of DSL Status messages.
+
+        Args:
+            mac_address (bytes or str): The MAC address of the sending device.
+            count (int, optional): The number of distinct messages. Defaults to 1000.
+            template (Message, optional): The first message. Defaults to None.
+            seed (int, optional): The random seed. Defaults to None.
+            **kwargs: The LoadGenerator arguments.
+
+        Returns:
+            LoadGenerator: A load generator sending the messages.
+        """
+        messages = synthetic_messages(template, seed)
+        return cls.from_messages(
+            mac_address,
+            [next(messages).convert_to_bytes() for _ in range(count)],
+            **kwargs
+        )
+
+    @classmethod
+    def from_capture(cls, path, port=4944, **kwargs):
+        """
+        Creates a load generator replaying a capture directory or a pcap or pcapng file.
+
+        Args:
+            path (str): The capture directory or the path of the pcap or pcapng file.
+            port (int, optional): The UDP port to send to (and read from pcap files).
+                Defaults to 4944.
+            **kwargs: The LoadGenerator arguments.
+
+        Returns:
+            LoadGenerator: A load generator replaying the capture.
+        """
+        return cls(read_frames(path, port), port=port, **kwargs)
+
+    def run(self, count=None, duration=None):
+        """
+        Sends the frames.
+
+        Args:
+            count (int, optional): The number of frames to send (repeating the frames).
+                Defaults to None.
+            duration (float, optional): The seconds to send for. Defaults to None.
+                If neither count or duration are given, each frame is sent once.
+
+        Returns:
+            dict: The frames sent, send errors, elapsed seconds, achieved rate, and statistics
+                  (in seconds) of the time spent sending each frame and of the interval between
+                  frames (whose standard deviation is the send jitter).
+        """
+        if count is None and duration is None:
+            count = len(self.frames)
+
+        frames = self.frames
+        frame_count = len(frames)
+        bucket = TokenBucket(self.rate, self.burst) if self.rate else None
+        latency = RunningStatistics()
+        interval = RunningStatistics()
+        sent = errors = 0
+
+        # Create a UDP socket connected to the target (so each send skips the address lookup).
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP) as sock:
+
+            # Permit sending of broadcast messages.
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            sock.connect((self.host, self.port))
+
+            clock = time.perf_counter
+            started = previous = clock()
+            deadline = started + duration if duration is not None else None
+
+            while count is None or sent + errors < count:
+                if bucket is not None:
+                    bucket.wait()
+
+                before = clock()
+                if deadline is not None and before >= deadline:
+                    break
+
+                # Send the next frame (a full receiver may refuse some on loopback).
+                try:
+                    sock.send(frames[(sent + errors) % frame_count])
+                    sent += 1
+                except OSError:
+                    errors += 1
+
+                after = clock()
+                latency.add(after - before)
+                interval.add(before - previous)
+                previous = before
+
+            elapsed = clock() - started
+
+        return {
+            'sent': sent,
+            'errors': errors,
+            'elapsed': elapsed,
+            'target_rate': self.rate,
+            'rate': sent / elapsed if elapsed else 0.0,
+            'latency': latency.stats(),
+            'interval': interval.stats()
+        }
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Rolling Statistics Module.
+This module provides methods for keeping sliding-window statistics of many DSL lines.
+
+Each device keeps the values of its last N messages in fixed-size ring buffers, the running sum
+and sum of squares of those values (so the mean and standard deviation are exact) and monotonic
+queues of the candidate minimums and maximums. Adding a message updates all of these in
+constant (amortized) time and a device never uses more memory than its window holds.
+"""
+
+# The values are kept in compact fixed-size arrays.
+from array import array
+
+# The candidate minimums and maximums are kept in double-ended queues.
+from collections import deque
+
+# The attributes of each message are read in one call.
+import operator
+
+# Messages without a receive time are given the current time.
+import time
+
+
+# The default number of messages in each window (about 10 minutes of 10 second broadcasts).
+DEFAULT_WINDOW = 60
+
+# The SNR attributes with sliding-window statistics.
+SNR_ATTRIBUTES = ('vdsl_snr_upload', 'vdsl_snr_download', 'adsl_snr_margin')
+
+# The cumulative CRC error counter attributes with sliding-window error rates (and their names).
+CRC_ATTRIBUTES = (
+    ('adsl_tx_crc_errors', 'tx_crc_errors'),
+    ('adsl_rx_crc_errors', 'rx_crc_errors')
+)
+
+# Reads the SNR attributes then the CRC error counters of a message as a tuple.
+_VALUES = operator.attrgetter(*SNR_ATTRIBUTES, *(attribute for attribute, _ in CRC_ATTRIBUTES))
+
+
+class RollingWindow:
+    """
+    A class to keep the count, mean, standard deviation, minimum and maximum of the last N
+    integer values in constant memory.
+    """
+
+    __slots__ = ('size', 'count', '_values', '_total', '_squares', '_minimums', '_maximums')
+
+    def __init__(self, size=DEFAULT_WINDOW):
+        """
+        Initialize an empty window.
+
+        Args:
+            size (int, optional): The number of values in the window. Defaults to 60.
+
+        Raises:
+            ValueError: If the size is less than 1.
+        """
+
+        # A window must hold at least one value.
+        if size < 1:
+            raise ValueError('The window size must be at least 1.')
+
+        self.size = size
+        self.count = 0
+        self._values = array('q', bytes(8 * size))
+        self._total = 0
+        self._squares = 0
+
+        # The (position, value) of each value that could still become the minimum or maximum,
+        # oldest first.
+        self._minimums = deque()
+        self._maximums = deque()
+
+    def add(self, value):
+        """
+        Adds a value to the window (dropping the oldest value once the window is full).
+
+        Args:
+            value (int): The value.
+        """
+        count = self.count
+        size = self.size
+        values = self._values
+        minimums = self._minimums
+        maximums = self._maximums
+        index = count % size
+
+        # Replace the value leaving the window (once the window is full).
+        if count >= size:
+            oldest = values[index]
+            self._total += value - oldest
+            self._squares += value * value - oldest * oldest
+
+            expired = count - size
+            if minimums[0][0] == expired:
+                minimums.popleft()
+            if maximums[0][0] == expired:
+                maximums.popleft()
+        else:
+            self._total += value
+            self._squares += value * value
+
+        values[index] = value
+        self.count = count + 1
+
+        # Older values that can no longer be the minimum (or maximum) are discarded.
+        while minimums and minimums[-1][1] >= value:
+            minimums.pop()
+        minimums.append((count, value))
+
+        while maximums and maximums[-1][1] <= value:
+            maximums.pop()
+        maximums.append((count, value))
+
+    def __len__(self):
+        """
+        Obtains the number of values in the window.
+
+        Returns:
+            int: The number of values (at most the window size).
+        """
+        return min(self.count, self.size)
+
+    @property
+    def total(self):
+        """
+        The sum of the values in the window.
+
+        Returns:
+            int: The sum.
+        """
+        return self._total
+
+    @property
+    def newest(self):
+        """
+        The newest value in the window.
+
+        Returns:
+            int: The value (None if the window is empty).
+        """
+        if not self.count:
+            return None
+        return self._values[(self.count - 1) % self.size]
+
+    @property
+    def oldest(self):
+        """
+        The oldest value in the window.
+
+        Returns:
+            int: The value (None if the window is empty).
+        """
+        if not self.count:
+            return None
+        return self._values[self.count % self.size if self.count >= self.size else 0]
+
+    def stats(self):
+        """
+        Get the statistics of the values in the window.
+
+        Returns:
+            dict: The count, mean, population standard deviation, minimum and maximum (the
+                  statistics are None if the window is empty).
+        """
+        count = len(self)
+        if not count:
+            return {'count': 0, 'mean': None, 'stdev': None, 'min': None, 'max': None}
+
+        # The sums are exact integers so the variance does not drift as values come and go.
+        return {
+            'count': count,
+            'mean': self._total / count,
+            'stdev': max(count * self._squares - self._total * self._total, 0) ** 0.5 / count,
+            'min': self._minimums[0][1],
+            'max': self._maximums[0][1]
+        }
+
+
+class _DeviceWindows:
+    """
+    A class to hold the windows of a single device.
+    """
+
+    __slots__ = ('snr', 'crc_errors', 'last_crc_errors', 'times')
+
+    def __init__(self, size):
+        """
+        Initialize empty windows.
+
+        Args:
+            size (int): The number of messages in each window.
+        """
+        self.snr = tuple(RollingWindow(size) for _ in SNR_ATTRIBUTES)
+        self.crc_errors = tuple(RollingWindow(size) for _ in CRC_ATTRIBUTES)
+        self.last_crc_errors = None
+
+        # When each message in the window was received (a ring buffer in step with the windows).
+        self.times = array('d', bytes(8 * size))
+
+
+class RollingStatistics:
+    """
+    A class to keep sliding-window SNR statistics and CRC error rates for many devices.
+
+    Feed it every decoded message (e.g. from a listener callback) and read the statistics of a
+    device at any time:
+
+        statistics = RollingStatistics()
+        listener = Listener(mac, lambda message, address: statistics.update(address[0], message))
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        """
+        Initialize statistics with no devices.
+
+        Args:
+            window (int, optional): The number of messages from each device in its windows.
+                Defaults to 60.
+
+        Raises:
+            ValueError: If the window is less than 1.
+        """
+
+        # A window must hold at least one message.
+        if window < 1:
+            raise ValueError('The window size must be at least 1.')
+
+        self.window = window
+        self.devices = {}
+
+    def update(self, device, message, received=None):
+        """
+        Adds a message from a device to its windows.
+
+        Args:
+            device (object): The device that sent the message (e.g. its name or IP address).
+            message (Message or MessageView): The DSL Status message.
+            received (float, optional): When the message was received (seconds).
+                Defaults to None which uses the current time.
+        """
+        windows = self.devices.get(device)
+        if windows is None:
+            windows = self.devices[device] = _DeviceWindows(self.window)
+
+        values = _VALUES(message)
+
+        # The position of this message in the ring buffers.
+        first = windows.snr[0]
+        windows.times[first.count % first.size] = time.time() if received is None else received
+
+        for window, value in zip(windows.snr, values):
+            window.add(value)
+
+        # The CRC error counters are cumulative, so the errors since the previous message are
+        # counted (a counter that went backwards was reset, e.g. by a retrain, so it counts
+        # from 0).
+        crc_errors = values[len(SNR_ATTRIBUTES):]
+        last_crc_errors = windows.last_crc_errors or crc_errors
+        for window, errors, last in zip(windows.crc_errors, crc_errors, last_crc_errors):
+            window.add(errors - last if errors >= last else errors)
+        windows.last_crc_errors = crc_errors
+
+    def stats(self, device):
+        """
+        Get the statistics of a device.
+
+        Args:
+            device (object): The device.
+
+        Returns:
+            dict: The number of messages in the window, the seconds they span, the statistics of
+                  each SNR attribute and the CRC errors counted, errors per second and most
+                  errors between two messages in each direction (None for an unknown device).
+        """
+        windows = self.devices.get(device)
+        if windows is None:
+            return None
+
+        # The first window is in step with the ring buffer of receive times.
+        first = windows.snr[0]
+        newest = windows.times[(first.count - 1) % first.size]
+        oldest = windows.times[first.count % first.size if first.count >= first.size else 0]
+        span = newest - oldest
+
+        stats = {'messages': len(first), 'seconds': span}
+        for window, attribute in zip(windows.snr, SNR_ATTRIBUTES):
+            stats[attribute] = window.stats()
+
+        # The errors counted by the oldest message happened before the window started.
+        for window, (_, name) in zip(windows.crc_errors, CRC_ATTRIBUTES):
+            errors = window.total - window.oldest
+            stats[name] = {
+                'errors': errors,
+                'per_second': errors / span if span > 0 else 0.0,
+                'max': window.stats()['max']
+            }
+
+        return stats
+
+    def remove(self, device):
+        """
+        Forgets a device.
+
+        Args:
+            device (object): The device.
+        """
+        self.devices.pop(device, None)
+
+    def __len__(self):
+        """
+        Obtains the number of devices.
+
+        Returns:
+            int: The number of devices.
+        """
+        return len(self.devices)
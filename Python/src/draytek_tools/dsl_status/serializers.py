@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Serializers Module.
+This module provides methods for streaming many DSL Status messages as JSON Lines or CSV.
+
+Each line is built from a format template prepared once per writer, the DSL type names are looked
+up in a prepared table and each distinct string field is decoded and escaped only the first time
+it is seen. Lines are written to the output in batches rather than one at a time.
+"""
+
+# Each output format must provide its own template and encoding.
+import abc
+
+# The JSON strings are escaped by the json library.
+import json
+
+# The attributes of each message are read in one call.
+import operator
+
+# Paths are opened as files.
+import os
+
+# The output defaults to the standard output.
+import sys
+
+# The fields are those of a DSL Status message.
+from .message import Message
+
+
+# The default number of lines written to the output together.
+DEFAULT_BATCH_SIZE = 256
+
+# The default maximum number of distinct strings kept encoded.
+DEFAULT_MAX_STRINGS = 1024
+
+# The name of each known DSL type value.
+DSL_TYPE_NAMES = {dsl_type.value: dsl_type.name for dsl_type in Message.DslType}
+
+# Reads every attribute of a message (in the packed order) as a tuple.
+_ATTRIBUTE_VALUES = operator.attrgetter(*Message.ATTRIBUTES)
+
+# The positions of the specially formatted attributes.
+_DSL_TYPE_INDEX = Message.ATTRIBUTES.index('dsl_type')
+_STRING_INDEXES = tuple(Message.ATTRIBUTES.index(name) for name in Message.STRING_ATTRIBUTES)
+
+
+class _StreamWriter(abc.ABC):
+    """
+    A base class to write DSL Status messages as lines of text in batches.
+
+    Subclasses must provide the line template and how strings and extra field values are encoded.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        output=None,
+        batch_size=DEFAULT_BATCH_SIZE,
+        extra_fields=(),
+        max_strings=DEFAULT_MAX_STRINGS
+    ):
+        """
+        Initialize a writer.
+
+        Args:
+            output (file or str, optional): A text file (or the path of a file to create).
+                Defaults to None which writes to the standard output.
+            batch_size (int, optional): The number of lines written to the output together.
+                Defaults to 256.
+            extra_fields (tuple, optional): The names of extra fields written before the
+                message fields (e.g. ('received', 'address')). Defaults to none.
+            max_strings (int, optional): The maximum number of distinct strings kept encoded.
+                Defaults to 1024.
+
+        Raises:
+            ValueError: If the batch size is less than 1 or an extra field has the name of a
+                        message field.
+        """
+
+        # A batch must hold at least one line.
+        if batch_size < 1:
+            raise ValueError('The batch size must be at least 1.')
+
+        # Every field needs a distinct name.
+        if set(extra_fields).intersection(Message.ATTRIBUTES):
+            raise ValueError('The extra fields cannot have the names of message fields.')
+
+        # Paths are opened (and closed) by this writer.
+        self._owns_output = isinstance(output, (str, os.PathLike))
+        if self._owns_output:
+            # pylint: disable=consider-using-with
+            output = open(output, 'w', encoding='utf-8', newline='')
+        elif output is None:
+            output = sys.stdout
+
+        self.output = output
+        self.batch_size = batch_size
+        self.extra_fields = tuple(extra_fields)
+        self.max_strings = max_strings
+        self.written = 0
+
+        # The prepared line template and the encoded DSL type names.
+        self._format_line = self._build_template().format
+        self._dsl_types = {
+            value: self._encode_string(name) for value, name in DSL_TYPE_NAMES.items()
+        }
+
+        # The encoded value of each distinct raw string and the lines waiting to be written.
+        self._strings = {}
+        self._pending = []
+
+    @abc.abstractmethod
+    def _build_template(self):
+        """
+        Builds the line template.
+
+        Returns:
+            str: A str.format template taking the extra fields then the message fields.
+        """
+
+    @abc.abstractmethod
+    def _encode_string(self, text):
+        """
+        Encodes a string for the output format.
+
+        Args:
+            text (str): The string.
+
+        Returns:
+            str: The encoded string.
+        """
+
+    @abc.abstractmethod
+    def _encode_extra(self, value):
+        """
+        Encodes an extra field value.
+
+        Args:
+            value (object): The value (None, a number or anything else written as a string).
+
+        Returns:
+            str: The encoded value.
+        """
+
+    def _format(self, values, extra):
+        """
+        Formats the unpacked fields of a message as a line.
+
+        Args:
+            values (list): The message fields in the packed order.
+            extra (tuple): The extra field values.
+
+        Returns:
+            str: The line.
+        """
+        strings = self._strings
+
+        # Known DSL types are written by name.
+        dsl_type = values[_DSL_TYPE_INDEX]
+        values[_DSL_TYPE_INDEX] = self._dsl_types.get(dsl_type) or str(dsl_type)
+
+        # Each distinct string is only decoded and escaped once.
+        for index in _STRING_INDEXES:
+            raw = values[index]
+            try:
+                encoded = strings.get(raw)
+            except TypeError:
+                # Mutable strings (e.g. those of a blank Message) are not hashable.
+                encoded = None
+
+            if encoded is None:
+                # Unlike Python, C uses null-terminated strings, truncate them.
+                raw = bytes(raw)
+                encoded = self._encode_string(
+                    raw.split(b'\0', 1)[0].decode('ascii', 'replace')
+                )
+
+                # Stop a stream of ever-changing strings from growing the table forever.
+                if len(strings) >= self.max_strings:
+                    strings.clear()
+                strings[raw] = encoded
+            values[index] = encoded
+
+        if extra:
+            return self._format_line(*map(self._encode_extra, extra), *values)
+        return self._format_line(*values)
+
+    def _queue(self, line):
+        """
+        Queues a line, writing the batch once it is full.
+
+        Args:
+            line (str): The line.
+        """
+        pending = self._pending
+        pending.append(line)
+        if len(pending) >= self.batch_size:
+            self._write_pending()
+
+    def _write_pending(self):
+        """
+        Writes the queued lines to the output in one call.
+        """
+        if self._pending:
+            self.output.write(''.join(self._pending))
+            self.written += len(self._pending)
+            self._pending = []
+
+    def write(self, message, *extra):
+        """
+        Writes a message.
+
+        Args:
+            message (Message or MessageView): The DSL Status message.
+            *extra: The value of each extra field.
+
+        Raises:
+            ValueError: If the number of extra values does not match the extra fields.
+        """
+
+        # Each extra field needs a value.
+        if len(extra) != len(self.extra_fields):
+            raise ValueError(f'{len(self.extra_fields)} extra values are required.')
+
+        self._queue(self._format(list(_ATTRIBUTE_VALUES(message)), extra))
+
+    def write_many(self, messages):
+        """
+        Writes many messages.
+
+        Args:
+            messages (iterable): The Message (or MessageView) instances, or tuples of the extra
+                values followed by the message (e.g. the output of pcap.decode_capture).
+        """
+
+        # The extra values (if any) need checking.
+        if self.extra_fields:
+            for item in messages:
+                self.write(item[-1], *item[:-1])
+            return
+
+        # Otherwise the lines are formatted and queued directly.
+        format_line = self._format
+        lines = self._pending
+        for message in messages:
+            lines.append(format_line(list(_ATTRIBUTE_VALUES(message)), ()))
+            if len(lines) >= self.batch_size:
+                self._write_pending()
+                lines = self._pending
+
+    def write_buffer(self, payloads, statuses=None):
+        """
+        Writes every message in a contiguous buffer of decrypted 112 byte DSL Status messages
+        without creating Message instances.
+
+        Args:
+            payloads (bytes, bytearray or memoryview): The contiguous buffer of messages.
+            statuses (bytearray, optional):
+                The status of each message (as returned by cryptography.decrypt_many); only
+                the messages with a status of cryptography.STATUS_OK are written.
+                Defaults to None which writes every message.
+
+        Raises:
+            ValueError: If the buffer is not a multiple of the message length or the writer has
+                        extra fields.
+        """
+
+        # DSL Status messages, as fixed binary data structures, must be a specific length.
+        if len(payloads) % Message.STRUCT.size != 0:
+            raise ValueError('Incorrect number of bytes received.')
+
+        # A buffer only holds the message fields.
+        if self.extra_fields:
+            raise ValueError('Buffers cannot be written with extra fields.')
+
+        # Unpack every message straight from the buffer, queueing a whole batch at a time.
+        format_line = self._format
+        lines = self._pending
+        for index, values in enumerate(Message.STRUCT.iter_unpack(payloads)):
+            if statuses is None or statuses[index] == 0:
+                lines.append(format_line(list(values), ()))
+                if len(lines) >= self.batch_size:
+                    self._write_pending()
+                    lines = self._pending
+
+    def write_batch(self, batch):
+        """
+        Writes every message in a batch.
+
+        Args:
+            batch (MessageBatch): The batch of DSL Status messages.
+        """
+        self.write_buffer(batch.to_bytes())
+
+    def flush(self):
+        """
+        Writes any queued lines and flushes the output.
+        """
+        self._write_pending()
+        self.output.flush()
+
+    def close(self):
+        """
+        Writes any queued lines and closes the output (if this writer opened it).
+        """
+        self.flush()
+        if self._owns_output:
+            self.output.close()
+
+    def __enter__(self):
+        """
+        Returns this writer when entering a "with" block.
+
+        Returns:
+            _StreamWriter: This writer.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Closes this writer when leaving a "with" block.
+        """
+        self.close()
+
+
+class NdjsonWriter(_StreamWriter):
+    """
+    A class to write DSL Status messages as JSON Lines (one JSON object per line).
+
+    Known DSL types are written by name (e.g. "VDSL") and the strings are truncated at their
+    first null byte.
+    """
+
+    def _build_template(self):
+        """
+        Builds the line template.
+
+        Returns:
+            str: A str.format template taking the extra fields then the message fields.
+        """
+        members = [
+            json.dumps(name).replace('{', '{{').replace('}', '}}') + ':{}'
+            for name in self.extra_fields + Message.ATTRIBUTES
+        ]
+        return '{{' + ','.join(members) + '}}\n'
+
+    def _encode_string(self, text):
+        """
+        Encodes a string as a JSON string.
+
+        Args:
+            text (str): The string.
+
+        Returns:
+            str: The JSON string.
+        """
+        return json.dumps(text)
+
+    def _encode_extra(self, value):
+        """
+        Encodes an extra field value as JSON.
+
+        Args:
+            value (object): The value (anything not JSON serializable is written as a string).
+
+        Returns:
+            str: The JSON value.
+        """
+        return json.dumps(value, default=str)
+
+
+class CsvWriter(_StreamWriter):
+    """
+    A class to write DSL Status messages as CSV (with a header row).
+
+    Known DSL types are written by name (e.g. "VDSL"), the strings are truncated at their first
+    null byte and fields are quoted only when needed (like the csv library's QUOTE_MINIMAL).
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        output=None,
+        batch_size=DEFAULT_BATCH_SIZE,
+        extra_fields=(),
+        max_strings=DEFAULT_MAX_STRINGS,
+        header=True
+    ):
+        """
+        Initialize a CSV writer.
+
+        Args:
+            output (file or str, optional): A text file (or the path of a file to create).
+                Defaults to None which writes to the standard output.
+            batch_size (int, optional): The number of lines written to the output together.
+                Defaults to 256.
+            extra_fields (tuple, optional): The names of extra columns written before the
+                message columns. Defaults to none.
+            max_strings (int, optional): The maximum number of distinct strings kept encoded.
+                Defaults to 1024.
+            header (bool, optional): Whether to write a header row first. Defaults to True.
+
+        Raises:
+            ValueError: If the batch size is less than 1 or an extra column has the name of a
+                        message column.
+        """
+        super().__init__(output, batch_size, extra_fields, max_strings)
+
+        # The header is written straight away.
+        if header:
+            self.output.write(
+                ','.join(map(self._encode_string, self.extra_fields + Message.ATTRIBUTES)) + '\n'
+            )
+
+    def _build_template(self):
+        """
+        Builds the line template.
+
+        Returns:
+            str: A str.format template taking the extra fields then the message fields.
+        """
+        return ','.join(['{}'] * (len(self.extra_fields) + len(Message.ATTRIBUTES))) + '\n'
+
+    def _encode_string(self, text):
+        """
+        Encodes a string as a CSV field.
+
+        Args:
+            text (str): The string.
+
+        Returns:
+            str: The field (quoted if it contains a comma, quote or line break).
+        """
+        if any(character in text for character in ',"\r\n'):
+            return '"' + text.replace('"', '""') + '"'
+        return text
+
+    def _encode_extra(self, value):
+        """
+        Encodes an extra column value as a CSV field.
+
+        Args:
+            value (object): The value (None is written as an empty field).
+
+        Returns:
+            str: The field.
+        """
+        return '' if value is None else self._encode_string(str(value))
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of DrayTek-Tools <https://github.com/Matthew1471/DrayTek-Tools>
+# Copyright (C) 2024 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+DrayTek® Vigor™ DSL Status Simulator Module.
+This module provides methods for simulating a fleet of DrayTek® Vigor™ modems broadcasting
+DSL Status messages (e.g. to measure a collector against a production sized fleet locally).
+
+Each virtual modem has its own MAC address (and so key), evolves its own line state and
+broadcasts at its own cadence from an asyncio task. On loopback, each modem can also send from
+its own 127.x.x.x address so collectors can tell the modems apart with a DeviceRegistry.
+"""
+
+# The modems broadcast from asyncio tasks.
+import asyncio
+
+# Each modem's line varies randomly (but reproducibly).
+import random
+
+# Messages are timestamped when they are sent.
+import time
+
+# The messages are encrypted with each modem's key.
+from . import cryptography
+from .message import Message
+from .registry import DeviceRegistry
+
+
+class VirtualModem:
+    """
+    A class to represent a single simulated DrayTek® Vigor™ modem and its DSL line.
+    """
+
+    # The line states broadcast by the modem.
+    STATE_SHOWTIME = b'SHOWTIME'
+    STATE_TRAINING = b'TRAINING'
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        name,
+        mac_address,
+        source_address=None,
+        interval=1.0,
+        seed=None,
+        retrain_probability=0.001,
+        crc_error_rate=0.05
+    ):
+        """
+        Initialize a virtual modem with a line in SHOWTIME.
+
+        Args:
+            name (str): The name of the modem.
+            mac_address (bytes or str): The MAC address of the modem.
+            source_address (str, optional): The IP address the modem broadcasts from.
+                Defaults to None which lets the operating system choose.
+            interval (float, optional): The average seconds between broadcasts. Defaults to 1.
+            seed (int, optional): The random seed (so lines can be reproduced).
+                Defaults to None.
+            retrain_probability (float, optional): The chance of the line retraining on each
+                broadcast. Defaults to 0.001.
+            crc_error_rate (float, optional): The chance of CRC errors per second.
+                Defaults to 0.05.
+        """
+        self.name = name
+        self.mac_address = mac_address
+        self.source_address = source_address
+        self.interval = interval
+        self.retrain_probability = retrain_probability
+        self.crc_error_rate = crc_error_rate
+
+        # Each modem has its own key (held here so a large fleet does not thrash the key cache).
+        self.key = cryptography.KeyCacheEntry(mac_address)
+        self.random = random.Random(seed)
+
+        # Each line syncs at a slightly different speed.
+        self.upload_speed = self.random.randint(15, 20) * 1000000
+        self.download_speed = self.random.randint(60, 80) * 1000000
+        self.training_remaining = 0
+
+        self.message = Message()
+        self.message.dsl_type = Message.DslType.VDSL.value
+        self.message.timestamp = int(time.time())
+        self.message.modem_firmware_version = b'12-3-2-3-0-5'
+        self.message.running_mode = b'17A'
+        self._sync()
+
+        # The broadcasts sent and the errors sending them.
+        self.sent = 0
+        self.errors = 0
+        self.retrains = 0
+        self.updated = time.monotonic()
+
+    def _sync(self):
+        """
+        Brings the line into SHOWTIME at close to its full speed.
+        """
+        message = self.message
+        message.state = self.STATE_SHOWTIME
+        message.dsl_upload_speed = int(self.upload_speed * self.random.uniform(0.9, 1.0))
+        message.dsl_download_speed = int(self.download_speed * self.random.uniform(0.9, 1.0))
+        message.vdsl_snr_upload = self.random.randint(55, 65)
+        message.vdsl_snr_download = self.random.randint(75, 85)
+
+    def step(self):
+        """
+        Moves the line on to the current time.
+
+        Returns:
+            Message: The modem's updated message.
+        """
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+
+        message = self.message
+        message.timestamp = int(time.time())
+
+        # A training line comes back into SHOWTIME after a few broadcasts.
+        if self.training_remaining:
+            self.training_remaining -= 1
+            if not self.training_remaining:
+                self._sync()
+            return message
+
+        # Occasionally the line drops and retrains.
+        if self.random.random() < self.retrain_probability:
+            self.retrains += 1
+            self.training_remaining = self.random.randint(3, 10)
+            message.state = self.STATE_TRAINING
+            message.dsl_upload_speed = 0
+            message.dsl_download_speed = 0
+            return message
+
+        # Cells flow at the line speed (53 byte ATM cells).
+        message.adsl_tx_cells = (
+            message.adsl_tx_cells + int(message.dsl_upload_speed * elapsed) // 424
+        ) & 0x7FFFFFFF
+        message.adsl_rx_cells = (
+            message.adsl_rx_cells + int(message.dsl_download_speed * elapsed) // 424
+        ) & 0x7FFFFFFF
+
+        # Errors arrive in small bursts.
+        if self.random.random() < self.crc_error_rate * elapsed:
+            message.adsl_tx_crc_errors += self.random.randint(1, 5)
+        if self.random.random() < self.crc_error_rate * elapsed:
+            message.adsl_rx_crc_errors += self.random.randint(1, 5)
+
+        # The SNR drifts within sensible bounds.
+        message.vdsl_snr_upload = min(90, max(0, message.vdsl_snr_upload
+                                              + self.random.randint(-1, 1)))
+        message.vdsl_snr_download = min(90, max(0, message.vdsl_snr_download
+                                                + self.random.randint(-1, 1)))
+
+        return message
+
+    def frame(self):
+        """
+        Moves the line on and encrypts the modem's message.
+
+        Returns:
+            bytes: The 116 byte encrypted broadcast.
+        """
+        return cryptography.encrypt_bytes(self.key, self.step().convert_to_bytes())
+
+    def stats(self):
+        """
+        Get the modem's statistics.
+
+        Returns:
+            dict: The broadcasts sent, send errors and line retrains.
+        """
+        return {
+            'sent': self.sent,
+            'errors': self.errors,
+            'retrains': self.retrains
+        }
+
+
+class _ModemProtocol(asyncio.DatagramProtocol):
+    """
+    A protocol counting the errors sending a virtual modem's broadcasts.
+    """
+
+    def __init__(self, modem):
+        """
+        Initialize the protocol.
+
+        Args:
+            modem (VirtualModem): The modem sending on this protocol's transport.
+        """
+        self.modem = modem
+
+    def error_received(self, exc):
+        """
+        Called when a send fails (e.g. nothing is listening on loopback).
+
+        Args:
+            exc (OSError): The error.
+        """
+        self.modem.errors += 1
+
+
+class ModemFleet:
+    """
+    A class to run a fleet of virtual modems broadcasting DSL Status messages.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        count,
+        host='127.0.0.1',
+        port=4944,
+        interval=1.0,
+        seed=None,
+        distinct_sources=True
+    ):
+        """
+        Initialize a fleet of virtual modems.
+
+        Args:
+            count (int): The number of modems.
+            host (str, optional): The address the modems broadcast to.
+                Defaults to '127.0.0.1'.
+            port (int, optional): The UDP port the modems broadcast to. Defaults to 4944.
+            interval (float, optional): The average seconds between each modem's broadcasts.
+                Defaults to 1.
+            seed (int, optional): The random seed (so fleets can be reproduced).
+                Defaults to None.
+            distinct_sources (bool, optional): Whether each modem sends from its own loopback
+                address (127.1.x.x). Defaults to True.
+        """
+        self.host = host
+        self.port = port
+        generator = random.Random(seed)
+
+        # Each modem gets a locally administered MAC address and its own cadence.
+        self.modems = [
+            VirtualModem(
+                f'modem{index}',
+                f'02:00:{index >> 24 & 0xFF:02x}:{index >> 16 & 0xFF:02x}:'
+                f'{index >> 8 & 0xFF:02x}:{index & 0xFF:02x}',
+                f'127.1.{index + 1 >> 8 & 0xFF}.{index + 1 & 0xFF}' if distinct_sources else None,
+                interval * generator.uniform(0.9, 1.1),
+                generator.getrandbits(32)
+            )
+            for index in range(count)
+        ]
+
+    def registry(self):
+        """
+        Creates a device registry for the fleet (e.g. for a listener to demultiplex it).
+
+        Returns:
+            DeviceRegistry: A registry of every modem (bound to its source address if it has
+                            one).
+        """
+        registry = DeviceRegistry()
+        for modem in self.modems:
+            registry.add(modem.name, modem.mac_address, modem.source_address)
+        return registry
+
+    async def _broadcast(self, modem, deadline):
+        """
+        Broadcasts a modem's messages at its cadence.
+
+        Args:
+            modem (VirtualModem): The modem.
+            deadline (float): The loop time to stop at (or None to run until cancelled).
+        """
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _ModemProtocol(modem),
+            local_addr=(modem.source_address, 0) if modem.source_address else None,
+            remote_addr=(self.host, self.port),
+            allow_broadcast=True
+        )
+
+        try:
+            # Spread the fleet's first broadcasts over an interval.
+            await asyncio.sleep(modem.random.uniform(0, modem.interval))
+
+            while deadline is None or loop.time() < deadline:
+                transport.sendto(modem.frame())
+                modem.sent += 1
+                await asyncio.sleep(modem.interval)
+        finally:
+            transport.close()
+
+    async def run(self, duration=None):
+        """
+        Runs the fleet.
+
+        Args:
+            duration (float, optional): The seconds to run for.
+                Defaults to None which runs until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration if duration is not None else None
+
+        await asyncio.gather(*(self._broadcast(modem, deadline) for modem in self.modems))
+
+    def stats(self):
+        """
+        Get the fleet's statistics.
+
+        Returns:
+            dict: The modems, and the broadcasts sent, send errors and line retrains in total.
+        """
+        return {
+            'modems': len(self.modems),
+            'sent': sum(modem.sent for modem in self.modems),
+            'errors': sum(modem.errors for modem in self.modems),
+            'retrains': sum(modem.retrains for modem in self.modems)
+        }